@@ -0,0 +1,366 @@
+#! /usr/bin/python
+"""Benchmarks for the justif interpreter. Run with `python bench.py`."""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Final
+
+import typer
+from loguru import logger
+
+from justif import (
+    ENGINES,
+    AsyncOutputSink,
+    BatchRun,
+    ExecutionContext,
+    InputSource,
+    JustifParser,
+    MemoizingExecutionContext,
+    MemorySnapshot,
+    OutputSink,
+    Program,
+    TracedExecutionContext,
+    dump_program,
+    encode_string,
+    execute_async,
+    load_program,
+    run_batch,
+)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+LOOP: Final[str] = "~1?.0=0,=2,!.0:~2?+.0=200?.0+1,=2:0:0"
+"""A counting loop, short enough for the recursion limit of the tree-walker."""
+
+NAIVE_FIBONACCI: Final[str] = (
+    "~1?.0=10,..0=16,=5,!.1:"
+    "~5?+..0=2?.1=..0:.3=..0,.0+1,..0=.3,..0-1,=5,..0=.1,.0-1,.3=..0,.3-2,.0+2,..0=.3,=5,.0-1,.1+..0,.0-1:0"
+)
+"""fib(16) with real recursion: the argument is on a stack at ..0, the result goes to .1."""
+
+
+def timed(function, repeat: int) -> float:
+    """Call `function` `repeat` times and return the best wall time of a single call.
+
+    Args:
+        function (Callable[[], object]): The function to time.
+        repeat (int): Number of calls.
+
+    Returns:
+        float: The best time in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def load_examples() -> dict[str, list]:
+    """Parse the example programs next to this file, plus `LOOP`.
+
+    Returns:
+        dict[str, list]: The root sequence of each example, by file name.
+    """
+    examples = {}
+    for filename in sorted(glob.glob(os.path.join(HERE, "*.justif"))):
+        with open(filename, "r", encoding="utf-8") as f:
+            program = JustifParser().parse_expression(f.read())
+        assert program is not None, f"Unable to parse {filename}"
+        examples[os.path.basename(filename)] = program
+    examples["loop"] = JustifParser().parse_expression(LOOP)
+    return examples
+
+
+def run_engine(engine: str, program: list, runs: int, context_class: type = ExecutionContext) -> None:
+    """Run a parsed program `runs` times with the given engine, discarding its output.
+
+    Args:
+        engine (str): Name of the engine in ENGINES.
+        program (list): The parsed root sequence.
+        runs (int): Number of runs.
+        context_class (type, optional): The execution context to use. Defaults to ExecutionContext.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(runs):
+            context = context_class()
+            context.root_sequence = program
+            ENGINES[engine](context, 1)
+
+
+def run_program(program: Program, runs: int) -> None:
+    """Run a prepared program `runs` times, each in a new context, discarding its output.
+
+    Args:
+        program (Program): The program, compiled once for its engine.
+        runs (int): Number of runs.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(runs):
+            context = program.context()
+            program.execute(context)
+            context.output.flush()
+
+
+def bench_engines(runs: int, repeat: int) -> None:
+    """Compare the throughput of all engines on the example programs.
+
+    Each program is prepared once per engine, see `Program`, so the compiling engines
+    are measured without their compile time.
+
+    Args:
+        runs (int): Program runs per measurement.
+        repeat (int): Measurements per engine, the best one is reported.
+    """
+    engines = [engine for engine in ENGINES if engine != "traced"]
+    print(f"{'program':<20}" + "".join(f"{engine:>12}" for engine in engines))
+    for name, program in load_examples().items():
+        baseline = None
+        line = f"{name:<20}"
+        for engine in engines:
+            prepared = Program(program, engine)
+            seconds = timed(lambda: run_program(prepared, runs), repeat)
+            baseline = baseline or seconds
+            line += f"{seconds * 1000:>7.1f}ms{baseline / seconds:>4.1f}x"
+        print(line)
+
+
+def bench_logging(runs: int, repeat: int) -> None:
+    """Compare the untraced tree-walker with the traced one while debug output is filtered.
+
+    The traced engine at INFO level pays what every run used to pay when the logging calls
+    were part of the normal execution path.
+
+    Args:
+        runs (int): Program runs per measurement.
+        repeat (int): Measurements per engine, the best one is reported.
+    """
+    print(f"{'program':<20}{'traced':>12}{'tree':>12}")
+    for name, program in load_examples().items():
+        traced = timed(lambda: run_engine("traced", program, runs, TracedExecutionContext), repeat)
+        plain = timed(lambda: run_engine("tree", program, runs), repeat)
+        print(f"{name:<20}{traced * 1000:>10.1f}ms{plain * 1000:>10.1f}ms  {traced / plain:.1f}x faster")
+
+
+def nested_if_true(depth: int) -> str:
+    """Generate `.0?.0?...0:0:0`, nested in the true branches."""
+    return ".0?" * depth + "0" + ":0" * depth
+
+
+def nested_if_false(depth: int) -> str:
+    """Generate `~0?.0=0:~1?.1=1:...0`, a chain nested in the false branches."""
+    return "".join(f"~{i}?.{i}={i}:" for i in range(depth)) + "0"
+
+
+def nested_if_both(depth: int) -> str:
+    """Generate a complete binary tree of ifs with comparisons and memsets in every branch."""
+    program = "0"
+    for i in range(depth):
+        program = f"-.{i}={i}?{program},.1+1:{program}"
+    return program
+
+
+def bench_parser(repeat: int) -> None:
+    """Compare the recursive-descent parser with the iterative one on generated programs.
+    The recursive parser fails on the deepest nestings.
+
+    Args:
+        repeat (int): Measurements per program, the best one is reported.
+    """
+    # the recursive-descent parser needs a few frames per nesting level
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+    print(f"{'program':<24}{'size':>8}{'recursive':>12}{'iterative':>12}")
+    for generator, depths in (
+        (nested_if_true, (25, 50, 100, 200, 5000)),
+        (nested_if_false, (25, 50, 100, 200, 5000)),
+        (nested_if_both, (4, 6, 8, 10)),
+    ):
+        for depth in depths:
+            program = generator(depth)
+            line = f"{generator.__name__ + f'({depth})':<24}{len(program):>8}"
+            try:
+                recursive = timed(lambda: JustifParser().parse_expression(program), repeat)
+                line += f"{recursive * 1000:>10.2f}ms"
+            except RecursionError:
+                line += f"{'recursion':>12}"
+            iterative = timed(lambda: JustifParser(iterative=True).parse_expression(program), repeat)
+            print(line + f"{iterative * 1000:>10.2f}ms")
+
+
+def bench_loading(runs: int, repeat: int) -> None:
+    """Compare parsing the example programs with loading their serialized images.
+
+    Args:
+        runs (int): Loads per measurement.
+        repeat (int): Measurements per program, the best one is reported.
+    """
+    print(f"{'program':<20}{'source':>8}{'image':>8}{'parse':>12}{'load':>12}")
+    for filename in sorted(glob.glob(os.path.join(HERE, "*.justif"))):
+        with open(filename, "r", encoding="utf-8") as f:
+            source = f.read()
+        image = dump_program(JustifParser().parse_expression(source))
+        parse = timed(lambda: [JustifParser(iterative=True).parse_expression(source) for _ in range(runs)], repeat)
+        load = timed(lambda: [load_program(image) for _ in range(runs)], repeat)
+        name = os.path.basename(filename)
+        print(f"{name:<20}{len(source):>8}{len(image):>8}{parse * 1000:>10.1f}ms{load * 1000:>10.1f}ms  {parse / load:.1f}x faster")
+
+
+def bench_memoization(runs: int, repeat: int) -> None:
+    """Compare the tree-walker with and without memoized calls on a naively recursive program.
+
+    Args:
+        runs (int): Program runs per measurement.
+        repeat (int): Measurements per engine, the best one is reported.
+    """
+    program = JustifParser().parse_expression(NAIVE_FIBONACCI)
+    plain = timed(lambda: run_engine("tree", program, runs), repeat)
+    memoized = timed(lambda: run_engine("tree", program, runs, MemoizingExecutionContext), repeat)
+    print(f"{'naive fibonacci':<20}{plain * 1000:>10.1f}ms{memoized * 1000:>10.1f}ms  {plain / memoized:.1f}x faster")
+
+
+def bench_batch(runs: int, repeat: int) -> None:
+    """Compare running atoi on many numbers one by one, parsing it every time like `justif.main`,
+    with `run_batch` in this process and in worker processes.
+
+    Args:
+        runs (int): Numbers per measurement.
+        repeat (int): Measurements per variant, the best one is reported.
+    """
+    with open(os.path.join(HERE, "atoi.justif"), "r", encoding="utf-8") as f:
+        source = f.read()
+    # index 3 is the conversion loop; index 1 would overwrite the number with its own
+    numbers = [BatchRun({2: str(n), 0: 0, 1: 0}) for n in range(runs)]
+
+    def one_by_one():
+        for batch_run in numbers:
+            context = ExecutionContext({0: 0, 1: 0, 2: encode_string(batch_run.cells[2])})
+            context.root_sequence = JustifParser(iterative=True).parse_expression(source)
+            ENGINES["tree"](context, 3)
+
+    program = JustifParser(iterative=True).parse_expression(source)
+    single = timed(one_by_one, repeat)
+    batch = timed(lambda: list(run_batch(program, numbers, index=3)), repeat)
+    pooled = timed(lambda: list(run_batch(program, numbers, index=3, jobs=os.cpu_count() or 1)), repeat)
+    print(f"{'one by one':<20}{single * 1000:>10.1f}ms")
+    print(f"{'run_batch':<20}{batch * 1000:>10.1f}ms  {single / batch:.1f}x faster")
+    print(f"{'run_batch, pool':<20}{pooled * 1000:>10.1f}ms  {single / pooled:.1f}x faster")
+
+
+def bench_threads(runs: int, repeat: int) -> None:
+    """Run one shared `Program` from a growing number of threads, each run with its own context.
+
+    The total number of runs stays the same, so on a free-threaded build the time should
+    drop with the number of threads; with the GIL it stays flat at best.
+
+    Args:
+        runs (int): Program runs per measurement, split over the threads.
+        repeat (int): Measurements per thread count, the best one is reported.
+    """
+    with open(os.path.join(HERE, "fibonacci.justif"), "r", encoding="utf-8") as f:
+        program = Program.parse(f.read())
+    assert program is not None
+
+    def worker(count: int) -> None:
+        for _ in range(count):
+            program.run(1, output=OutputSink(io.BytesIO()), input_source=InputSource(b""))
+
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"GIL {'enabled' if gil else 'disabled'}, {os.cpu_count()} CPUs")
+    print(f"{'threads':<20}{'time':>12}{'speedup':>10}")
+    baseline = None
+    for threads in (1, 2, 4, 8):
+        with ThreadPoolExecutor(threads) as executor:
+            seconds = timed(lambda: list(executor.map(worker, [runs // threads] * threads)), repeat)
+        baseline = baseline or seconds
+        print(f"{threads:<20}{seconds * 1000:>10.1f}ms{baseline / seconds:>9.1f}x")
+
+
+def bench_async(runs: int, repeat: int) -> None:
+    """Compare running a program many times in a row with running all of them concurrently
+    in one event loop with `execute_async`, for a few slice sizes.
+
+    Args:
+        runs (int): Program runs per measurement.
+        repeat (int): Measurements per variant, the best one is reported.
+    """
+    with open(os.path.join(HERE, "fibonacci.justif"), "r", encoding="utf-8") as f:
+        program = Program.parse(f.read(), "stackless")
+    assert program is not None
+
+    async def discard(data: bytes) -> None:
+        pass
+
+    async def concurrently(slice_steps: int) -> None:
+        contexts = [program.context(output=AsyncOutputSink(discard), input_source=InputSource(b"")) for _ in range(runs)]
+        await asyncio.gather(*(execute_async(context, 1, slice_steps) for context in contexts))
+
+    sequential = timed(
+        lambda: [program.run(1, output=OutputSink(io.BytesIO()), input_source=InputSource(b"")) for _ in range(runs)], repeat
+    )
+    print(f"{'sequential':<20}{sequential * 1000:>10.1f}ms")
+    for slice_steps in (10, 100, 1000):
+        seconds = timed(lambda: asyncio.run(concurrently(slice_steps)), repeat)
+        print(f"{f'async, {slice_steps} steps':<20}{seconds * 1000:>10.1f}ms  {seconds / sequential:.1f}x the time")
+
+
+def bench_snapshot(runs: int, repeat: int) -> None:
+    """Compare running hello2 from the start with resuming it from a snapshot taken after its
+    `~1` initialization, with each engine.
+
+    Args:
+        runs (int): Program runs per measurement.
+        repeat (int): Measurements per engine, the best one is reported.
+    """
+    with open(os.path.join(HERE, "hello2.justif"), "r", encoding="utf-8") as f:
+        source = f.read()
+    print(f"{'engine':<20}{'full':>12}{'resumed':>12}")
+    for engine in (engine for engine in ENGINES if engine != "traced"):
+        program = Program.parse(source, engine)
+        assert program is not None
+        snapshot = MemorySnapshot.capture(program, 2, input_source=InputSource(b""))
+        full = timed(lambda: [program.run(1, output=OutputSink(io.BytesIO())) for _ in range(runs)], repeat)
+        resumed = timed(lambda: [snapshot.resume(output=OutputSink(io.BytesIO())) for _ in range(runs)], repeat)
+        print(f"{engine:<20}{full * 1000:>10.1f}ms{resumed * 1000:>10.1f}ms  {full / resumed:.1f}x faster")
+
+
+def main(runs: int = 200, repeat: int = 3):
+    """Run all benchmarks.
+
+    Args:
+        runs (int, optional): Program runs per measurement. Defaults to 200.
+        repeat (int, optional): Measurements per benchmark. Defaults to 3.
+    """
+    # same logger setup as justif.main without --debug
+    logger.remove()
+    logger.add(sys.stderr, level="INFO")
+    print("# engines")
+    bench_engines(runs, repeat)
+    print("# logging")
+    bench_logging(runs, repeat)
+    print("# parser")
+    bench_parser(repeat)
+    print("# loading")
+    bench_loading(runs, repeat)
+    print("# memoization")
+    bench_memoization(max(1, runs // 20), repeat)
+    print("# batch")
+    bench_batch(runs * 50, repeat)
+    print("# threads")
+    bench_threads(runs * 8, repeat)
+    print("# async")
+    bench_async(runs * 5, repeat)
+    print("# snapshots")
+    bench_snapshot(runs * 5, repeat)
+
+
+if __name__ == "__main__":
+    typer.run(main)
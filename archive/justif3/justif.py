@@ -2,10 +2,30 @@
 """_summary_"""
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import inspect
+import io
+import marshal
+import mmap
+import operator
+import os
+import py_compile
+import re
 import sys
+import time
+import traceback
 from abc import ABC, abstractmethod
+from array import array
+from collections import ChainMap, OrderedDict, deque
+from collections.abc import Awaitable, Iterable, Iterator, Mapping, MutableMapping, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor
+from enum import IntEnum
+from functools import partial
+from itertools import batched
 from pprint import pformat
-from typing import Final
+from types import MappingProxyType
+from typing import BinaryIO, Callable, Final
 
 import typer
 from loguru import logger
@@ -47,75 +67,340 @@ class Address:
             return f"IndirectAddress({self.address})"
 
 
+CellReader = Callable[[MutableMapping], int]
+"""Reads the value at an effective address from the raw cell storage."""
+
+CellWriter = Callable[[MutableMapping, "int | list[int]"], None]
+"""Writes a value to an effective address in the raw cell storage."""
+
+
 class EffectiveAddress:
-    """An effective address in memory, which consists of a base address and an optional offset."""
+    """An effective address in memory, which consists of a base address and an optional offset.
+
+    The addressing mode is resolved once, on construction, into a specialized `read` and
+    `write` function, so accessing memory does not need to re-check it. With `checked=False`
+    they also skip the type assertions, for addresses `CellTypes` has proven safe.
+    """
 
-    def __init__(self, address: Address, offset: Address | None = None):
+    def __init__(self, address: Address, offset: Address | None = None, checked: bool = True):
         self.address: Final[Address] = address
         """The base address in memory."""
         self.offset: Final[Address | None] = offset
         """An optional offset to the base address, which can be another EffectiveAddress."""
+        self.checked: Final[bool] = checked
+        """False if the accessors skip the type assertions."""
+        self.read: Final[CellReader] = (
+            self.__build_reader(address, offset) if checked else self.__build_unchecked_reader(address, offset)
+        )
+        """Reads the value at this address from the raw cell storage."""
+        self.write: Final[CellWriter] = (
+            self.__build_writer(address) if checked else self.__build_unchecked_writer(address)
+        )
+        """Writes a value to this address in the raw cell storage."""
 
     def __repr__(self):
+        unchecked = "" if self.checked else ", checked=False"
         if self.offset is None:
-            return f"EffectiveAddress({self.address})"
+            return f"EffectiveAddress({self.address}{unchecked})"
         else:
-            return f"EffectiveAddress({self.address}, offset={self.offset})"
+            return f"EffectiveAddress({self.address}, offset={self.offset}{unchecked})"
 
-class Memory:
-    """A simple memory class to store and retrieve values."""
+    def __reduce__(self):
+        # the accessors are closures, rebuild them instead of pickling them
+        return EffectiveAddress, (self.address, self.offset, self.checked)
 
-    def __init__(self):
-        self.__ram: dict[int, int | list[int]] = {}
-        """Our very strange multi-dimensional memory."""
+    @staticmethod
+    def __build_unchecked_reader(address: Address, offset: Address | None) -> CellReader:
+        """Build a reader like `__build_reader` does, but without any type assertion.
 
-    def read_ea(self, ea: EffectiveAddress) -> int:
-        """_summary_
+        Args:
+            address (Address): The base address.
+            offset (Address | None): The optional offset.
+
+        Returns:
+            CellReader: A function reading the value from the raw cell storage.
+        """
+        base = address.address
+        if offset is None:
+            if address.direct:
+                return lambda cells: cells.setdefault(base, 0)
+            return lambda cells: cells.setdefault(cells[base], 0)
+        index = offset.address
+        if offset.direct:
+            if address.direct:
+                return lambda cells: cells.setdefault(base, 0)[index]
+            return lambda cells: cells.setdefault(cells[base], 0)[index]
+        if address.direct:
+            return lambda cells: cells.setdefault(base, 0)[cells.setdefault(index, 0)]
+        return lambda cells: cells.setdefault(cells[base], 0)[cells.setdefault(index, 0)]
+
+    @staticmethod
+    def __build_unchecked_writer(address: Address) -> CellWriter:
+        """Build a writer like `__build_writer` does, but without any type assertion.
 
         Args:
-            index (list): _description_
+            address (Address): The base address.
 
         Returns:
-            int: _description_
+            CellWriter: A function writing a value to the raw cell storage.
         """
-        logger.debug("MEMORY: GET {!r}", ea)
-        first_address: int = 0
+        base = address.address
+        if address.direct:
+
+            def write_direct(cells: MutableMapping, value: int | list[int]) -> None:
+                cells[base] = value
+
+            return write_direct
+
+        def write_indirect(cells: MutableMapping, value: int | list[int]) -> None:
+            cells[cells[base]] = value
+
+        return write_indirect
+
+    @staticmethod
+    def __build_reader(address: Address, offset: Address | None) -> CellReader:
+        """Build the reader for an addressing mode.
+
+        The reader behaves like the original `Memory.read_ea`: unknown direct cells are
+        created with 0, an indirect base cell must already exist.
+
+        Args:
+            address (Address): The base address.
+            offset (Address | None): The optional offset.
+
+        Returns:
+            CellReader: A function reading the value from the raw cell storage.
+        """
+        base = address.address
+
+        if offset is None:
+            if address.direct:
+
+                def read_direct(cells: MutableMapping) -> int:
+                    value = cells.setdefault(base, 0)
+                    assert isinstance(value, int), "Effective address must have an offset"
+                    return value
+
+                return read_direct
+
+            def read_indirect(cells: MutableMapping) -> int:
+                first = cells[base]
+                assert isinstance(first, int), "Offset must be an int"
+                value = cells.setdefault(first, 0)
+                assert isinstance(value, int), "Effective address must have an offset"
+                return value
+
+            return read_indirect
+
+        index = offset.address
+        if offset.direct:
+
+            def read_element(cells: MutableMapping, first: int) -> int:
+                value = cells.setdefault(first, 0)
+                assert not isinstance(value, int), "Effective address must not have an offset"
+                return value[index]
 
-        if ea.address.indirect:
-            temp_value = self.__ram[ea.address.address]
-            assert isinstance(temp_value, int)
-            first_address = temp_value
         else:
-            first_address = ea.address.address
-        assert isinstance(first_address, int), "Offset must be an int"
 
-        if first_address not in self.__ram:
-            self.__ram[first_address] = 0
+            def read_element(cells: MutableMapping, first: int) -> int:
+                value = cells.setdefault(first, 0)
+                assert not isinstance(value, int), "Effective address must not have an offset"
+                position = cells.setdefault(index, 0)
+                assert isinstance(position, int), "Effective address must have an offset"
+                return value[position]
 
-        temp_result = self.__ram[first_address]
-        actual_result: int = 0
+        if address.direct:
+            return lambda cells: read_element(cells, base)
+        return lambda cells: read_element(cells, cells[base])
 
-        if isinstance(temp_result, list):
-            assert ea.offset is not None, "Effective address must have an offset"
+    @staticmethod
+    def __build_writer(address: Address) -> CellWriter:
+        """Build the writer for an addressing mode. Like the reader, it ignores the offset:
+        a write always replaces the whole base cell.
 
-            if ea.offset.direct:
-                actual_result = temp_result[ea.offset.address]
+        Args:
+            address (Address): The base address.
 
-            else:
-                # one more level of indirection
-                temp_ea = EffectiveAddress(Address(ea.offset.address, direct=True))
-                actual_result = temp_result[self.read_ea(temp_ea)]
+        Returns:
+            CellWriter: A function writing a value to the raw cell storage.
+        """
+        base = address.address
+        if address.direct:
+
+            def write_direct(cells: MutableMapping, value: int | list[int]) -> None:
+                cells[base] = value
+
+            return write_direct
+
+        def write_indirect(cells: MutableMapping, value: int | list[int]) -> None:
+            first = cells[base]
+            assert isinstance(first, int), "Offset must be an int"
+            cells[first] = value
+
+        return write_indirect
+
+
+def to_block(values: list[int]) -> bytearray | array:
+    """Store the contents of a string or array cell compactly.
+
+    Args:
+        values (list[int]): The elements of the cell.
+
+    Returns:
+        bytearray | array: A bytearray if all elements are bytes, an array('q') otherwise.
+    """
+    if all(0 <= value < 256 for value in values):
+        return bytearray(values)
+    return array("q", values)
+
+
+def encode_string(text: str) -> bytes | tuple[int, ...]:
+    """Encode a string literal as the value of a cell: its code points and a terminating 0.
+
+    The result is immutable, so a cell can share it with the instruction that stored it;
+    writes always replace a whole cell, never an element, so nothing ever needs to copy it.
+
+    Args:
+        text (str): The string literal.
+
+    Returns:
+        bytes | tuple[int, ...]: bytes if all code points are below 256, a tuple otherwise.
+    """
+    encoded = [ord(c) for c in text] + [0]
+    if all(value < 256 for value in encoded):
+        return bytes(encoded)
+    return tuple(encoded)
+
+
+class DenseCells(MutableMapping):
+    """Cell storage for programs working over large, mostly contiguous memory.
+
+    Scalar cells at low addresses live in a growable array('q'), string and array cells
+    are kept as compact blocks (see `to_block`), and only cells at sparse high or negative
+    addresses, or integers beyond 64 bits, fall back to a dict.
+    """
+
+    __MISSING: Final[int] = 0
+    __SCALAR: Final[int] = 1
+    __OBJECT: Final[int] = 2
+
+    def __init__(self, dense_limit: int = 1 << 24):
+        self.__values: array = array("q")
+        """Values of the scalar cells in the dense range."""
+        self.__kinds: bytearray = bytearray()
+        """For each dense cell: missing, scalar or object."""
+        self.__objects: dict[int, object] = {}
+        """Blocks and big integers in the dense range."""
+        self.__sparse: dict[int, object] = {}
+        """Cells outside the dense range."""
+        self.__dense_limit: Final[int] = dense_limit
+        """Addresses at or above this are never stored densely."""
+
+    def __grow(self, address: int) -> bool:
+        """Extend the dense range to cover `address`, unless that would make it mostly empty.
+
+        Args:
+            address (int): The address to cover.
 
+        Returns:
+            bool: True if `address` is now in the dense range.
+        """
+        size = len(self.__kinds)
+        if address < 0 or address >= self.__dense_limit or address > 2 * size + 1024:
+            return False
+        new_size = min(max(address + 1, 2 * size), self.__dense_limit)
+        self.__values.frombytes(bytes(self.__values.itemsize * (new_size - size)))
+        self.__kinds.extend(bytes(new_size - size))
+        for sparse_address in [a for a in self.__sparse if size <= a < new_size]:
+            self[sparse_address] = self.__sparse.pop(sparse_address)
+        return True
+
+    def __getitem__(self, address: int):
+        if 0 <= address < len(self.__kinds):
+            kind = self.__kinds[address]
+            if kind == self.__SCALAR:
+                return self.__values[address]
+            if kind == self.__OBJECT:
+                return self.__objects[address]
+            raise KeyError(address)
+        return self.__sparse[address]
+
+    def __setitem__(self, address: int, value) -> None:
+        if isinstance(value, list):
+            value = to_block(value)
+        if address >= len(self.__kinds) and not self.__grow(address):
+            self.__sparse[address] = value
+            return
+        if address < 0:
+            self.__sparse[address] = value
+        elif isinstance(value, int) and -(1 << 63) <= value < (1 << 63):
+            self.__values[address] = value
+            if self.__kinds[address] == self.__OBJECT:
+                del self.__objects[address]
+            self.__kinds[address] = self.__SCALAR
         else:
-            assert ea.offset is None, "Effective address must not have an offset"
-            assert isinstance(
-                temp_result, int
-            ), "Expected an int for the first part of the index"
-            actual_result = temp_result
+            self.__objects[address] = value
+            self.__kinds[address] = self.__OBJECT
+
+    def __delitem__(self, address: int) -> None:
+        if 0 <= address < len(self.__kinds):
+            if self.__kinds[address] == self.__MISSING:
+                raise KeyError(address)
+            self.__objects.pop(address, None)
+            self.__kinds[address] = self.__MISSING
+        else:
+            del self.__sparse[address]
 
-        assert isinstance(actual_result, int), "Expected an int as the result"
-        logger.debug("MEMORY: GET {!r} RETURNS {}", ea, actual_result)
-        return actual_result
+    def __contains__(self, address: object) -> bool:
+        if isinstance(address, int) and 0 <= address < len(self.__kinds):
+            return self.__kinds[address] != self.__MISSING
+        return address in self.__sparse
+
+    def __iter__(self):
+        for address, kind in enumerate(self.__kinds):
+            if kind != self.__MISSING:
+                yield address
+        yield from self.__sparse
+
+    def __len__(self) -> int:
+        return len(self.__kinds) - self.__kinds.count(self.__MISSING) + len(self.__sparse)
+
+    def get(self, address: int, default=None):
+        try:
+            return self[address]
+        except KeyError:
+            return default
+
+    def setdefault(self, address: int, default=None):
+        try:
+            return self[address]
+        except KeyError:
+            self[address] = default
+            return default
+
+
+class Memory:
+    """A simple memory class to store and retrieve values."""
+
+    def __init__(self, cells: MutableMapping | None = None):
+        self.__ram: MutableMapping = {} if cells is None else cells
+        """Our very strange multi-dimensional memory: a dict, or a `DenseCells` for large buffers."""
+
+    @property
+    def cells(self) -> MutableMapping:
+        """The raw cell storage, for backends that resolve addressing modes ahead of time."""
+        return self.__ram
+
+    def read_ea(self, ea: EffectiveAddress) -> int:
+        """_summary_
+
+        Args:
+            index (list): _description_
+
+        Returns:
+            int: _description_
+        """
+        return ea.read(self.__ram)
 
     def write_ea(self, ea: EffectiveAddress, value: int | list[int]) -> int:
         """_summary_
@@ -127,37 +412,300 @@ class Memory:
         Returns:
             int: _description_
         """
+        ea.write(self.__ram, value)
+        return 0
+
+
+class TracedMemory(Memory):
+    """Memory that logs every access. Only used by the traced engine, see `execute_traced`."""
+
+    def read_ea(self, ea: EffectiveAddress) -> int:
+        logger.debug("MEMORY: GET {!r}", ea)
+        actual_result = super().read_ea(ea)
+        logger.debug("MEMORY: GET {!r} RETURNS {}", ea, actual_result)
+        return actual_result
+
+    def write_ea(self, ea: EffectiveAddress, value: int | list[int]) -> int:
         logger.debug("MEMORY: SET {!r}={!r}", ea, value)
+        return super().write_ea(ea, value)
+
+
+class IndexDispatch:
+    """A jump table for a root sequence of the form `~1 ? ... : ~2 ? ... : ...`.
+
+    Practically every program starts with such a chain of index checks, so without the
+    table every recursion would test `index == N` for each "function" until it hits.
+    """
+
+    def __init__(self, table: dict[int, list[Instruction]], fallback: list[Instruction]):
+        self.table: Final[dict[int, list[Instruction]]] = table
+        """The instructions to run for each constant index."""
+        self.fallback: Final[list[Instruction]] = fallback
+        """The rest of the chain, run for all indices not in the table."""
+
+    def __repr__(self):
+        return f"IndexDispatch(table={self.table!r}, fallback={self.fallback!r})"
+
+    @staticmethod
+    def build(root_sequence: list[Instruction]) -> IndexDispatch | None:
+        """Recognize a chain of constant index checks at the start of the root sequence.
+
+        `~_` and `~$` are already resolved to constants by the parser. The chain ends at
+        the first branch that is not a single constant index check, e.g. `~.0 ? ...`;
+        everything from there on becomes the fallback.
+
+        Args:
+            root_sequence (list[Instruction]): The root sequence of the program.
+
+        Returns:
+            IndexDispatch | None: The jump table, or None if the program does not start with a chain.
+        """
+        table: dict[int, list[Instruction]] = {}
+        sequence = root_sequence
+        while (
+            len(sequence) == 1
+            and isinstance(sequence[0], IfInstruction)
+            and isinstance(sequence[0].condition, CheckIndexInstruction)
+            and isinstance(sequence[0].condition.value, int)
+        ):
+            # the chain tests in order, so the first branch for an index wins
+            table.setdefault(sequence[0].condition.value, sequence[0].if_true)
+            sequence = sequence[0].if_false
+        if not table:
+            return None
+        return IndexDispatch(table, sequence)
+
+    def lookup(self, index: int) -> list[Instruction]:
+        """Get the instructions to run for an index.
+
+        Args:
+            index (int): The index the program is called with.
+
+        Returns:
+            list[Instruction]: The matching branch of the chain.
+        """
+        return self.table.get(index, self.fallback)
 
-        assert isinstance(
-            ea, EffectiveAddress
-        ), "Effective address must be an instance of EffectiveAddress"
 
-        # target type is either an int
-        assert isinstance(value, int) or isinstance(
-            value, list
-        ), "Value must be an int or a list of ints"
+class OutputSink:
+    """Collects program output in a bytearray and writes it out in large chunks.
 
-        if not ea.address.direct:
-            offset = self.__ram[ea.address.address]
+    The buffer is flushed when it reaches `threshold` bytes, when `flush` is called, and
+    by whoever runs the program once it has finished.
+    """
+
+    def __init__(self, target: int | BinaryIO | None = None, threshold: int = 1 << 16):
+        self.target: Final[int | BinaryIO | None] = target
+        """A binary file descriptor, a binary stream such as io.BytesIO, or None for sys.stdout."""
+        self.threshold: Final[int] = threshold
+        """Buffer size at which the output is flushed, 0 to flush on every write."""
+        self.buffer: Final[bytearray] = bytearray()
+        """Output that has not been flushed yet."""
+
+    def write_char(self, value: int) -> None:
+        """Write a value as a character, encoded as UTF-8.
+
+        Args:
+            value (int): The code point.
+        """
+        if 0 <= value < 128:
+            self.buffer.append(value)
         else:
-            offset = ea.address.address
+            self.buffer += chr(value).encode("utf-8")
+        if len(self.buffer) >= self.threshold:
+            self.flush()
 
-        assert isinstance(value, int) or isinstance(value, list)
-        assert isinstance(offset, int), "Offset must be an int"
+    def write_integer(self, value: int) -> None:
+        """Write a value as a decimal number on a line of its own.
 
-        self.__ram[offset] = value
-        logger.debug("MEMORY: ACTUALLY, SET self.__ram[{!r}]={!r}", offset, value)
-        return 0
+        Args:
+            value (int): The number.
+        """
+        self.buffer += b"%d\n" % value
+        if len(self.buffer) >= self.threshold:
+            self.flush()
+
+    def write(self, data: bytes) -> None:
+        """Write raw, already encoded output.
+
+        Args:
+            data (bytes): The output.
+        """
+        self.buffer += data
+        if len(self.buffer) >= self.threshold:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write all buffered output to the target."""
+        if not self.buffer:
+            return
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        if isinstance(self.target, int):
+            view = memoryview(data)
+            while view:
+                view = view[os.write(self.target, view) :]
+        elif self.target is not None:
+            self.target.write(data)
+            self.target.flush()
+        elif hasattr(sys.stdout, "buffer"):
+            sys.stdout.flush()
+            sys.stdout.buffer.write(data)
+            sys.stdout.buffer.flush()
+        else:
+            # sys.stdout has been replaced by a text stream, e.g. by contextlib.redirect_stdout
+            sys.stdout.write(data.decode("utf-8"))
+
+
+class InputSource:
+    """Feeds `<` instructions one character at a time from a buffered source.
+
+    Streams are read in chunks of `chunk_size` bytes, so even multi-megabyte inputs only
+    cost one system call per chunk. Bytes and mmap'd files are indexed directly.
+    """
+
+    def __init__(self, source: BinaryIO | bytes | mmap.mmap | None = None, chunk_size: int = 1 << 16):
+        self.__stream: BinaryIO | None = None
+        """The stream to refill the buffer from, None for in-memory sources."""
+        self.__buffer: bytes | mmap.mmap = b""
+        self.__pos: int = 0
+        self.__chunk_size: Final[int] = chunk_size
+        if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+            self.__buffer = source if isinstance(source, mmap.mmap) else bytes(source)
+        else:
+            self.__stream = sys.stdin.buffer if source is None else source
+
+    @staticmethod
+    def from_file(filename: str, use_mmap: bool = False) -> InputSource:
+        """Create an input source reading from a file.
+
+        Args:
+            filename (str): The file to read.
+            use_mmap (bool, optional): Map the file into memory instead of reading it in chunks. Defaults to False.
+
+        Returns:
+            InputSource: The input source.
+        """
+        if not use_mmap:
+            return InputSource(open(filename, "rb"))  # pylint: disable=consider-using-with
+        with open(filename, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # empty files cannot be mapped
+                return InputSource(b"")
+            return InputSource(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def read_byte(self) -> int:
+        """Read the next byte.
+
+        Returns:
+            int: The byte, or -1 at the end of the input.
+        """
+        if self.__pos < len(self.__buffer):
+            value = self.__buffer[self.__pos]
+            self.__pos += 1
+            return value
+        if self.__stream is None:
+            return -1
+        # read1 returns what is available instead of blocking until the chunk is full
+        read = getattr(self.__stream, "read1", self.__stream.read)
+        self.__buffer = read(self.__chunk_size)
+        self.__pos = 0
+        if not self.__buffer:
+            return -1
+        self.__pos = 1
+        return self.__buffer[0]
+
+    def read_char(self) -> int:
+        """Read the next UTF-8 encoded character, the counterpart of `OutputSink.write_char`.
+
+        Returns:
+            int: The code point, U+FFFD for a malformed sequence, or -1 at the end of the input.
+        """
+        value = self.read_byte()
+        if value < 0x80:
+            return value
+        if 0xC2 <= value < 0xE0:
+            length, value = 1, value & 0x1F
+        elif 0xE0 <= value < 0xF0:
+            length, value = 2, value & 0x0F
+        elif 0xF0 <= value < 0xF5:
+            length, value = 3, value & 0x07
+        else:
+            return 0xFFFD
+        for _ in range(length):
+            continuation = self.read_byte()
+            if continuation < 0:
+                return 0xFFFD
+            if continuation & 0xC0 != 0x80:
+                # not part of this character, leave it for the next read
+                self.__pos -= 1
+                return 0xFFFD
+            value = value << 6 | continuation & 0x3F
+        return value
 
 
 class ExecutionContext(Memory):
     """_summary_"""
 
-    def __init__(self):
-        super().__init__()
+    def __init__(
+        self,
+        cells: MutableMapping | None = None,
+        output: OutputSink | None = None,
+        input_source: InputSource | None = None,
+    ):
+        super().__init__(cells)
+        self.output: OutputSink = OutputSink() if output is None else output
+        """Where the program output goes, flushed by whoever runs the program."""
+        self.input: InputSource = InputSource() if input_source is None else input_source
+        """Where `<` instructions read from; stdin by default."""
         self.current_index: int = 0
-        self.root_sequence: list[Instruction] = []
+        self.__root_sequence: list[Instruction] = []
+        self.dispatch: IndexDispatch | None = None
+        """Jump table for the root sequence, if it starts with a chain of index checks."""
+
+    @property
+    def root_sequence(self) -> list[Instruction]:
+        """The program. Setting it replaces common loops, see `recognize_idioms`, rewrites its
+        tail calls, see `mark_tail_calls`, and builds the jump table for its index checks."""
+        return self.__root_sequence
+
+    @root_sequence.setter
+    def root_sequence(self, root_sequence: list[Instruction]) -> None:
+        self.__root_sequence = mark_tail_calls(recognize_idioms(root_sequence))
+        self.dispatch = IndexDispatch.build(self.__root_sequence)
+
+    def share_program(self, program: Program) -> None:
+        """Run a prepared program, without rewriting it and building its jump table again.
+
+        Args:
+            program (Program): The program, which this context does not modify.
+        """
+        self.__root_sequence = program.root_sequence
+        self.dispatch = program.dispatch
+
+    def entry_point(self, index: int) -> list[Instruction]:
+        """Get the instructions a call with `index` runs.
+
+        Args:
+            index (int): The index the program is called with.
+
+        Returns:
+            list[Instruction]: The matching jump table entry, or the whole root sequence.
+        """
+        if self.dispatch is None:
+            return self.__root_sequence
+        return self.dispatch.lookup(index)
+
+    def call(self, index: int) -> int:
+        """Run a recursion of the tree-walking interpreter, see `execute_call`.
+
+        Args:
+            index (int): The index the program calls itself with.
+
+        Returns:
+            int: The result of the call.
+        """
+        return execute_call(self, index)
 
 
 class Instruction(ABC):
@@ -188,7 +736,7 @@ class Instruction(ABC):
             case int():
                 return data
             case str():
-                return list([ord(c) for c in data]) + [0]
+                return encode_string(data)
             case EffectiveAddress():
                 return context.read_ea(data)
             case _ if isinstance(data, Instruction):
@@ -213,16 +761,28 @@ class IfInstruction(Instruction):
     def __repr__(self):
         return f"IfInstruction(addres={self.__address!r}, if_true:\n{pformat(self.__instructions_if_true)},\nif_false:\n{pformat(self.__instructions_if_false)})"
 
+    @property
+    def condition(self) -> EffectiveAddress | Instruction:
+        """The condition: either a memory cell or an instruction whose result is tested."""
+        return self.__address
+
+    @property
+    def if_true(self) -> list[Instruction]:
+        """Instructions executed if the condition is true."""
+        return self.__instructions_if_true
+
+    @property
+    def if_false(self) -> list[Instruction]:
+        """Instructions executed if the condition is false."""
+        return self.__instructions_if_false
+
     def execute(self, context: ExecutionContext, index: int) -> int:
         if isinstance(self.__address, Instruction):
             result = self.__address.execute(context, index)
         else:
             ea = self.__address
             assert ea is not None
-            # logger.critical("would be using ea: {}", ea)
-            # logger.critical("but actually is using address: {}", self.__address)
             result = context.read_ea(ea)
-        logger.debug("IF-Expression is {}", result)
         if result:
             return execute_instructions(self.__instructions_if_true, context, index)
         else:
@@ -238,6 +798,11 @@ class CheckIndexInstruction(Instruction):
     def __repr__(self):
         return f"CheckIndexInstruction(value={self.__value!r})"
 
+    @property
+    def value(self) -> int | EffectiveAddress:
+        """The index to compare against, either a constant or a memory cell."""
+        return self.__value
+
     def execute(self, context: ExecutionContext, index: int) -> int:
         """execute the constant instruction.
 
@@ -259,6 +824,11 @@ class ConstantInstruction(Instruction):
     def __repr__(self):
         return f"ConstantInstruction(value={self.__value!r})"
 
+    @property
+    def value(self) -> int:
+        """The constant value."""
+        return self.__value
+
     def execute(self, context: ExecutionContext, index: int) -> int:
         """execute the constant instruction.
 
@@ -281,13 +851,26 @@ class InputInstruction(Instruction):
     def __repr__(self):
         return f"InputInstruction(index={self.__address!r})"
 
+    @property
+    def address(self) -> EffectiveAddress:
+        """Address at which to store the input value."""
+        return self.__address
+
     def execute(self, context: ExecutionContext, index: int) -> int:
-        """execute the input instruction.
+        """execute the input instruction: read one character into the cell, or 0 at the end of the input.
 
         Args:
             index (int): *ignored*
+
+        Returns:
+            int: 1 if a character was read, 0 at the end of the input.
         """
-        raise RuntimeError("Not implemented yet")
+        value = context.input.read_char()
+        if value < 0:
+            context.write_ea(self.__address, 0)
+            return 0
+        context.write_ea(self.__address, value)
+        return 1
 
 
 class RecurseInstruction(Instruction):
@@ -300,6 +883,11 @@ class RecurseInstruction(Instruction):
     def __repr__(self):
         return f"RecurseInstruction(index={self.__index!r})"
 
+    @property
+    def index(self) -> int:
+        """The index the program calls itself with."""
+        return self.__index
+
     def execute(self, context: ExecutionContext, index: int) -> int:
         """_summary_
 
@@ -309,87 +897,541 @@ class RecurseInstruction(Instruction):
         Returns:
             _type_: _description_
         """
-        logger.debug("Call self recursively with index {}", self.__index)
-        return execute_instructions(context.root_sequence, context, self.__index)
+        return context.call(self.__index)
 
 
-class OutputCharInstruction(Instruction):
-    """A class to represent a char output instruction in the Justif language."""
+class TailCallInstruction(RecurseInstruction):
+    """A recursion whose result is the result of the whole call it appears in, see `mark_tail_calls`.
 
-    def __init__(self, address: EffectiveAddress):
-        self.__address = address
+    Instead of recursing, it hands itself back up through the enclosing sequences and ifs,
+    and `execute_call` jumps back to the dispatch point with the new index. All other
+    engines treat it like any other `RecurseInstruction`.
+    """
 
     def __repr__(self):
-        return f"OutputCharInstruction(value={self.__address!r})"
+        return f"TailCallInstruction(index={self.index!r})"
 
-    def execute(self, context: ExecutionContext, index: int) -> int:
-        """_summary_
+    def execute(self, context: ExecutionContext, index: int) -> TailCallInstruction:  # type: ignore[override]
+        """Return the tail call itself, to be run by `execute_call`.
 
         Args:
             index (int): *ignored*
 
         Returns:
-            int: returns 1 always, indicating successful execution.
+            TailCallInstruction: self.
         """
-        sys.stdout.write(chr(context.read_ea(self.__address)))
-        return 1
+        return self
 
 
-class OutputIntegerInstruction(Instruction):
-    """A class to represent a char output instruction in the Justif language."""
+def mark_tail_calls(root_sequence: list[Instruction]) -> list[Instruction]:
+    """Rewrite every recursion in tail position into a `TailCallInstruction`.
 
-    def __init__(self, address: EffectiveAddress):
-        self.__address = address
+    A recursion is in tail position if it is the last instruction of the root sequence, or
+    of a branch of an if that is itself in tail position. Its result is then the result of
+    the whole call, so nothing is left to do after it. The tail positions form a spine
+    through the tree; only the ifs on that spine are rebuilt, everything else is shared
+    with the input. The spine is walked with an explicit stack, so it can be as deep as a
+    long chain of index checks.
+
+    Args:
+        root_sequence (list[Instruction]): The root sequence of the program.
+
+    Returns:
+        list[Instruction]: The rewritten root sequence.
+    """
+    results: list[list[Instruction]] = []
+    stack: list[tuple[list[Instruction], bool]] = [(root_sequence, False)]
+    while stack:
+        sequence, expanded = stack.pop()
+        last = sequence[-1] if sequence else None
+        if isinstance(last, IfInstruction):
+            if not expanded:
+                stack.append((sequence, True))
+                stack.extend([(last.if_false, False), (last.if_true, False)])
+                continue
+            if_false = results.pop()
+            if_true = results.pop()
+            last = IfInstruction(if_true, if_false, last.condition)
+        elif isinstance(last, RecurseInstruction) and not isinstance(last, TailCallInstruction):
+            last = TailCallInstruction(last.index)
+        else:
+            results.append(sequence)
+            continue
+        results.append(sequence[:-1] + [last])
+    return results[0]
+
+
+class IdiomInstruction(Instruction):
+    """The body of a recursion index that has been recognized as a common loop, see `recognize_idioms`.
+
+    The loop runs as one bulk operation. Whenever the memory does not look the way the bulk
+    operation expects, e.g. a string without a terminator, the original body runs instead,
+    so errors are exactly those of the original program.
+    """
+
+    def __init__(self, body: list[Instruction], result: int):
+        self.__body = body
+        self.__result = result
 
     def __repr__(self):
-        return f"OutputIntegerInstruction(value={self.__address!r})"
+        return f"{type(self).__name__}(body={self.__body!r})"
+
+    @property
+    def body(self) -> list[Instruction]:
+        """The original loop body, which all engines but the tree-walker may run instead."""
+        return self.__body
 
     def execute(self, context: ExecutionContext, index: int) -> int:
-        """_summary_
+        if self.run(context.cells, context):
+            return self.__result
+        return execute_instructions(self.__body, context, index)
+
+    @abstractmethod
+    def run(self, cells: MutableMapping, context: ExecutionContext) -> bool:
+        """Run the whole loop at once.
 
         Args:
-            index (int): *ignored*
+            cells (MutableMapping): The raw cell storage.
+            context (ExecutionContext): The context, for input and output.
 
         Returns:
-            int: returns 1 always, indicating successful execution.
+            bool: False if nothing was done because the loop would not end normally.
         """
-        print(str(context.read_ea(self.__address)))
-        return 1
 
+    @staticmethod
+    def string_at(cells: MutableMapping, string: int, position: int) -> tuple[object, int] | None:
+        """Get a string cell and the position a loop over it starts at.
 
-class ComparisonInstruction(Instruction):
-    """A class to represent a char output instruction in the Justif language."""
+        Args:
+            cells (MutableMapping): The raw cell storage.
+            string (int): The address of the string cell.
+            position (int): The address of the cell holding the position.
 
-    def __init__(
-        self,
-        first: EffectiveAddress,
-        second: int | EffectiveAddress,
-        method_to_execute: str,
-    ):
-        self.__first = first
-        self.__second = second
-        self.__method_to_execute: Final[str] = method_to_execute
+        Returns:
+            tuple[object, int] | None: The string and the position, or None if either is unusable.
+        """
+        value = cells.get(string)
+        start = cells.get(position, 0)
+        if not isinstance(value, STRING_TYPES) or not isinstance(start, int) or start < 0:
+            return None
+        return value, start
+
+    @staticmethod
+    def terminator(value, start: int) -> int | None:
+        """Find the 0 that ends a string, with a C-level scan.
+
+        Returns:
+            int | None: Its position, or None if the string has none after `start`.
+        """
+        try:
+            return value.index(0, start)
+        except ValueError:
+            return None
+
+
+STRING_TYPES: Final[tuple[type, ...]] = (bytes, bytearray, tuple, list, array)
+"""The types a string or array cell can hold."""
+
+
+class PrintStringInstruction(IdiomInstruction):
+    """`.S!.I ? >.S!.I, .I+1, =N : 0`: print a string from position .I up to its terminator."""
+
+    def __init__(self, body: list[Instruction], result: int, string: int, position: int):
+        super().__init__(body, result)
+        self.string: Final[int] = string
+        """The address of the string cell."""
+        self.position: Final[int] = position
+        """The address of the position cell."""
+
+    def run(self, cells: MutableMapping, context: ExecutionContext) -> bool:
+        found = self.string_at(cells, self.string, self.position)
+        if found is None:
+            return False
+        value, start = found
+        end = self.terminator(value, start)
+        if end is None:
+            return False
+        text = value[start:end]
+        if isinstance(text, (bytes, bytearray)) and text.isascii():
+            context.output.write(bytes(text))
+        else:
+            try:
+                encoded = "".join(map(chr, text)).encode("utf-8")
+            except (TypeError, ValueError, OverflowError):
+                # not a character `write_char` can write: the loop fails on it after moving .I
+                # up to it and writing everything before it, so let the loop run instead
+                return False
+            context.output.write(encoded)
+        cells[self.position] = end
+        return True
+
+
+class StringLengthInstruction(IdiomInstruction):
+    """`.S!.I ? .I+1, =N : 0`: advance .I to the terminator of a string."""
+
+    def __init__(self, body: list[Instruction], result: int, string: int, position: int):
+        super().__init__(body, result)
+        self.string: Final[int] = string
+        """The address of the string cell."""
+        self.position: Final[int] = position
+        """The address of the position cell."""
+
+    def run(self, cells: MutableMapping, context: ExecutionContext) -> bool:
+        found = self.string_at(cells, self.string, self.position)
+        if found is None:
+            return False
+        end = self.terminator(*found)
+        if end is None:
+            return False
+        cells[self.position] = end
+        return True
+
+
+DIGITS: Final[re.Pattern[bytes]] = re.compile(rb"[0-9]*")
+"""A run of decimal digits, for `ParseNumberInstruction`."""
+
+
+class ParseNumberInstruction(IdiomInstruction):
+    """`=D ? .C-48, .A*10, .A+.C, .I+1, =N : 0`, where D is `.C=.S!.I, *.C=47 ? +.C=58 : 0`:
+    accumulate the decimal digits of a string from position .I into .A.
+
+    Like the loop, it leaves the first character that is not a digit in .C.
+    """
+
+    def __init__(self, body: list[Instruction], result: int, string: int, position: int, char: int, accumulator: int):
+        super().__init__(body, result)
+        self.string: Final[int] = string
+        """The address of the string cell."""
+        self.position: Final[int] = position
+        """The address of the position cell."""
+        self.char: Final[int] = char
+        """The address of the cell holding the current character."""
+        self.accumulator: Final[int] = accumulator
+        """The address of the cell the number is accumulated in."""
+
+    def run(self, cells: MutableMapping, context: ExecutionContext) -> bool:
+        found = self.string_at(cells, self.string, self.position)
+        if found is None:
+            return False
+        value, start = found
+        accumulator = cells.get(self.accumulator, 0)
+        if not isinstance(accumulator, int):
+            return False
+        if isinstance(value, (bytes, bytearray)):
+            end = DIGITS.match(value, start).end()
+        else:
+            end = start
+            while end < len(value) and 47 < value[end] < 58:
+                end += 1
+        if end >= len(value):
+            # the loop would read past the end of the string
+            return False
+        if end > start:
+            digits = value[start:end]
+            number = int(digits) if isinstance(digits, (bytes, bytearray)) else int("".join(chr(c) for c in digits))
+            cells[self.accumulator] = accumulator * 10 ** (end - start) + number
+        cells[self.char] = value[end]
+        cells[self.position] = end
+        return True
+
+
+def recognize_idioms(root_sequence: list[Instruction]) -> list[Instruction]:
+    """Replace the bodies of recursion indices that are common loops with an `IdiomInstruction`.
+
+    Only the entries of the index dispatch table are looked at, and only loops that recurse
+    into their own index. Every pattern in `IDIOMS` is tried in turn.
+
+    Args:
+        root_sequence (list[Instruction]): The root sequence of the program.
+
+    Returns:
+        list[Instruction]: The root sequence with the recognized bodies replaced.
+    """
+    dispatch = IndexDispatch.build(root_sequence)
+    if dispatch is None:
+        return root_sequence
+    chain: list[IfInstruction] = []
+    sequence = root_sequence
+    while sequence is not dispatch.fallback:
+        chain.append(sequence[0])
+        sequence = sequence[0].if_false
+    replaced = False
+    bodies: list[list[Instruction]] = []
+    seen: set[int] = set()
+    for link in chain:
+        index = link.condition.value
+        body = link.if_true
+        if index not in seen:
+            # the first branch for an index is the one that runs, see `IndexDispatch.build`
+            seen.add(index)
+            for idiom in IDIOMS:
+                instruction = idiom(index, body, dispatch)
+                if instruction is not None:
+                    body = [instruction]
+                    replaced = True
+                    break
+        bodies.append(body)
+    if not replaced:
+        return root_sequence
+    sequence = dispatch.fallback
+    for link, body in zip(reversed(chain), reversed(bodies)):
+        sequence = [IfInstruction(body, sequence, link.condition)]
+    return sequence
+
+
+def _element(ea: object) -> tuple[int, int] | None:
+    """Match `.S!.I`: a direct string cell indexed by the value of a direct cell."""
+    if isinstance(ea, EffectiveAddress) and ea.address.direct and ea.offset is not None and ea.offset.indirect:
+        return ea.address.address, ea.offset.address
+    return None
+
+
+def _cell(ea: object) -> int | None:
+    """Match `.C`: a direct cell without offset."""
+    if isinstance(ea, EffectiveAddress) and ea.address.direct and ea.offset is None:
+        return ea.address.address
+    return None
+
+
+def _increment(instruction: Instruction, cell: int, amount: int = 1) -> bool:
+    """Match `.cell+amount`."""
+    return (
+        isinstance(instruction, MemsetInstruction)
+        and instruction.method == "+"
+        and _cell(instruction.target) == cell
+        and type(instruction.source) is int
+        and instruction.source == amount
+    )
+
+
+def _constant(sequence: list[Instruction]) -> int | None:
+    """Match a sequence that is empty or a single constant.
+
+    Returns:
+        int | None: The result of the sequence, or None if it is something else.
+    """
+    if not sequence:
+        return 0
+    if len(sequence) == 1 and isinstance(sequence[0], ConstantInstruction):
+        return sequence[0].value
+    return None
+
+
+def _loop(index: int, body: list[Instruction]) -> tuple[IfInstruction, int] | None:
+    """Match a body that is a single if whose true branch ends by recursing into `index`,
+    and whose false branch is empty or a constant.
+
+    Returns:
+        tuple[IfInstruction, int] | None: The if and the result of the loop, or None.
+    """
+    if len(body) != 1 or not isinstance(body[0], IfInstruction):
+        return None
+    loop = body[0]
+    if_true, if_false = loop.if_true, loop.if_false
+    if not if_true or not isinstance(if_true[-1], RecurseInstruction) or if_true[-1].index != index:
+        return None
+    result = _constant(if_false)
+    if result is None:
+        return None
+    return loop, result
+
+
+def _print_string(index: int, body: list[Instruction], dispatch: IndexDispatch) -> IdiomInstruction | None:
+    match = _loop(index, body)
+    if match is None:
+        return None
+    loop, result = match
+    element = _element(loop.condition)
+    if element is None or element[0] == element[1] or len(loop.if_true) != 3:
+        return None
+    output, increment = loop.if_true[0], loop.if_true[1]
+    if not (isinstance(output, OutputCharInstruction) and _element(output.address) == element):
+        return None
+    if not _increment(increment, element[1]):
+        return None
+    return PrintStringInstruction(body, result, *element)
+
+
+def _string_length(index: int, body: list[Instruction], dispatch: IndexDispatch) -> IdiomInstruction | None:
+    match = _loop(index, body)
+    if match is None:
+        return None
+    loop, result = match
+    element = _element(loop.condition)
+    if element is None or element[0] == element[1] or len(loop.if_true) != 2:
+        return None
+    if not _increment(loop.if_true[0], element[1]):
+        return None
+    return StringLengthInstruction(body, result, *element)
+
+
+def _parse_number(index: int, body: list[Instruction], dispatch: IndexDispatch) -> IdiomInstruction | None:
+    match = _loop(index, body)
+    if match is None:
+        return None
+    loop, result = match
+    if not isinstance(loop.condition, RecurseInstruction) or loop.condition.index not in dispatch.table:
+        return None
+    # the digit test: .C=.S!.I, *.C=47 ? +.C=58 : 0
+    test = dispatch.table[loop.condition.index]
+    if len(test) != 2 or not isinstance(test[0], MemsetInstruction) or not isinstance(test[1], IfInstruction):
+        return None
+    load, check = test
+    element = _element(load.source)
+    char = _cell(load.target)
+    if load.method != "=" or element is None or char is None or char in element or element[0] == element[1]:
+        return None
+    lower, upper = check.condition, check.if_true
+    if not (
+        isinstance(lower, ComparisonInstruction)
+        and (lower.method, _cell(lower.first), lower.second) == ("*", char, 47)
+        and len(upper) == 1
+        and isinstance(upper[0], ComparisonInstruction)
+        and (upper[0].method, _cell(upper[0].first), upper[0].second) == ("+", char, 58)
+        and _constant(check.if_false) == 0
+    ):
+        return None
+    # the loop body: .C-48, .A*10, .A+.C, .I+1, =N
+    if len(loop.if_true) != 5:
+        return None
+    subtract, multiply, add, increment = loop.if_true[:4]
+    accumulator = _cell(multiply.target) if isinstance(multiply, MemsetInstruction) else None
+    if accumulator is None or accumulator in (char, *element):
+        return None
+    if not (
+        isinstance(subtract, MemsetInstruction)
+        and (subtract.method, _cell(subtract.target), subtract.source) == ("-", char, 48)
+        and (multiply.method, multiply.source) == ("*", 10)
+        and isinstance(add, MemsetInstruction)
+        and (add.method, _cell(add.target), _cell(add.source)) == ("+", accumulator, char)
+        and _increment(increment, element[1])
+    ):
+        return None
+    return ParseNumberInstruction(body, result, element[0], element[1], char, accumulator)
+
+
+IDIOMS: Final[tuple[Callable[[int, list[Instruction], IndexDispatch], IdiomInstruction | None], ...]] = (
+    _print_string,
+    _string_length,
+    _parse_number,
+)
+"""The loop patterns `recognize_idioms` knows: each returns the replacement for a body, or None."""
+
+
+class OutputCharInstruction(Instruction):
+    """A class to represent a char output instruction in the Justif language."""
+
+    def __init__(self, address: EffectiveAddress):
+        self.__address = address
+
+    def __repr__(self):
+        return f"OutputCharInstruction(value={self.__address!r})"
+
+    @property
+    def address(self) -> EffectiveAddress:
+        """Address of the value to output."""
+        return self.__address
+
+    def execute(self, context: ExecutionContext, index: int) -> int:
+        """_summary_
+
+        Args:
+            index (int): *ignored*
+
+        Returns:
+            int: returns 1 always, indicating successful execution.
+        """
+        context.output.write_char(context.read_ea(self.__address))
+        return 1
+
+
+class OutputIntegerInstruction(Instruction):
+    """A class to represent a char output instruction in the Justif language."""
+
+    def __init__(self, address: EffectiveAddress):
+        self.__address = address
+
+    def __repr__(self):
+        return f"OutputIntegerInstruction(value={self.__address!r})"
+
+    @property
+    def address(self) -> EffectiveAddress:
+        """Address of the value to output."""
+        return self.__address
+
+    def execute(self, context: ExecutionContext, index: int) -> int:
+        """_summary_
+
+        Args:
+            index (int): *ignored*
+
+        Returns:
+            int: returns 1 always, indicating successful execution.
+        """
+        context.output.write_integer(context.read_ea(self.__address))
+        return 1
+
+
+class ComparisonInstruction(Instruction):
+    """A class to represent a char output instruction in the Justif language."""
+
+    def __init__(
+        self,
+        first: EffectiveAddress,
+        second: int | EffectiveAddress,
+        method_to_execute: str,
+        checked: bool = True,
+    ):
+        self.__first = first
+        self.__second = second
+        self.__method_to_execute: Final[str] = method_to_execute
+        self.__checked: Final[bool] = checked
+        """False if both operands are proven to be ints, see `CellTypes`."""
 
     def __repr__(self) -> str:
-        return f"ComparisonInstruction(first={self.__first}, second={self.__second}, method_to_execute={self.__method_to_execute})"
+        unchecked = "" if self.__checked else ", checked=False"
+        return f"ComparisonInstruction(first={self.__first}, second={self.__second}, method_to_execute={self.__method_to_execute}{unchecked})"
+
+    @property
+    def first(self) -> EffectiveAddress:
+        """The memory cell on the left side of the comparison."""
+        return self.__first
+
+    @property
+    def second(self) -> int | EffectiveAddress:
+        """The constant or memory cell on the right side of the comparison."""
+        return self.__second
+
+    @property
+    def method(self) -> str:
+        """The comparison operator: one of '+', '-', '*', '/'."""
+        return self.__method_to_execute
+
+    @property
+    def checked(self) -> bool:
+        """False if the operand types are proven and not asserted at runtime."""
+        return self.__checked
 
     def execute(self, context: ExecutionContext, index: int) -> int:
+        if not self.__checked:
+            second = self.__second
+            if isinstance(second, EffectiveAddress):
+                second = context.read_ea(second)
+            return COMPARISON_OPERATORS[self.__method_to_execute](
+                context.read_ea(self.__first), second
+            )
         a = self.get_value(self.__first, context, index)
         assert isinstance(a, int)
         b = self.get_value(self.__second, context, index)
         assert isinstance(b, int)
         match self.__method_to_execute:
             case "+":
-                logger.debug("Executing less than comparison: {} < {}", a, b)
                 return a < b
             case "-":
-                logger.debug("Executing equal to comparison: {} == {}", a, b)
                 return a == b
             case "*":
-                logger.debug("Executing greater than comparison: {} > {}", a, b)
                 return a > b
             case "/":
-                logger.debug("Executing not equal to comparison: {} != {}", a, b)
                 return a != b
             case _:
                 logger.error("Unknown comparison method: {}", self.__method_to_execute)
@@ -406,23 +1448,67 @@ class MemsetInstruction(Instruction):
         source: int | str | EffectiveAddress,
         target: EffectiveAddress,
         method_to_execute: str,
+        checked: bool = True,
     ):
         self.__source = source
         self.__target = target
         self.__method_to_execute: Final[str] = method_to_execute
+        self.__encoded: Final[bytes | tuple[int, ...] | None] = (
+            encode_string(source) if isinstance(source, str) else None
+        )
+        """A string source, encoded once when the instruction is built, see `encode_string`."""
+        self.__checked: Final[bool] = checked
+        """False if the operands are proven to be ints, see `CellTypes`."""
 
     def __repr__(self) -> str:
-        return f"MemsetInstruction(source={self.__source}, target={self.__target}, method_to_execute={self.__method_to_execute!r})"
+        unchecked = "" if self.__checked else ", checked=False"
+        return f"MemsetInstruction(source={self.__source}, target={self.__target}, method_to_execute={self.__method_to_execute!r}{unchecked})"
+
+    @property
+    def source(self) -> int | str | EffectiveAddress:
+        """The value assigned to or combined with the target."""
+        return self.__source
+
+    @property
+    def target(self) -> EffectiveAddress:
+        """The memory cell that is modified."""
+        return self.__target
+
+    @property
+    def method(self) -> str:
+        """The memset operator: one of '=', '+', '-', '*', '/'."""
+        return self.__method_to_execute
+
+    @property
+    def encoded(self) -> bytes | tuple[int, ...] | None:
+        """The encoded string if the source is a string literal, otherwise None."""
+        return self.__encoded
+
+    @property
+    def checked(self) -> bool:
+        """False if the operand types are proven and not asserted at runtime."""
+        return self.__checked
 
     def execute(self, context: ExecutionContext, index: int) -> int:
 
-        second_value = self.get_value(self.__source, context, index)
+        if self.__encoded is not None:
+            second_value = self.__encoded
+        elif isinstance(self.__source, EffectiveAddress):
+            second_value = context.read_ea(self.__source)
+        else:
+            second_value = self.get_value(self.__source, context, index)
+
+        if not self.__checked:
+            if self.__method_to_execute == "=":
+                return context.write_ea(self.__target, second_value)
+            combine = MEMSET_OPERATORS[self.__method_to_execute]
+            return context.write_ea(
+                self.__target, combine(context.read_ea(self.__target), second_value)
+            )
 
         match self.__method_to_execute:
             case "=":
-                return context.write_ea(
-                    self.__target, self.get_value(self.__source, context, index)
-                )
+                return context.write_ea(self.__target, second_value)
             case "+":
                 assert isinstance(second_value, int)
                 first_value = self.get_value(self.__target, context, index)
@@ -472,109 +1558,2031 @@ def execute_instructions(
     Returns:
         int: _description_
     """
-    # logger.critical("Executing instructions with index: {}", index)
     result = 0
     for instruction in instructions:
-        logger.debug(">>: {}", instruction)
         result = instruction.execute(context, index)
     return result
 
 
-class JustifParser:
-    """A parser for the Justif language."""
+def execute_call(context: ExecutionContext, index: int) -> int:
+    """Run the program with an index, looping instead of recursing for tail calls.
 
-    def __init__(self):
-        self.expression: str = ""
-        self.__pos: int = 0
-        self.__nums: list[int] = [-1, -1]
+    Args:
+        context (ExecutionContext): Memory and root sequence of the program.
+        index (int): The index the program is called with.
 
-    def parse_expression(self, expression: str) -> list[Instruction] | None:
-        """Parse the Justif expression into a sequence of instructions.
+    Returns:
+        int: The result of the call.
+    """
+    entry_point = context.entry_point
+    result = execute_instructions(entry_point(index), context, index)
+    while isinstance(result, TailCallInstruction):
+        index = result.index
+        result = execute_instructions(entry_point(index), context, index)
+    return result
 
-        Args:
-            expression (str): A valid justif expression / program.
 
-        Returns:
-            list[Instruction]: The instructions parsed from the expression.
-        """
-        self.expression = expression
-        self.__pos = 0
-        self.__nums = [-1, -1]
-        return self.__parse_instructions()
+class TracedExecutionContext(TracedMemory, ExecutionContext):
+    """An execution context that logs every memory access, for `--debug`."""
 
-    def __skip_whitespaces(self) -> None:
-        """Skip whitespace characters in the expression.
-        This method advances the position in the expression until a non-whitespace character is found.
-        """
-        try:
-            while (
-                self.expression[self.__pos]
-                in " \r\nABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
-            ):
-                self.__pos += 1
-        except IndexError:
-            pass
 
-    def __save_state(self) -> tuple[int, list[int]]:
-        """Push the current parser position and intermediate numbers onto a stack.
+def execute_instructions_traced(
+    instructions: list[Instruction], context: ExecutionContext, index: int
+) -> int:
+    """Like `execute_instructions`, but log every step.
 
-        Returns:
-            tuple[int, list[int]]: (current position, copy of __nums)
-        """
-        return self.__pos, self.__nums[:]
+    Ifs and recursion are unfolded here so that nested sequences are traced as well;
+    all other instructions run their normal `execute`.
 
-    def __restore_state(self, previously_saved_pos: tuple[int, list[int]]) -> None:
-        """Restore the previously saved position and numbers from a local variable
+    Args:
+        instructions (list[Instruction]): The sequence to execute.
+        context (ExecutionContext): Memory and root sequence of the program.
+        index (int): The current index.
+
+    Returns:
+        int: The result of the last instruction.
+    """
+    result = 0
+    for instruction in instructions:
+        logger.debug(">>: {}", instruction)
+        match instruction:
+            case IfInstruction():
+                condition = instruction.condition
+                if isinstance(condition, EffectiveAddress):
+                    value = context.read_ea(condition)
+                else:
+                    value = execute_instructions_traced([condition], context, index)
+                logger.debug("IF-Expression is {}", value)
+                branch = instruction.if_true if value else instruction.if_false
+                result = execute_instructions_traced(branch, context, index)
+            case RecurseInstruction():
+                logger.debug("Call self recursively with index {}", instruction.index)
+                result = execute_instructions_traced(
+                    context.entry_point(instruction.index), context, instruction.index
+                )
+            case _:
+                result = instruction.execute(context, index)
+                logger.debug("<<: {}", result)
+    return result
+
+
+def execute_tree(context: ExecutionContext, index: int) -> int:
+    """Run the root sequence with the recursive tree-walking interpreter. Only recursions
+    that are not tail calls grow the Python stack.
+
+    Args:
+        context (ExecutionContext): Memory and root sequence of the program.
+        index (int): The index the program is called with.
+
+    Returns:
+        int: The result of the root sequence.
+    """
+    return context.call(index)
+
+
+def execute_traced(context: ExecutionContext, index: int) -> int:
+    """Run the root sequence with the traced tree-walker. This is the only engine that logs,
+    all others run without any logging calls.
+
+    Args:
+        context (ExecutionContext): Memory and root sequence of the program; pass a
+            `TracedExecutionContext` to log memory accesses as well.
+        index (int): The index the program is called with.
+
+    Returns:
+        int: The result of the root sequence.
+    """
+    return execute_instructions_traced(context.entry_point(index), context, index)
+
+
+MISSING: Final[object] = object()
+"""Stands for a cell that did not exist when a memoized call read it."""
+
+
+class CallRecord:
+    """The memory cells a call has read and written so far, see `MemoizingExecutionContext`."""
+
+    def __init__(self):
+        self.reads: dict[int, object] = {}
+        """The value of each cell the call read before writing it, MISSING if it did not exist."""
+        self.writes: dict[int, object] = {}
+        """The last value the call wrote to each cell."""
+        self.impure: bool = False
+        """True if the call did input or output, which a cached result cannot replay."""
+
+    def merge(self, child: CallRecord) -> None:
+        """Account for a nested call that has finished.
 
         Args:
-            s (_tytuple[int, list[int]]pe_):(previous position, copy of previous __nums)
+            child (CallRecord): The record of the nested call.
         """
-        self.__pos = previously_saved_pos[0]
-        self.__nums = previously_saved_pos[1]
+        for address, value in child.reads.items():
+            # cells this call wrote before the nested call are not inputs of this call
+            if address not in self.writes and address not in self.reads:
+                self.reads[address] = value
+        self.writes.update(child.writes)
+        self.impure = self.impure or child.impure
+
+
+class RecordingCells(MutableMapping):
+    """Cell storage that reports every access to the innermost call of a `MemoizingExecutionContext`."""
+
+    def __init__(self, cells: MutableMapping, records: list[CallRecord]):
+        self.cells: Final[MutableMapping] = cells
+        """The actual cell storage."""
+        self.__records: Final[list[CallRecord]] = records
+        """The records of the calls that are running, innermost last."""
+
+    def __read(self, address: int) -> None:
+        if self.__records:
+            record = self.__records[-1]
+            if address not in record.writes and address not in record.reads:
+                record.reads[address] = self.cells.get(address, MISSING)
+
+    def __getitem__(self, address: int):
+        self.__read(address)
+        return self.cells[address]
+
+    def setdefault(self, address: int, default=None):
+        self.__read(address)
+        if address not in self.cells:
+            self[address] = default
+        return self.cells[address]
+
+    def __setitem__(self, address: int, value) -> None:
+        if self.__records:
+            self.__records[-1].writes[address] = value
+        self.cells[address] = value
+
+    def __delitem__(self, address: int) -> None:
+        if self.__records:
+            self.__records[-1].impure = True
+        del self.cells[address]
+
+    def __contains__(self, address: object) -> bool:
+        return address in self.cells
+
+    def __iter__(self):
+        return iter(self.cells)
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+
+class MemoizingExecutionContext(ExecutionContext):
+    """An execution context that caches the results of recursive calls of the tree-walker.
+
+    While a call runs, every cell it reads before writing it and every cell it writes is
+    recorded. Its result, together with the values it read and wrote, goes into an LRU
+    cache. When the same index is called again and all cells it read last time still hold
+    the same values, the writes are replayed and the cached result is returned without
+    running the call. Calls that do input or output are never cached, and neither are calls
+    that read cells holding mutable values, such as lists a host put into memory.
+    """
 
-    def __get_char(self) -> str:
-        """Get the character at the current position
+    __SIGNATURES: Final[int] = 8
+    """Number of distinct sets of read cells that are looked up for each index."""
+
+    def __init__(
+        self,
+        cells: MutableMapping | None = None,
+        output: OutputSink | None = None,
+        input_source: InputSource | None = None,
+        cache_size: int = 4096,
+    ):
+        self.__records: list[CallRecord] = []
+        super().__init__(RecordingCells({} if cells is None else cells, self.__records), output, input_source)
+        self.cache_size: Final[int] = cache_size
+        """Maximum number of cached call results."""
+        self.__cache: OrderedDict[tuple, tuple[int, tuple[tuple[int, object], ...]]] = OrderedDict()
+        """(index, read cells, their values) -> (result, writes), least recently used first."""
+        self.__signatures: dict[int, list[tuple[int, ...]]] = {}
+        """For each index, the sets of cells its recent calls have read, most recent first."""
+        self.hits: int = 0
+        """Calls answered from the cache."""
+        self.misses: int = 0
+        """Calls that were run and cached."""
+        self.bypassed: int = 0
+        """Calls that were run but could not be cached."""
+
+    @property
+    def output(self) -> OutputSink:
+        """Where the program output goes; using it makes the running calls uncacheable."""
+        if self.__records:
+            self.__records[-1].impure = True
+        return self.__output
+
+    @output.setter
+    def output(self, output: OutputSink) -> None:
+        self.__output = output
+
+    @property
+    def input(self) -> InputSource:
+        """Where `<` instructions read from; using it makes the running calls uncacheable."""
+        if self.__records:
+            self.__records[-1].impure = True
+        return self.__input
+
+    @input.setter
+    def input(self, input_source: InputSource) -> None:
+        self.__input = input_source
+
+    def call(self, index: int) -> int:
+        records = self.__records
+        cells = self.cells.cells
+        for signature in self.__signatures.get(index, ()):
+            key = (index, signature, tuple(cells.get(address, MISSING) for address in signature))
+            entry = self.__cache.get(key)
+            if entry is None:
+                continue
+            self.__cache.move_to_end(key)
+            self.hits += 1
+            result, writes = entry
+            if records:
+                replayed = CallRecord()
+                replayed.reads = dict(zip(signature, key[2]))
+                replayed.writes = dict(writes)
+                records[-1].merge(replayed)
+            for address, value in writes:
+                cells[address] = value
+            return result
+
+        record = CallRecord()
+        records.append(record)
+        try:
+            result = execute_call(self, index)
+        finally:
+            records.pop()
+        if records:
+            records[-1].merge(record)
+        if record.impure or not self.__store(index, record, result):
+            self.bypassed += 1
+        else:
+            self.misses += 1
+        return result
+
+    def __store(self, index: int, record: CallRecord, result: int) -> bool:
+        """Cache the result of a call.
+
+        Args:
+            index (int): The index of the call.
+            record (CallRecord): What the call read and wrote.
+            result (int): The result of the call.
 
         Returns:
-            str: character at the current position or '\0' if out of bounds.
+            bool: False if the call read a value that cannot be part of a cache key.
         """
-        self.__skip_whitespaces()
+        signature = tuple(record.reads)
+        key = (index, signature, tuple(record.reads.values()))
         try:
-            result = self.expression[self.__pos]
-            assert isinstance(result, str), "Expected a string character"
-            logger.debug("__get_char[{}]: {!r}", self.__pos, result)
-            return result
-        except IndexError:
-            pass
-        return "\0"
+            hash(key)
+        except TypeError:
+            return False
+        self.__cache[key] = (result, tuple(record.writes.items()))
+        self.__cache.move_to_end(key)
+        if len(self.__cache) > self.cache_size:
+            self.__cache.popitem(last=False)
+        signatures = self.__signatures.setdefault(index, [])
+        if signature in signatures:
+            signatures.remove(signature)
+        signatures.insert(0, signature)
+        del signatures[self.__SIGNATURES :]
+        return True
+
+
+class StacklessInterpreter:
+    """Executes a program with a heap-allocated continuation stack.
+
+    Every nested sequence (an if-branch or the root sequence entered by a recursion) gets
+    a frame on `self.__stack` instead of a Python call. A frame that is about to run its
+    last instruction is dropped before the child frame is pushed, so tail recursion runs
+    in constant space; non-tail recursion only grows the heap stack.
+    """
 
-    def __skip_char(self, expression: str) -> bool:
-        """_summary_
+    def __init__(self, context: ExecutionContext, index: int):
+        self.context: Final[ExecutionContext] = context
+        self.result: int = 0
+        """The result of the root sequence, valid once `finished` is True."""
+        self.finished: bool = False
+        self.steps: int = 0
+        """Instructions dispatched so far, over all calls of `run`."""
+        # frame layout: [instructions, next pc, index, last result, if waiting for a recursive condition]
+        self.__stack: list[list] = [[context.entry_point(index), 0, index, 0, None]]
+
+    def run(self, max_steps: int | None = None) -> bool:
+        """Run the program until it finishes or `max_steps` instructions have been dispatched.
 
         Args:
-            expression (_type_): _description_
+            max_steps (int | None, optional): Step budget for this call. Defaults to None (unlimited).
 
         Returns:
-            _type_: _description_
+            bool: True if the program has finished.
         """
-        self.__skip_whitespaces()
-        try:
-            if self.expression[self.__pos : self.__pos + len(expression)] == expression:
-                self.__pos += len(expression)
-                return True
-        except IndexError:
-            pass
-        return False
+        context = self.context
+        entry_point = context.entry_point
+        stack = self.__stack
+        steps = 0
+        while stack:
+            if max_steps is not None and steps >= max_steps:
+                self.steps += steps
+                return False
+            frame = stack[-1]
+            sequence = frame[0]
+            pc = frame[1]
+            if pc == len(sequence):
+                stack.pop()
+                self.__deliver(frame[3])
+                continue
+
+            steps += 1
+            instruction = sequence[pc]
+            frame[1] = pc = pc + 1
+            index = frame[2]
+            if isinstance(instruction, IfInstruction):
+                condition = instruction.condition
+                if isinstance(condition, RecurseInstruction):
+                    # the branch can only be chosen once the recursion has returned
+                    frame[4] = instruction
+                    stack.append([entry_point(condition.index), 0, condition.index, 0, None])
+                    continue
+                if isinstance(condition, Instruction):
+                    value = condition.execute(context, index)
+                else:
+                    value = context.read_ea(condition)
+                self.__enter(
+                    instruction.if_true if value else instruction.if_false,
+                    index,
+                    pc == len(sequence),
+                )
+            elif isinstance(instruction, RecurseInstruction):
+                self.__enter(entry_point(instruction.index), instruction.index, pc == len(sequence))
+            else:
+                frame[3] = instruction.execute(context, index)
 
-    def __is_index(self):
-        state = self.__save_state()
-        if self.__skip_char("~"):
-            v: int | EffectiveAddress | None = self.__dec_int()
-            if v is None:
-                v = self.__indirect_memory_access()
-            if v is not None:
-                return CheckIndexInstruction(v)
-        self.__restore_state(state)
+        self.steps += steps
+        self.finished = True
+        return True
+
+    def __enter(self, instructions: list[Instruction], index: int, tail: bool) -> None:
+        """Push a frame for a nested sequence.
+
+        Args:
+            instructions (list[Instruction]): The sequence to run.
+            index (int): The index the sequence runs with.
+            tail (bool): True if the sequence is the last thing the current frame does.
+        """
+        if tail:
+            # the current frame would only hand the child's result through, so drop it
+            self.__stack.pop()
+        self.__stack.append([instructions, 0, index, 0, None])
+
+    def __deliver(self, value: int) -> None:
+        """Hand the result of a finished frame to the frame below it.
+
+        Args:
+            value (int): The result of the finished frame.
+        """
+        if not self.__stack:
+            self.result = value
+            return
+        parent = self.__stack[-1]
+        pending = parent[4]
+        if pending is None:
+            parent[3] = value
+            return
+        parent[4] = None
+        self.__enter(
+            pending.if_true if value else pending.if_false,
+            parent[2],
+            parent[1] == len(parent[0]),
+        )
+
+
+def execute_stackless(context: ExecutionContext, index: int) -> int:
+    """Run the root sequence without using the Python call stack for recursion.
+
+    Args:
+        context (ExecutionContext): Memory and root sequence of the program.
+        index (int): The index the program is called with.
+
+    Returns:
+        int: The result of the root sequence.
+    """
+    interpreter = StacklessInterpreter(context, index)
+    interpreter.run()
+    return interpreter.result
+
+
+class AsyncOutputSink(OutputSink):
+    """An output sink for `execute_async`, handing the output to a coroutine.
+
+    Output instructions run synchronously, so the output stays in the buffer until
+    `execute_async` awaits `drain` between two slices of the program.
+    """
+
+    def __init__(self, write: Callable[[bytes], Awaitable[object]]):
+        super().__init__()
+        self.write_async: Final[Callable[[bytes], Awaitable[object]]] = write
+        """Receives the output, e.g. a function writing to an `asyncio.StreamWriter` and awaiting its `drain`."""
+
+    def flush(self) -> None:
+        """Keep the output buffered: it can only be written by awaiting `drain`."""
+
+    async def drain(self) -> None:
+        """Hand all buffered output to `write_async`."""
+        if not self.buffer:
+            return
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        await self.write_async(data)
+
+
+class QuotaExceeded(RuntimeError):
+    """Raised by `execute_async` when a program has run its maximum number of steps."""
+
+
+async def execute_async(
+    context: ExecutionContext,
+    index: int = 1,
+    slice_steps: int = 1000,
+    max_steps: int | None = None,
+    timeout: float | None = None,
+) -> int:
+    """Run the root sequence in slices, handing control back to the event loop after each one.
+
+    The program runs on a `StacklessInterpreter`, so it can stop after any instruction and
+    carry on later. Cancelling the task stops the program between two slices. Input is read
+    synchronously, so it should come from memory, e.g. `InputSource(b"...")`. An
+    `AsyncOutputSink` is drained after every slice; any other sink is flushed by the caller.
+
+    Args:
+        context (ExecutionContext): Memory and root sequence of the program.
+        index (int, optional): The index the program is called with. Defaults to 1.
+        slice_steps (int, optional): Instructions to run before yielding to the event loop. Defaults to 1000.
+        max_steps (int | None, optional): Instructions the program may run in total. Defaults to None (unlimited).
+        timeout (float | None, optional): Seconds the program may take, including waiting for its turn. Defaults to None (unlimited).
+
+    Raises:
+        QuotaExceeded: The program did not finish within `max_steps`.
+        TimeoutError: The program did not finish within `timeout`.
+
+    Returns:
+        int: The result of the root sequence.
+    """
+    interpreter = StacklessInterpreter(context, index)
+    output = context.output
+    try:
+        async with asyncio.timeout(timeout):
+            while True:
+                budget = slice_steps if max_steps is None else min(slice_steps, max_steps - interpreter.steps)
+                if budget <= 0:
+                    raise QuotaExceeded(f"Program did not finish within {max_steps} steps")
+                finished = interpreter.run(budget)
+                if isinstance(output, AsyncOutputSink):
+                    await output.drain()
+                if finished:
+                    return interpreter.result
+                await asyncio.sleep(0)
+    finally:
+        # also deliver what a failed or cancelled program wrote before it stopped
+        if isinstance(output, AsyncOutputSink):
+            await output.drain()
+
+
+CompiledInstruction = Callable[[ExecutionContext, int], int]
+"""A compiled instruction or sequence: called with the context and the current index."""
+
+COMPARISON_OPERATORS: Final[dict[str, Callable[[int, int], bool]]] = {
+    "+": operator.lt,
+    "-": operator.eq,
+    "*": operator.gt,
+    "/": operator.ne,
+}
+"""Maps the comparison characters to their Python operators."""
+
+MEMSET_OPERATORS: Final[dict[str, Callable[[int, int], int]]] = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.floordiv,
+}
+"""Maps the arithmetic memset characters to their Python operators."""
+
+
+class ClosureCompiler:
+    """Compiles an instruction tree into a tree of specialized Python closures.
+
+    Operators, operand kinds and addressing modes are resolved once, so executing a
+    compiled instruction is a plain call without any `match` or `isinstance` dispatch.
+    """
+
+    def __init__(self):
+        self.__root: list[CompiledInstruction] = []
+        """The compiled root sequence, filled in once compilation is complete."""
+
+    def compile(self, root_sequence: list[Instruction]) -> CompiledInstruction:
+        """Compile a program.
+
+        Args:
+            root_sequence (list[Instruction]): The root sequence of the program.
+
+        Returns:
+            CompiledInstruction: The compiled root sequence.
+        """
+        dispatch = IndexDispatch.build(root_sequence)
+        if dispatch is None:
+            body = self.compile_sequence(root_sequence)
+
+            def compiled(context: ExecutionContext, index: int) -> int:
+                result = body(context, index)
+                while isinstance(result, TailCallInstruction):
+                    index = result.index
+                    result = body(context, index)
+                return result
+
+        else:
+            table = {index: self.compile_sequence(body) for index, body in dispatch.table.items()}
+            fallback = self.compile_sequence(dispatch.fallback)
+            lookup = table.get
+
+            def compiled(context: ExecutionContext, index: int) -> int:
+                result = lookup(index, fallback)(context, index)
+                while isinstance(result, TailCallInstruction):
+                    index = result.index
+                    result = lookup(index, fallback)(context, index)
+                return result
+
+        self.__root[:] = [compiled]
+        return compiled
+
+    def compile_sequence(self, instructions: list[Instruction]) -> CompiledInstruction:
+        """Compile a sequence of instructions; the sequence returns the result of its last instruction.
+
+        Args:
+            instructions (list[Instruction]): The sequence to compile.
+
+        Returns:
+            CompiledInstruction: The compiled sequence.
+        """
+        compiled = tuple(self.compile_instruction(instruction) for instruction in instructions)
+        if not compiled:
+            return lambda context, index: 0
+        if len(compiled) == 1:
+            return compiled[0]
+        if len(compiled) == 2:
+            first, second = compiled
+
+            def sequence_of_two(context: ExecutionContext, index: int) -> int:
+                first(context, index)
+                return second(context, index)
+
+            return sequence_of_two
+
+        leading, last = compiled[:-1], compiled[-1]
+
+        def sequence(context: ExecutionContext, index: int) -> int:
+            for function in leading:
+                function(context, index)
+            return last(context, index)
+
+        return sequence
+
+    def compile_instruction(self, instruction: Instruction) -> CompiledInstruction:
+        """Compile a single instruction.
+
+        Args:
+            instruction (Instruction): The instruction to compile.
+
+        Returns:
+            CompiledInstruction: The compiled instruction.
+        """
+        match instruction:
+            case IfInstruction():
+                return self.__compile_if(instruction)
+            case CheckIndexInstruction():
+                return self.__compile_check_index(instruction)
+            case ConstantInstruction():
+                value = instruction.value
+                return lambda context, index: value
+            case TailCallInstruction():
+                # handed back up to the loop in `compile`, like `execute_call` does
+                return lambda context, index: instruction
+            case RecurseInstruction():
+                return self.__compile_recursion(instruction)
+            case InputInstruction():
+                return self.__compile_input(instruction)
+            case OutputCharInstruction():
+                return self.__compile_output_char(instruction)
+            case OutputIntegerInstruction():
+                return self.__compile_output_integer(instruction)
+            case ComparisonInstruction():
+                return self.__compile_comparison(instruction)
+            case MemsetInstruction():
+                return self.__compile_memset(instruction)
+            case _:
+                # no specialized form, fall back to the tree-walker
+                return instruction.execute
+
+    def __compile_if(self, instruction: IfInstruction) -> CompiledInstruction:
+        if_true = self.compile_sequence(instruction.if_true)
+        if_false = self.compile_sequence(instruction.if_false)
+        condition = instruction.condition
+        if isinstance(condition, EffectiveAddress):
+            read = condition.read
+
+            def if_cell(context: ExecutionContext, index: int) -> int:
+                if read(context.cells):
+                    return if_true(context, index)
+                return if_false(context, index)
+
+            return if_cell
+
+        test = self.compile_instruction(condition)
+
+        def if_instruction(context: ExecutionContext, index: int) -> int:
+            if test(context, index):
+                return if_true(context, index)
+            return if_false(context, index)
+
+        return if_instruction
+
+    def __compile_check_index(self, instruction: CheckIndexInstruction) -> CompiledInstruction:
+        value = instruction.value
+        if isinstance(value, EffectiveAddress):
+            read = value.read
+            return lambda context, index: index == read(context.cells)
+        return lambda context, index: index == value
+
+    def __compile_recursion(self, instruction: RecurseInstruction) -> CompiledInstruction:
+        root = self.__root
+        target = instruction.index
+
+        def recurse(context: ExecutionContext, index: int) -> int:
+            return root[0](context, target)
+
+        return recurse
+
+    def __compile_input(self, instruction: InputInstruction) -> CompiledInstruction:
+        write = instruction.address.write
+
+        def read_input(context: ExecutionContext, index: int) -> int:
+            value = context.input.read_char()
+            if value < 0:
+                write(context.cells, 0)
+                return 0
+            write(context.cells, value)
+            return 1
+
+        return read_input
+
+    def __compile_output_char(self, instruction: OutputCharInstruction) -> CompiledInstruction:
+        read = instruction.address.read
+
+        def output_char(context: ExecutionContext, index: int) -> int:
+            context.output.write_char(read(context.cells))
+            return 1
+
+        return output_char
+
+    def __compile_output_integer(self, instruction: OutputIntegerInstruction) -> CompiledInstruction:
+        read = instruction.address.read
+
+        def output_integer(context: ExecutionContext, index: int) -> int:
+            context.output.write_integer(read(context.cells))
+            return 1
+
+        return output_integer
+
+    def __compile_comparison(self, instruction: ComparisonInstruction) -> CompiledInstruction:
+        if instruction.method not in COMPARISON_OPERATORS:
+            raise RuntimeError(f"Unknown comparison method: {instruction.method}")
+        compare = COMPARISON_OPERATORS[instruction.method]
+        read_first = instruction.first.read
+        second = instruction.second
+        if isinstance(second, EffectiveAddress):
+            read_second = second.read
+
+            def compare_cells(context: ExecutionContext, index: int) -> int:
+                cells = context.cells
+                return compare(read_first(cells), read_second(cells))
+
+            return compare_cells
+
+        def compare_constant(context: ExecutionContext, index: int) -> int:
+            return compare(read_first(context.cells), second)
+
+        return compare_constant
+
+    def __compile_memset(self, instruction: MemsetInstruction) -> CompiledInstruction:
+        write = instruction.target.write
+        source = instruction.source
+
+        if instruction.method == "=":
+            if isinstance(source, EffectiveAddress):
+                read_source = source.read
+
+                def assign_cell(context: ExecutionContext, index: int) -> int:
+                    cells = context.cells
+                    write(cells, read_source(cells))
+                    return 0
+
+                return assign_cell
+
+            if isinstance(source, str):
+                encoded = instruction.encoded
+
+                def assign_string(context: ExecutionContext, index: int) -> int:
+                    write(context.cells, encoded)
+                    return 0
+
+                return assign_string
+
+            def assign_constant(context: ExecutionContext, index: int) -> int:
+                write(context.cells, source)
+                return 0
+
+            return assign_constant
+
+        if instruction.method not in MEMSET_OPERATORS:
+            raise RuntimeError(f"Unknown memset method: {instruction.method}")
+        if isinstance(source, str):
+            method = instruction.method
+
+            def update_from_string(context: ExecutionContext, index: int) -> int:
+                # fails only when it runs, like the assertion of the tree-walker
+                raise AssertionError(f"Cannot apply {method!r} to a string")
+
+            return update_from_string
+
+        combine = MEMSET_OPERATORS[instruction.method]
+        read_target = instruction.target.read
+
+        if isinstance(source, EffectiveAddress):
+            read_source = source.read
+
+            def update_from_cell(context: ExecutionContext, index: int) -> int:
+                cells = context.cells
+                value = read_source(cells)
+                write(cells, combine(read_target(cells), value))
+                return 0
+
+            return update_from_cell
+
+        def update_from_constant(context: ExecutionContext, index: int) -> int:
+            cells = context.cells
+            write(cells, combine(read_target(cells), source))
+            return 0
+
+        return update_from_constant
+
+
+def execute_closures(context: ExecutionContext, index: int) -> int:
+    """Compile the root sequence into closures and run it.
+
+    Args:
+        context (ExecutionContext): Memory and root sequence of the program.
+        index (int): The index the program is called with.
+
+    Returns:
+        int: The result of the root sequence.
+    """
+    return ClosureCompiler().compile(context.root_sequence)(context, index)
+
+
+class Opcode(IntEnum):
+    """Opcodes of the bytecode VM. Operands follow the opcode in the code array."""
+
+    CONST = 0
+    """CONST k: acc = constants[k]"""
+    LOAD = 1
+    """LOAD r: acc = value read by the reader constants[r]"""
+    JUMP = 2
+    """JUMP t: continue at t"""
+    JUMP_IF_FALSE = 3
+    """JUMP_IF_FALSE t: continue at t if acc is false"""
+    CHECK_INDEX = 4
+    """CHECK_INDEX k: acc = index == constants[k]"""
+    CHECK_INDEX_CELL = 5
+    """CHECK_INDEX_CELL r: acc = index == value read by constants[r]"""
+    CALL = 6
+    """CALL k: push a frame and run the program with index constants[k]"""
+    TAIL_CALL = 7
+    """TAIL_CALL k: run the program with index constants[k], reusing the current frame"""
+    RETURN = 8
+    """RETURN: pop a frame, acc is the result"""
+    OUTPUT_CHAR = 9
+    """OUTPUT_CHAR r: write the value read by constants[r] as a character"""
+    OUTPUT_INTEGER = 10
+    """OUTPUT_INTEGER r: write the value read by constants[r] as a number"""
+    COMPARE = 11
+    """COMPARE f r k: acc = constants[f](value read by constants[r], constants[k])"""
+    COMPARE_CELLS = 12
+    """COMPARE_CELLS f r s: acc = constants[f](value read by constants[r], value read by constants[s])"""
+    STORE = 13
+    """STORE w k: write constants[k] with the writer constants[w]"""
+    STORE_STRING = 14
+    """STORE_STRING w k: write the encoded string constants[k], see `encode_string`"""
+    STORE_CELL = 15
+    """STORE_CELL w r: write the value read by constants[r]"""
+    UPDATE = 16
+    """UPDATE f w r k: write constants[f](value read by constants[r], constants[k])"""
+    UPDATE_CELL = 17
+    """UPDATE_CELL f w r s: write constants[f](value read by constants[r], value read by constants[s])"""
+    EXECUTE = 18
+    """EXECUTE k: acc = constants[k].execute(context, index), for instructions without an opcode"""
+    DISPATCH = 19
+    """DISPATCH k f: continue at constants[k][index], or at f if the index is not in the table"""
+    INPUT = 20
+    """INPUT w: write the next input character, or 0 at the end of the input; acc = 1 if one was read"""
+
+
+OPERAND_COUNT: Final[dict[Opcode, int]] = {
+    Opcode.CONST: 1,
+    Opcode.LOAD: 1,
+    Opcode.JUMP: 1,
+    Opcode.JUMP_IF_FALSE: 1,
+    Opcode.CHECK_INDEX: 1,
+    Opcode.CHECK_INDEX_CELL: 1,
+    Opcode.CALL: 1,
+    Opcode.TAIL_CALL: 1,
+    Opcode.RETURN: 0,
+    Opcode.OUTPUT_CHAR: 1,
+    Opcode.OUTPUT_INTEGER: 1,
+    Opcode.COMPARE: 3,
+    Opcode.COMPARE_CELLS: 3,
+    Opcode.STORE: 2,
+    Opcode.STORE_STRING: 2,
+    Opcode.STORE_CELL: 2,
+    Opcode.UPDATE: 4,
+    Opcode.UPDATE_CELL: 4,
+    Opcode.EXECUTE: 1,
+    Opcode.DISPATCH: 2,
+    Opcode.INPUT: 1,
+}
+"""Number of operands following each opcode."""
+
+
+class BytecodeProgram:
+    """A program lowered to a linear bytecode, see `Opcode`."""
+
+    def __init__(self, code: array, constants: tuple):
+        self.code: Final[array] = code
+        """Opcodes and their operands; jump targets are offsets into this array."""
+        self.constants: Final[tuple] = constants
+        """Constant pool: values, encoded strings, cell readers and writers, operators and fallback instructions."""
+
+    def disassemble(self) -> str:
+        """Render the code in a human readable form.
+
+        Returns:
+            str: One line per opcode.
+        """
+        lines = []
+        pc = 0
+        while pc < len(self.code):
+            opcode = Opcode(self.code[pc])
+            operands = self.code[pc + 1 : pc + 1 + OPERAND_COUNT[opcode]]
+            lines.append(f"{pc:>6} {opcode.name:<16} {' '.join(str(o) for o in operands)}")
+            pc += 1 + OPERAND_COUNT[opcode]
+        return "\n".join(lines)
+
+
+class BytecodeCompiler:
+    """Lowers a parsed instruction tree into a `BytecodeProgram`.
+
+    Each instruction leaves its result in the accumulator, so a sequence is just its
+    instructions one after the other. The root sequence starts at offset 0; `CALL`
+    jumps back there with a new index. If the root sequence is a chain of index checks,
+    it starts with a `DISPATCH` through the jump table instead. Sequences in tail position of the root end in
+    `RETURN` instead of jumping to the end of their if, and a recursion in tail
+    position becomes `TAIL_CALL`.
+    """
+
+    def __init__(self):
+        self.__code: array = array("i")
+        self.__constants: list = []
+        self.__constant_keys: dict = {}
+
+    def compile(self, root_sequence: list[Instruction]) -> BytecodeProgram:
+        """Compile a program.
+
+        Args:
+            root_sequence (list[Instruction]): The root sequence of the program.
+
+        Returns:
+            BytecodeProgram: The lowered program.
+        """
+        self.__code = array("i")
+        self.__constants = []
+        self.__constant_keys = {}
+        dispatch = IndexDispatch.build(root_sequence)
+        if dispatch is None:
+            self.__sequence(root_sequence, tail=True)
+        else:
+            table: dict[int, int] = {}
+            operand = self.__emit(Opcode.DISPATCH, self.__constant(("dispatch",), table), 0)
+            for index, body in dispatch.table.items():
+                table[index] = len(self.__code)
+                self.__sequence(body, tail=True)
+            self.__code[operand] = len(self.__code)
+            self.__sequence(dispatch.fallback, tail=True)
+        return BytecodeProgram(self.__code, tuple(self.__constants))
+
+    def __emit(self, opcode: Opcode, *operands: int) -> int:
+        """Append an opcode with its operands.
+
+        Returns:
+            int: The offset of the last operand, used to patch jump targets.
+        """
+        self.__code.append(opcode)
+        self.__code.extend(operands)
+        return len(self.__code) - 1
+
+    def __constant(self, key: object, value: object) -> int:
+        """Add a value to the constant pool, sharing equal entries.
+
+        Args:
+            key (object): Identity of the value, entries with equal keys are shared.
+            value (object): The value to store.
+
+        Returns:
+            int: Index of the value in the constant pool.
+        """
+        if key not in self.__constant_keys:
+            self.__constant_keys[key] = len(self.__constants)
+            self.__constants.append(value)
+        return self.__constant_keys[key]
+
+    def __value(self, value: int) -> int:
+        return self.__constant(("value", type(value), value), value)
+
+    def __reader(self, ea: EffectiveAddress) -> int:
+        return self.__constant(("read", repr(ea)), ea.read)
+
+    def __writer(self, ea: EffectiveAddress) -> int:
+        return self.__constant(("write", repr(ea.address)), ea.write)
+
+    def __operator(self, function: Callable) -> int:
+        return self.__constant(("operator", function), function)
+
+    def __sequence(self, instructions: list[Instruction], tail: bool) -> None:
+        """Emit a sequence of instructions.
+
+        Args:
+            instructions (list[Instruction]): The sequence to emit.
+            tail (bool): True if the sequence is in tail position of the root sequence.
+        """
+        if not instructions:
+            self.__emit(Opcode.CONST, self.__value(0))
+        for position, instruction in enumerate(instructions):
+            self.__instruction(instruction, tail and position == len(instructions) - 1)
+        if tail and not (instructions and isinstance(instructions[-1], (IfInstruction, RecurseInstruction))):
+            self.__emit(Opcode.RETURN)
+
+    def __instruction(self, instruction: Instruction, tail: bool) -> None:
+        """Emit a single instruction.
+
+        Args:
+            instruction (Instruction): The instruction to emit.
+            tail (bool): True if the result of the instruction is the result of the root sequence.
+                If, and only if, the instruction is an if or a recursion, it then returns by itself.
+        """
+        match instruction:
+            case IfInstruction():
+                self.__if(instruction, tail)
+            case RecurseInstruction():
+                opcode = Opcode.TAIL_CALL if tail else Opcode.CALL
+                self.__emit(opcode, self.__value(instruction.index))
+            case CheckIndexInstruction() if isinstance(instruction.value, EffectiveAddress):
+                self.__emit(Opcode.CHECK_INDEX_CELL, self.__reader(instruction.value))
+            case CheckIndexInstruction():
+                self.__emit(Opcode.CHECK_INDEX, self.__value(instruction.value))
+            case ConstantInstruction():
+                self.__emit(Opcode.CONST, self.__value(instruction.value))
+            case InputInstruction():
+                self.__emit(Opcode.INPUT, self.__writer(instruction.address))
+            case OutputCharInstruction():
+                self.__emit(Opcode.OUTPUT_CHAR, self.__reader(instruction.address))
+            case OutputIntegerInstruction():
+                self.__emit(Opcode.OUTPUT_INTEGER, self.__reader(instruction.address))
+            case ComparisonInstruction():
+                self.__comparison(instruction)
+            case MemsetInstruction():
+                self.__memset(instruction)
+            case _:
+                self.__emit(Opcode.EXECUTE, self.__constant(("execute", id(instruction)), instruction))
+
+    def __if(self, instruction: IfInstruction, tail: bool) -> None:
+        condition = instruction.condition
+        if isinstance(condition, EffectiveAddress):
+            self.__emit(Opcode.LOAD, self.__reader(condition))
+        else:
+            self.__instruction(condition, tail=False)
+        jump_to_false = self.__emit(Opcode.JUMP_IF_FALSE, 0)
+        self.__sequence(instruction.if_true, tail)
+        jump_to_end = None if tail else self.__emit(Opcode.JUMP, 0)
+        self.__code[jump_to_false] = len(self.__code)
+        self.__sequence(instruction.if_false, tail)
+        if jump_to_end is not None:
+            self.__code[jump_to_end] = len(self.__code)
+
+    def __comparison(self, instruction: ComparisonInstruction) -> None:
+        if instruction.method not in COMPARISON_OPERATORS:
+            raise RuntimeError(f"Unknown comparison method: {instruction.method}")
+        compare = self.__operator(COMPARISON_OPERATORS[instruction.method])
+        first = self.__reader(instruction.first)
+        second = instruction.second
+        if isinstance(second, EffectiveAddress):
+            self.__emit(Opcode.COMPARE_CELLS, compare, first, self.__reader(second))
+        else:
+            self.__emit(Opcode.COMPARE, compare, first, self.__value(second))
+
+    def __memset(self, instruction: MemsetInstruction) -> None:
+        write = self.__writer(instruction.target)
+        source = instruction.source
+        if instruction.method == "=":
+            if isinstance(source, EffectiveAddress):
+                self.__emit(Opcode.STORE_CELL, write, self.__reader(source))
+            elif isinstance(source, str):
+                self.__emit(Opcode.STORE_STRING, write, self.__constant(("string", source), instruction.encoded))
+            else:
+                self.__emit(Opcode.STORE, write, self.__value(source))
+            return
+
+        if instruction.method not in MEMSET_OPERATORS:
+            raise RuntimeError(f"Unknown memset method: {instruction.method}")
+        if isinstance(source, str):
+            # fails only when it runs, with the assertion of the tree-walker
+            self.__emit(Opcode.EXECUTE, self.__constant(("execute", id(instruction)), instruction))
+            return
+        combine = self.__operator(MEMSET_OPERATORS[instruction.method])
+        target = self.__reader(instruction.target)
+        if isinstance(source, EffectiveAddress):
+            self.__emit(Opcode.UPDATE_CELL, combine, write, target, self.__reader(source))
+        else:
+            self.__emit(Opcode.UPDATE, combine, write, target, self.__value(source))
+
+
+def run_bytecode(program: BytecodeProgram, context: ExecutionContext, index: int) -> int:
+    """Execute a bytecode program with an explicit frame stack.
+
+    Args:
+        program (BytecodeProgram): The program to run.
+        context (ExecutionContext): Memory of the program.
+        index (int): The index the program is called with.
+
+    Returns:
+        int: The result of the root sequence.
+    """
+    # pylint: disable=too-many-branches,too-many-statements,too-many-locals,invalid-name
+    # plain ints in locals, comparing against IntEnum members is much slower
+    CONST = int(Opcode.CONST)
+    LOAD = int(Opcode.LOAD)
+    JUMP = int(Opcode.JUMP)
+    JUMP_IF_FALSE = int(Opcode.JUMP_IF_FALSE)
+    CHECK_INDEX = int(Opcode.CHECK_INDEX)
+    CHECK_INDEX_CELL = int(Opcode.CHECK_INDEX_CELL)
+    CALL = int(Opcode.CALL)
+    TAIL_CALL = int(Opcode.TAIL_CALL)
+    RETURN = int(Opcode.RETURN)
+    OUTPUT_CHAR = int(Opcode.OUTPUT_CHAR)
+    OUTPUT_INTEGER = int(Opcode.OUTPUT_INTEGER)
+    COMPARE = int(Opcode.COMPARE)
+    COMPARE_CELLS = int(Opcode.COMPARE_CELLS)
+    STORE = int(Opcode.STORE)
+    STORE_STRING = int(Opcode.STORE_STRING)
+    STORE_CELL = int(Opcode.STORE_CELL)
+    UPDATE = int(Opcode.UPDATE)
+    UPDATE_CELL = int(Opcode.UPDATE_CELL)
+    EXECUTE = int(Opcode.EXECUTE)
+    DISPATCH = int(Opcode.DISPATCH)
+    INPUT = int(Opcode.INPUT)
+    code = program.code
+    constants = program.constants
+    cells = context.cells
+    frames: list[int] = []
+    pc = 0
+    acc = 0
+    while True:
+        opcode = code[pc]
+        if opcode == DISPATCH:
+            pc = constants[code[pc + 1]].get(index, code[pc + 2])
+        elif opcode == JUMP_IF_FALSE:
+            pc = pc + 2 if acc else code[pc + 1]
+        elif opcode == LOAD:
+            acc = constants[code[pc + 1]](cells)
+            pc += 2
+        elif opcode == CHECK_INDEX:
+            acc = index == constants[code[pc + 1]]
+            pc += 2
+        elif opcode == UPDATE:
+            constants[code[pc + 2]](
+                cells, constants[code[pc + 1]](constants[code[pc + 3]](cells), constants[code[pc + 4]])
+            )
+            acc = 0
+            pc += 5
+        elif opcode == COMPARE:
+            acc = constants[code[pc + 1]](constants[code[pc + 2]](cells), constants[code[pc + 3]])
+            pc += 4
+        elif opcode == TAIL_CALL:
+            index = constants[code[pc + 1]]
+            pc = 0
+        elif opcode == CALL:
+            frames.append(pc + 2)
+            frames.append(index)
+            index = constants[code[pc + 1]]
+            pc = 0
+        elif opcode == RETURN:
+            if not frames:
+                return acc
+            index = frames.pop()
+            pc = frames.pop()
+        elif opcode == JUMP:
+            pc = code[pc + 1]
+        elif opcode == CONST:
+            acc = constants[code[pc + 1]]
+            pc += 2
+        elif opcode == STORE:
+            constants[code[pc + 1]](cells, constants[code[pc + 2]])
+            acc = 0
+            pc += 3
+        elif opcode == STORE_CELL:
+            constants[code[pc + 1]](cells, constants[code[pc + 2]](cells))
+            acc = 0
+            pc += 3
+        elif opcode == UPDATE_CELL:
+            value = constants[code[pc + 4]](cells)
+            constants[code[pc + 2]](cells, constants[code[pc + 1]](constants[code[pc + 3]](cells), value))
+            acc = 0
+            pc += 5
+        elif opcode == COMPARE_CELLS:
+            acc = constants[code[pc + 1]](constants[code[pc + 2]](cells), constants[code[pc + 3]](cells))
+            pc += 4
+        elif opcode == OUTPUT_CHAR:
+            context.output.write_char(constants[code[pc + 1]](cells))
+            acc = 1
+            pc += 2
+        elif opcode == OUTPUT_INTEGER:
+            context.output.write_integer(constants[code[pc + 1]](cells))
+            acc = 1
+            pc += 2
+        elif opcode == CHECK_INDEX_CELL:
+            acc = index == constants[code[pc + 1]](cells)
+            pc += 2
+        elif opcode == STORE_STRING:
+            constants[code[pc + 1]](cells, constants[code[pc + 2]])
+            acc = 0
+            pc += 3
+        elif opcode == INPUT:
+            value = context.input.read_char()
+            acc = 0 if value < 0 else 1
+            constants[code[pc + 1]](cells, value if acc else 0)
+            pc += 2
+        elif opcode == EXECUTE:
+            acc = constants[code[pc + 1]].execute(context, index)
+            pc += 2
+        else:
+            raise RuntimeError(f"Unknown opcode {opcode} at {pc}")
+
+
+def execute_bytecode(context: ExecutionContext, index: int) -> int:
+    """Compile the root sequence to bytecode and run it.
+
+    Args:
+        context (ExecutionContext): Memory and root sequence of the program.
+        index (int): The index the program is called with.
+
+    Returns:
+        int: The result of the root sequence.
+    """
+    return run_bytecode(BytecodeCompiler().compile(context.root_sequence), context, index)
+
+
+PYTHON_COMPARISONS: Final[dict[str, str]] = {"+": "<", "-": "==", "*": ">", "/": "!="}
+"""Maps the comparison characters to Python operators, for the transpiler."""
+
+PYTHON_OPERATORS: Final[dict[str, str]] = {"+": "+", "-": "-", "*": "*", "/": "//"}
+"""Maps the arithmetic memset characters to Python operators, for the transpiler."""
+
+
+class PythonTranspiler:
+    """Translates an instruction tree into the source of a standalone Python module.
+
+    Every entry of the index dispatch table becomes a function of its own, memory accesses
+    become plain dict operations on `cells`, and comparisons and arithmetic become native
+    Python operators. `_` and `$` are resolved to numbers by the parser, so they end up as
+    literals. The module carries its own copy of `OutputSink` and `InputSource`; it runs as
+    a script, or through its `run(index, cells, output, input_source)` function.
+
+    A recursion in tail position returns the function to continue with, and `trampoline`
+    calls it, so loops run without growing the Python stack, like `execute_call` does.
+    Checked cells go through small reader functions with the assertions of
+    `EffectiveAddress`, so errors are those of the tree-walker; only cells `CellTypes`
+    has proven to hold numbers become plain dict operations.
+    """
+
+    __MAX_DEPTH: Final[int] = 40
+    """Nesting depth at which a branch moves into a function of its own; Python limits indentation to 100 levels."""
+
+    __RUNTIME: Final[str] = (
+        "    def trampoline(result: int | Callable[[], int]) -> int:\n"
+        "        # a tail call returns the function to continue with instead of calling it\n"
+        "        while callable(result):\n"
+        "            result = result()\n"
+        "        return result\n\n"
+        "    def read_cell(address: int) -> int:\n"
+        "        value = cells.setdefault(address, 0)\n"
+        '        assert isinstance(value, int), "Effective address must have an offset"\n'
+        "        return value\n\n"
+        "    def read_pointer(base: int) -> int:\n"
+        "        first = cells[base]\n"
+        '        assert isinstance(first, int), "Offset must be an int"\n'
+        "        return first\n\n"
+        "    def read_element(address: int, position: int) -> int:\n"
+        "        value = cells.setdefault(address, 0)\n"
+        '        assert not isinstance(value, int), "Effective address must not have an offset"\n'
+        "        return value[position]\n\n"
+        "    def read_element_at(address: int, offset: int) -> int:\n"
+        "        value = cells.setdefault(address, 0)\n"
+        '        assert not isinstance(value, int), "Effective address must not have an offset"\n'
+        "        position = cells.setdefault(offset, 0)\n"
+        '        assert isinstance(position, int), "Effective address must have an offset"\n'
+        "        return value[position]\n"
+    )
+    """The helpers every generated module defines in `run`; the readers are those of `EffectiveAddress`."""
+
+    def __init__(self):
+        self.__functions: list[list[str]] = []
+        """The source lines of all generated functions, indented for the body of `run`."""
+        self.__names: dict[int, str] = {}
+        """The function for each index of the dispatch table."""
+        self.__fallback: str = "program"
+        """The function for all other indices, called with the index."""
+        self.__tail_calls: set[int] = set()
+        """Indices the fallback is tail called with, each needs a function without parameters."""
+
+    def transpile(self, root_sequence: list[Instruction], name: str = "a JUSTIF program") -> str:
+        """Translate a program into Python source.
+
+        Args:
+            root_sequence (list[Instruction]): The root sequence of the program.
+            name (str, optional): What the module docstring says it was translated from.
+
+        Returns:
+            str: The source of the module.
+        """
+        self.__functions = []
+        self.__tail_calls = set()
+        dispatch = IndexDispatch.build(root_sequence)
+        if dispatch is None:
+            self.__names = {}
+            self.__fallback = "program"
+            self.__function(self.__fallback, root_sequence, None)
+        else:
+            self.__names = {index: f"index_{index}" for index in dispatch.table}
+            self.__fallback = "fallback"
+            for index, body in dispatch.table.items():
+                self.__function(self.__names[index], body, index)
+            self.__function(self.__fallback, dispatch.fallback, None)
+
+        entry = (
+            f"    if index in entry_points:\n        return trampoline(entry_points[index]())\n"
+            f"    return trampoline({self.__fallback}(index))\n"
+        )
+        table = ", ".join(f"{index}: {function}" for index, function in self.__names.items())
+        functions = "\n".join("\n".join(lines) + "\n" for lines in self.__functions)
+        tail_calls = "".join(
+            f"    {self.__fallback}_{index} = lambda: {self.__fallback}({index})\n" for index in sorted(self.__tail_calls)
+        )
+        return (
+            f'"""{name}, translated to Python by justif.py. Run with `python <this file> [input file]`."""\n'
+            "# generated code, do not edit\n"
+            "from __future__ import annotations\n\n"
+            "import mmap\nimport os\nimport sys\n"
+            "from collections.abc import Callable, MutableMapping\n"
+            "from typing import BinaryIO, Final\n\n\n"
+            f"{inspect.getsource(OutputSink)}\n\n{inspect.getsource(InputSource)}\n\n"
+            "def run(\n"
+            "    index: int = 1,\n"
+            "    cells: MutableMapping | None = None,\n"
+            "    output: OutputSink | None = None,\n"
+            "    input_source: InputSource | None = None,\n"
+            ") -> int:\n"
+            '    """Run the program, like `justif.ENGINES` do; the caller flushes the output."""\n'
+            "    cells = {} if cells is None else cells\n"
+            "    output = OutputSink() if output is None else output\n"
+            "    input_source = InputSource() if input_source is None else input_source\n"
+            "    write_char = output.write_char\n"
+            "    write_integer = output.write_integer\n"
+            "    read_char = input_source.read_char\n\n"
+            f"{self.__RUNTIME}\n"
+            f"{functions}\n"
+            f"{tail_calls}"
+            f"    entry_points = {{{table}}}\n"
+            f"{entry}\n\n"
+            'if __name__ == "__main__":\n'
+            "    sink = OutputSink()\n"
+            "    try:\n"
+            "        run(1, {}, sink, InputSource.from_file(sys.argv[1]) if len(sys.argv) > 1 else InputSource())\n"
+            "    finally:\n"
+            "        sink.flush()\n"
+            "    print()\n"
+        )
+
+    def __function(self, name: str, instructions: list[Instruction], index: int | None) -> None:
+        """Generate a function nested in `run`.
+
+        Args:
+            name (str): The name of the function.
+            instructions (list[Instruction]): Its body.
+            index (int | None): The index the function always runs with, or None if it is a parameter.
+        """
+        lines = [f"    def {name}() -> int:" if index is not None else f"    def {name}(index: int) -> int:"]
+        self.__functions.append(lines)
+        self.__sequence(instructions, lines, 2, "index" if index is None else str(index), True)
+
+    def __sequence(self, instructions: list[Instruction], lines: list[str], depth: int, index: str, tail: bool) -> None:
+        """Generate the statements of a sequence.
+
+        Args:
+            instructions (list[Instruction]): The sequence.
+            lines (list[str]): The lines to append to.
+            depth (int): The indentation level.
+            index (str): The expression for the current index.
+            tail (bool): True if the sequence must return its result.
+        """
+        if depth > self.__MAX_DEPTH:
+            name = f"block_{len(self.__functions)}"
+            block = [f"    def {name}(index: int) -> int:"]
+            self.__functions.append(block)
+            self.__sequence(instructions, block, 2, "index", tail)
+            lines.append("    " * depth + (f"return {name}({index})" if tail else f"{name}({index})"))
+            return
+        start = len(lines)
+        for position, instruction in enumerate(instructions):
+            self.__instruction(instruction, lines, depth, index, tail and position == len(instructions) - 1)
+        if len(lines) == start:
+            lines.append("    " * depth + "pass")
+
+    def __instruction(self, instruction: Instruction, lines: list[str], depth: int, index: str, tail: bool) -> None:
+        """Generate the statements of a single instruction.
+
+        Args:
+            instruction (Instruction): The instruction.
+            lines (list[str]): The lines to append to.
+            depth (int): The indentation level.
+            index (str): The expression for the current index.
+            tail (bool): True if the instruction must return its result.
+        """
+        indent = "    " * depth
+        match instruction:
+            case IfInstruction():
+                keyword = "if"
+                while True:
+                    lines.append(f"{indent}{keyword} {self.__condition(instruction.condition, index)}:")
+                    self.__sequence(instruction.if_true, lines, depth + 1, index, tail)
+                    if_false = instruction.if_false
+                    if len(if_false) != 1 or not isinstance(if_false[0], IfInstruction):
+                        break
+                    # chains of ifs in the false branches become elifs instead of nesting deeper
+                    keyword = "elif"
+                    instruction = if_false[0]
+                lines.append(f"{indent}else:")
+                self.__sequence(if_false, lines, depth + 1, index, tail)
+            case InputInstruction():
+                target = self.__target(instruction.address)
+                if tail:
+                    lines.append(f"{indent}value = read_char()")
+                    lines.append(f"{indent}{target} = max(value, 0)")
+                    lines.append(f"{indent}return 0 if value < 0 else 1")
+                else:
+                    lines.append(f"{indent}{target} = max(read_char(), 0)")
+            case OutputCharInstruction():
+                lines.append(f"{indent}write_char({self.__read(instruction.address)})")
+                if tail:
+                    lines.append(f"{indent}return 1")
+            case OutputIntegerInstruction():
+                lines.append(f"{indent}write_integer({self.__read(instruction.address)})")
+                if tail:
+                    lines.append(f"{indent}return 1")
+            case MemsetInstruction():
+                lines.append(f"{indent}{self.__memset(instruction)}")
+                if tail:
+                    lines.append(f"{indent}return 0")
+            case ConstantInstruction():
+                if tail:
+                    lines.append(f"{indent}return {instruction.value}")
+            case RecurseInstruction() if tail:
+                lines.append(f"{indent}return {self.__tail_call(instruction.index)}")
+            case IdiomInstruction():
+                # the loop is plain Python here anyway
+                self.__sequence(instruction.body, lines, depth, index, tail)
+            case _:
+                expression = self.__condition(instruction, index)
+                if tail:
+                    lines.append(f"{indent}return {expression}")
+                elif not isinstance(instruction, CheckIndexInstruction) or isinstance(instruction.value, EffectiveAddress):
+                    # keep reads for their side effect: they create missing cells
+                    lines.append(f"{indent}{expression}")
+
+    def __condition(self, condition: EffectiveAddress | Instruction, index: str) -> str:
+        """Generate the expression for an if condition, or any instruction without side effects on the output.
+
+        Args:
+            condition (EffectiveAddress | Instruction): The condition.
+            index (str): The expression for the current index.
+
+        Returns:
+            str: A Python expression.
+        """
+        match condition:
+            case EffectiveAddress():
+                return self.__read(condition)
+            case ComparisonInstruction():
+                if condition.method not in PYTHON_COMPARISONS:
+                    raise RuntimeError(f"Unknown comparison method: {condition.method}")
+                return f"{self.__read(condition.first)} {PYTHON_COMPARISONS[condition.method]} {self.__value(condition.second)}"
+            case RecurseInstruction():
+                if condition.index in self.__names:
+                    return f"trampoline({self.__names[condition.index]}())"
+                return f"trampoline({self.__fallback}({condition.index}))"
+            case CheckIndexInstruction():
+                return f"{index} == {self.__value(condition.value)}"
+            case ConstantInstruction():
+                return str(condition.value)
+            case _:
+                raise RuntimeError(f"Cannot translate {condition!r}")
+
+    def __tail_call(self, index: int) -> str:
+        """Generate the function a tail call hands to `trampoline`.
+
+        Args:
+            index (int): The index the program calls itself with.
+
+        Returns:
+            str: A Python expression.
+        """
+        if index in self.__names:
+            return self.__names[index]
+        self.__tail_calls.add(index)
+        return f"{self.__fallback}_{index}"
+
+    def __memset(self, instruction: MemsetInstruction) -> str:
+        """Generate the assignment for a memset.
+
+        Args:
+            instruction (MemsetInstruction): The memset.
+
+        Returns:
+            str: One or more Python statements, separated by semicolons.
+        """
+        target = self.__target(instruction.target)
+        if instruction.method == "=":
+            return f"{target} = {self.__value(instruction.source)}"
+        if instruction.method not in PYTHON_OPERATORS:
+            raise RuntimeError(f"Unknown memset method: {instruction.method}")
+        if isinstance(instruction.source, str):
+            # fails only when it runs, like the assertion of the tree-walker
+            return f"raise AssertionError({f'Cannot apply {instruction.method!r} to a string'!r})"
+        operator_ = PYTHON_OPERATORS[instruction.method]
+        if isinstance(instruction.source, EffectiveAddress) and instruction.checked:
+            # the tree-walker reads the source first, which matters if the target read fails
+            return f"value = {self.__read(instruction.source)}; {target} = {self.__read(instruction.target)} {operator_} value"
+        return f"{target} = {self.__read(instruction.target)} {operator_} {self.__value(instruction.source)}"
+
+    @staticmethod
+    def __value(value: int | str | EffectiveAddress) -> str:
+        """Generate the expression for an operand.
+
+        Args:
+            value (int | str | EffectiveAddress): A constant, a string or a memory cell.
+
+        Returns:
+            str: A Python expression; strings become a constant, see `encode_string`.
+        """
+        match value:
+            case int():
+                return str(value)
+            case str():
+                return repr(encode_string(value))
+            case EffectiveAddress():
+                return PythonTranspiler.__read(value)
+            case _:
+                raise RuntimeError(f"Bad type {type(value)} for assignment")
+
+    @staticmethod
+    def __read(ea: EffectiveAddress) -> str:
+        """Generate the expression reading a cell, the counterpart of `EffectiveAddress.read`.
+
+        Args:
+            ea (EffectiveAddress): The cell.
+
+        Returns:
+            str: A Python expression.
+        """
+        base = ea.address.address
+        if ea.checked:
+            if ea.offset is None:
+                return f"read_cell({base})" if ea.address.direct else f"read_cell(read_pointer({base}))"
+            first = str(base) if ea.address.direct else f"cells[{base}]"
+            if ea.offset.direct:
+                return f"read_element({first}, {ea.offset.address})"
+            return f"read_element_at({first}, {ea.offset.address})"
+        first = str(base) if ea.address.direct else f"cells[{base}]"
+        value = f"cells.setdefault({first}, 0)"
+        if ea.offset is None:
+            return value
+        if ea.offset.direct:
+            return f"{value}[{ea.offset.address}]"
+        return f"{value}[cells.setdefault({ea.offset.address}, 0)]"
+
+    @staticmethod
+    def __target(ea: EffectiveAddress) -> str:
+        """Generate the assignment target for a cell, the counterpart of `EffectiveAddress.write`.
+
+        Args:
+            ea (EffectiveAddress): The cell; like the writer, this ignores the offset.
+
+        Returns:
+            str: A Python assignment target.
+        """
+        base = ea.address.address
+        if ea.address.direct:
+            return f"cells[{base}]"
+        return f"cells[read_pointer({base})]" if ea.checked else f"cells[cells[{base}]]"
+
+
+def execute_transpiled(context: ExecutionContext, index: int) -> int:
+    """Translate the root sequence to Python, compile it and run it in-process.
+
+    Args:
+        context (ExecutionContext): Memory and root sequence of the program.
+        index (int): The index the program is called with.
+
+    Returns:
+        int: The result of the root sequence.
+    """
+    namespace: dict[str, object] = {"__name__": "justif_transpiled"}
+    source = PythonTranspiler().transpile(context.root_sequence)
+    exec(compile(source, "<transpiled>", "exec"), namespace)  # pylint: disable=exec-used
+    return namespace["run"](index, context.cells, context.output, context.input)
+
+
+ENGINES: Final[dict[str, Callable[[ExecutionContext, int], int]]] = {
+    "tree": execute_tree,
+    "traced": execute_traced,
+    "stackless": execute_stackless,
+    "closure": execute_closures,
+    "bytecode": execute_bytecode,
+    "transpiled": execute_transpiled,
+}
+"""Available execution engines, selectable with `--engine`."""
+
+
+def prepare_engine(engine: str, root_sequence: list[Instruction]) -> Callable[[ExecutionContext, int], int]:
+    """Compile a program once for an engine, so that many contexts can run it.
+
+    The closure, bytecode and transpiled engines otherwise compile the root sequence again
+    on every run; the interpreters need no preparation and are returned as they are.
+
+    Args:
+        engine (str): The engine, one of ENGINES.
+        root_sequence (list[Instruction]): The program, as set on an `ExecutionContext`.
+
+    Returns:
+        Callable[[ExecutionContext, int], int]: Runs the program in a context, like the entries of ENGINES.
+    """
+    match engine:
+        case "closure":
+            return ClosureCompiler().compile(root_sequence)
+        case "bytecode":
+            return partial(run_bytecode, BytecodeCompiler().compile(root_sequence))
+        case "transpiled":
+            namespace: dict[str, object] = {"__name__": "justif_transpiled"}
+            exec(compile(PythonTranspiler().transpile(root_sequence), "<transpiled>", "exec"), namespace)  # pylint: disable=exec-used
+            run = namespace["run"]
+            return lambda context, index: run(index, context.cells, context.output, context.input)
+    return ENGINES[engine]
+
+
+class Program:
+    """A program prepared for execution once, and shared by any number of contexts and threads.
+
+    Its root sequence is rewritten like `ExecutionContext.root_sequence` does and compiled for
+    its engine, see `prepare_engine`. Nothing of it changes afterwards: all state of a run
+    lives in the `ExecutionContext` it runs in, so concurrent runs need nothing but a context
+    each, with their own memory, output and input.
+    """
+
+    __slots__ = ("__root_sequence", "__dispatch", "__engine", "__execute", "__unchecked", "__cell_types")
+
+    def __init__(self, root_sequence: list[Instruction], engine: str = "tree"):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}, expected one of {', '.join(ENGINES)}")
+        self.__root_sequence: Final[list[Instruction]] = mark_tail_calls(recognize_idioms(root_sequence))
+        self.__dispatch: Final[IndexDispatch | None] = IndexDispatch.build(self.__root_sequence)
+        self.__engine: Final[str] = engine
+        self.__execute: Final[Callable[[ExecutionContext, int], int]] = prepare_engine(engine, self.__root_sequence)
+        self.__unchecked: Final[tuple[tuple[EffectiveAddress, bool], ...]] = tuple(
+            CellTypes.unchecked_addresses(self.__root_sequence)
+        )
+        """The addresses `CellTypes` made unchecked, which rely on what the memory holds."""
+        self.__cell_types: Final[CellTypes | None] = CellTypes(self.__root_sequence) if self.__unchecked else None
+        """The analysis for empty memory, extended by each initial memory in `check_memory`."""
+
+    def __repr__(self):
+        return f"Program(engine={self.__engine!r}, {len(self.__root_sequence)} instructions)"
+
+    @staticmethod
+    def parse(source: str, engine: str = "tree", optimize: bool = False) -> Program | None:
+        """Parse a program with a parser of its own and prepare it.
+
+        Args:
+            source (str): The program text.
+            engine (str, optional): The engine, one of ENGINES. Defaults to "tree".
+            optimize (bool, optional): Run the `Optimizer` over the parsed program. Defaults to False.
+
+        Returns:
+            Program | None: The program, or None if it cannot be parsed.
+        """
+        root_sequence = JustifParser(iterative=True).parse_expression(source)
+        if root_sequence is None:
+            return None
+        if optimize:
+            root_sequence = Optimizer().optimize(root_sequence)
+        return Program(root_sequence, engine)
+
+    @property
+    def root_sequence(self) -> list[Instruction]:
+        """The rewritten root sequence; it must not be modified."""
+        return self.__root_sequence
+
+    @property
+    def dispatch(self) -> IndexDispatch | None:
+        """Jump table for the root sequence, if it starts with a chain of index checks."""
+        return self.__dispatch
+
+    @property
+    def engine(self) -> str:
+        """The engine the program was prepared for."""
+        return self.__engine
+
+    def context(
+        self,
+        cells: MutableMapping | None = None,
+        output: OutputSink | None = None,
+        input_source: InputSource | None = None,
+        context_class: type[ExecutionContext] = ExecutionContext,
+    ) -> ExecutionContext:
+        """Create a context that runs this program. Threads should pass their own output and input.
+
+        Args:
+            cells (MutableMapping | None, optional): The initial memory. Defaults to empty memory.
+            output (OutputSink | None, optional): Where the output goes. Defaults to stdout.
+            input_source (InputSource | None, optional): Where input comes from. Defaults to stdin.
+            context_class (type[ExecutionContext], optional): The kind of context. Defaults to ExecutionContext.
+
+        Raises:
+            ValueError: The initial memory does not fit the unchecked parts of the program, see `check_memory`.
+
+        Returns:
+            ExecutionContext: The context.
+        """
+        self.check_memory(cells)
+        context = context_class(cells, output, input_source)
+        context.share_program(self)
+        return context
+
+    def check_memory(self, cells: Mapping[int, object] | None) -> None:
+        """Check that the program can start on an initial memory.
+
+        Parts of the program `CellTypes` made unchecked were proven safe for empty memory only.
+        The analysis is extended by the preloaded cells; every unchecked address must still be
+        proven safe, or an unexpected string would be read as a number, or the other way round,
+        without an assertion to stop it. Programs without unchecked parts accept any memory.
+
+        Args:
+            cells (Mapping[int, object] | None): The initial memory, None for empty memory.
+
+        Raises:
+            ValueError: An unchecked address is no longer proven safe.
+        """
+        if not cells or self.__cell_types is None:
+            return
+        unsafe = self.__cell_types.with_memory(cells).unsafe(self.__unchecked)
+        if unsafe:
+            raise ValueError(
+                f"The initial memory breaks what CellTypes proved about {unsafe[0]!r}; "
+                "run the program without unchecked addresses"
+            )
+
+    def execute(self, context: ExecutionContext, index: int = 1) -> int:
+        """Run the program in a context created by `context`. The caller flushes the output.
+
+        Args:
+            context (ExecutionContext): Memory, output and input of this run.
+            index (int, optional): The index the program is called with. Defaults to 1.
+
+        Returns:
+            int: The result of the program.
+        """
+        return self.__execute(context, index)
+
+    def run(
+        self,
+        index: int = 1,
+        cells: MutableMapping | None = None,
+        output: OutputSink | None = None,
+        input_source: InputSource | None = None,
+    ) -> int:
+        """Run the program in a new context and flush its output.
+
+        Returns:
+            int: The result of the program.
+        """
+        context = self.context(cells, output, input_source)
+        try:
+            return self.__execute(context, index)
+        finally:
+            context.output.flush()
+
+
+class _Suspend(Exception):
+    """Stops a run at the call `MemorySnapshot.capture` is waiting for."""
+
+
+class _CapturingContext(ExecutionContext):
+    """Runs a program until it is first called with `stop_index`, see `MemorySnapshot.capture`."""
+
+    def __init__(self, stop_index: int, cells: MutableMapping, output: OutputSink, input_source: InputSource | None):
+        super().__init__(cells, output, input_source)
+        self.stop_index: Final[int] = stop_index
+        """The index whose first call ends the run."""
+
+    def entry_point(self, index: int) -> list[Instruction]:
+        # the tree-walker looks up every call, tail call or not, here
+        if index == self.stop_index:
+            raise _Suspend()
+        return super().entry_point(index)
+
+
+class MemorySnapshot:
+    """The memory of a program at the first call of some index, to start many runs from there.
+
+    The snapshot is never modified. Forks see its cells and keep their own writes apart:
+    small memories are simply copied, which is cheaper than looking through two mappings on
+    every access, larger ones are shared copy-on-write with a `ChainMap`. Cells hold ints and
+    immutable strings, and a write always replaces a whole cell, so nothing a fork does can
+    reach the snapshot.
+
+    The memory is checked against the program once, see `Program.check_memory`, so forking
+    does not check it again.
+    """
+
+    COPY_LIMIT: Final[int] = 4096
+    """Snapshots with up to this many cells are copied into each fork instead of shared."""
+
+    def __init__(self, program: Program, cells: Mapping[int, object], index: int, output: bytes = b""):
+        program.check_memory(cells)
+        self.program: Final[Program] = program
+        """The program the snapshot was taken of."""
+        self.cells: Final[Mapping[int, object]] = MappingProxyType(dict(cells))
+        """A read-only copy of the memory."""
+        self.index: Final[int] = index
+        """The index the program was about to be called with, where forks resume by default."""
+        self.output: Final[bytes] = output
+        """What the program wrote before the snapshot was taken."""
+
+    def __repr__(self):
+        return f"MemorySnapshot(index={self.index}, {len(self.cells)} cells)"
+
+    @staticmethod
+    def capture(
+        program: Program,
+        stop_index: int,
+        index: int = 1,
+        cells: MutableMapping | None = None,
+        input_source: InputSource | None = None,
+    ) -> MemorySnapshot:
+        """Run a program with the tree-walking interpreter until it is first called with `stop_index`.
+
+        Only the memory is kept: calls that were still running at that point are not resumed
+        by the forks, so `stop_index` is best the tail call an initialization ends with.
+
+        Args:
+            program (Program): The program.
+            stop_index (int): The index to stop at, e.g. the one the initialization of `~1` ends with.
+            index (int, optional): The index to start the program with. Defaults to 1.
+            cells (MutableMapping | None, optional): The initial memory. Defaults to empty memory.
+            input_source (InputSource | None, optional): Where input comes from until the snapshot. Defaults to stdin.
+
+        Raises:
+            ValueError: The initial memory does not fit the program, see `Program.check_memory`.
+            RuntimeError: The program finished without calling `stop_index`.
+
+        Returns:
+            MemorySnapshot: The memory and output at that point.
+        """
+        program.check_memory(cells)
+        buffer = io.BytesIO()
+        context = _CapturingContext(stop_index, {} if cells is None else cells, OutputSink(buffer), input_source)
+        context.share_program(program)
+        try:
+            execute_tree(context, index)
+        except _Suspend:
+            context.output.flush()
+            return MemorySnapshot(program, context.cells, stop_index, buffer.getvalue())
+        raise RuntimeError(f"Program finished without calling index {stop_index}")
+
+    def fork(
+        self,
+        output: OutputSink | None = None,
+        input_source: InputSource | None = None,
+        context_class: type[ExecutionContext] = ExecutionContext,
+    ) -> ExecutionContext:
+        """Create a context for the program whose memory starts out as the snapshot.
+
+        Args:
+            output (OutputSink | None, optional): Where the output goes. Defaults to stdout.
+            input_source (InputSource | None, optional): Where input comes from. Defaults to stdin.
+            context_class (type[ExecutionContext], optional): The kind of context. Defaults to ExecutionContext.
+
+        Returns:
+            ExecutionContext: The context.
+        """
+        if len(self.cells) <= self.COPY_LIMIT:
+            cells: MutableMapping = dict(self.cells)
+        else:
+            cells = ChainMap({}, self.cells)
+        context = context_class(cells, output, input_source)
+        context.share_program(self.program)
+        return context
+
+    def resume(
+        self, index: int | None = None, output: OutputSink | None = None, input_source: InputSource | None = None
+    ) -> int:
+        """Run the program in a new fork and flush its output.
+
+        Args:
+            index (int | None, optional): The index to call the program with. Defaults to the snapshot's index.
+            output (OutputSink | None, optional): Where the output goes. Defaults to stdout.
+            input_source (InputSource | None, optional): Where input comes from. Defaults to stdin.
+
+        Returns:
+            int: The result of the program.
+        """
+        context = self.fork(output, input_source)
+        try:
+            return self.program.execute(context, self.index if index is None else index)
+        finally:
+            context.output.flush()
+
+
+WHITESPACE: Final[str] = " \r\nABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+"""Characters that are comments: all letters, space and newline."""
+
+TOKEN_PATTERN: Final[re.Pattern[str]] = re.compile(
+    '"[^"]*"|[^' + WHITESPACE.replace("\r", "\\r").replace("\n", "\\n") + "]"
+)
+"""A string literal, or a single significant character (including an unterminated quote)."""
+
+
+class Tokens:
+    """The significant characters of a program, with comments and whitespace stripped."""
+
+    def __init__(self, source: str):
+        self.source: Final[str] = source
+        """The original program text."""
+        text: list[str] = []
+        self.offsets: Final[array] = array("i")
+        """For each token, its offset in `source`."""
+        self.strings: Final[dict[int, str]] = {}
+        """For each string literal token, the text between the quotes."""
+        for match in TOKEN_PATTERN.finditer(source):
+            token = match.group()
+            if len(token) > 1:
+                self.strings[len(text)] = token[1:-1]
+                token = '"'
+            text.append(token)
+            self.offsets.append(match.start())
+        self.text: Final[str] = "".join(text)
+        """One character per token; a string literal is a single '"'."""
+
+    def location(self, position: int) -> tuple[int, int]:
+        """Map a token position back to the source.
+
+        Args:
+            position (int): Index into `text`.
+
+        Returns:
+            tuple[int, int]: 1-based line and column in `source`.
+        """
+        offset = self.offsets[position] if position < len(self.offsets) else len(self.source)
+        line = self.source.count("\n", 0, offset) + 1
+        column = offset - (self.source.rfind("\n", 0, offset) + 1) + 1
+        return line, column
+
+
+class JustifParser:
+    """A parser for the Justif language.
+
+    The program is first split into `Tokens` in a single pass, so the parser itself never
+    sees comments or whitespace.
+
+    With `iterative=True`, the nesting of if instructions is tracked on an explicit stack
+    instead of the Python call stack, so programs of any nesting depth can be parsed. Both
+    modes produce the same instruction tree.
+    """
+
+    def __init__(self, iterative: bool = False):
+        self.expression: str = ""
+        self.iterative: bool = iterative
+        """Parse nested if instructions with an explicit stack, see `__parse_iterative`."""
+        self.__tokens: Tokens = Tokens("")
+        self.__text: str = ""
+        """The token text being parsed, see `Tokens.text`."""
+        self.__pos: int = 0
+        self.__nums: tuple[int, int] = (-1, -1)
+        """The last and the second to last number, for `_` and `$`."""
+
+    def parse_expression(self, expression: str) -> list[Instruction] | None:
+        """Parse the Justif expression into a sequence of instructions.
+
+        Args:
+            expression (str): A valid justif expression / program.
+
+        Returns:
+            list[Instruction]: The instructions parsed from the expression.
+        """
+        self.expression = expression
+        self.__tokens = Tokens(expression)
+        self.__text = self.__tokens.text
+        self.__pos = 0
+        self.__nums = (-1, -1)
+        if self.iterative:
+            return self.__parse_iterative()
+        return self.__parse_instructions()
+
+    def location(self) -> tuple[int, int]:
+        """Get the source position the parser is at, e.g. for error messages.
+
+        Returns:
+            tuple[int, int]: 1-based line and column in the source.
+        """
+        return self.__tokens.location(self.__pos)
+
+    def __save_state(self) -> tuple[int, tuple[int, int]]:
+        """Push the current parser position and intermediate numbers onto a stack.
+
+        Returns:
+            tuple[int, tuple[int, int]]: (current position, __nums); __nums is immutable, so no copy is needed
+        """
+        return self.__pos, self.__nums
+
+    def __restore_state(self, previously_saved_pos: tuple[int, tuple[int, int]]) -> None:
+        """Restore the previously saved position and numbers from a local variable
+
+        Args:
+            s (tuple[int, tuple[int, int]]):(previous position, previous __nums)
+        """
+        self.__pos = previously_saved_pos[0]
+        self.__nums = previously_saved_pos[1]
+
+    def __get_char(self) -> str:
+        """Get the character at the current position
+
+        Returns:
+            str: character at the current position or '\0' if out of bounds.
+        """
+        try:
+            return self.__text[self.__pos]
+        except IndexError:
+            pass
+        return "\0"
+
+    def __skip_char(self, expression: str) -> bool:
+        """_summary_
+
+        Args:
+            expression (_type_): _description_
+
+        Returns:
+            _type_: _description_
+        """
+        if self.__text.startswith(expression, self.__pos):
+            self.__pos += len(expression)
+            return True
+        return False
+
+    def __is_index(self):
+        state = self.__save_state()
+        if self.__skip_char("~"):
+            v: int | EffectiveAddress | None = self.__dec_int()
+            if v is None:
+                v = self.__indirect_memory_access()
+            if v is not None:
+                return CheckIndexInstruction(v)
+        self.__restore_state(state)
 
     def __cmp_instruction(self) -> Instruction | None:
         state = self.__save_state()
@@ -598,13 +3606,7 @@ class JustifParser:
             Instruction | None: An IfInstruction if a valid if condition is found, otherwise None.
         """
         state = self.__save_state()
-        m: EffectiveAddress | Instruction | None = self.__indirect_memory_access()
-        if m is None:
-            m = self.__cmp_instruction()
-        if m is None:
-            m = self.__recursion()
-        if m is None:
-            m = self.__is_index()
+        m = self.__condition()
         if m is not None and self.__skip_char("?"):
             if_true = self.__parse_instructions()
             if if_true and self.__skip_char(":"):
@@ -614,6 +3616,21 @@ class JustifParser:
         self.__restore_state(state)
         return None
 
+    def __condition(self) -> EffectiveAddress | Instruction | None:
+        """Parse the condition of an if instruction, the part before the '?'.
+
+        Returns:
+            EffectiveAddress | Instruction | None: The condition, or None if there is none.
+        """
+        m: EffectiveAddress | Instruction | None = self.__indirect_memory_access()
+        if m is None:
+            m = self.__cmp_instruction()
+        if m is None:
+            m = self.__recursion()
+        if m is None:
+            m = self.__is_index()
+        return m
+
     def __io_input(self) -> InputInstruction | None:
         """Parse an input instruction from the expression.
 
@@ -672,12 +3689,22 @@ class JustifParser:
     def __parse_single_instruction(self) -> Instruction | None:
         """Parse a single instruction from the expression.
 
+        Returns:
+            Instruction | None: An Instruction if a valid instruction is found, otherwise None.
+        """
+        instruction = self.__if()
+        if instruction is not None:
+            return instruction
+        return self.__simple_instruction()
+
+    def __simple_instruction(self) -> Instruction | None:
+        """Parse a single instruction that is not an if, and so contains no other instructions.
+
         Returns:
             Instruction | None: An Instruction if a valid instruction is found, otherwise None.
         """
         state = self.__save_state()
         for function in (
-            self.__if,
             self.__cmp_instruction,
             self.__recursion,
             self.__memset,
@@ -691,6 +3718,56 @@ class JustifParser:
         self.__restore_state(state)
         return None
 
+    def __parse_iterative(self) -> list[Instruction] | None:
+        """Parse a list of instructions like `__parse_instructions`, without recursion.
+
+        Every if whose condition and '?' have been read gets a frame on an explicit stack:
+        [state before the if, condition, true branch or None while it is parsed, enclosing list].
+        When a branch cannot be completed, the frame is dropped and the position is retried with
+        the other alternatives, exactly like `__parse_single_instruction` does after `__if` fails.
+
+        Returns:
+            list[Instruction] | None: A list of instructions if valid instructions are found, otherwise None.
+        """
+        stack: list[list] = []
+        instructions: list[Instruction] = []
+        while True:
+            # the start of a single instruction: open an if, or parse a simple instruction
+            state = self.__save_state()
+            condition = self.__condition()
+            if condition is not None and self.__skip_char("?"):
+                stack.append([state, condition, None, instructions])
+                instructions = []
+                continue
+            self.__restore_state(state)
+            instruction = self.__simple_instruction()
+            # append the instruction, and close every list and if that it completes
+            while True:
+                if instruction is not None:
+                    instructions.append(instruction)
+                    if self.__skip_char(","):
+                        break
+                # a failed instruction after a ',' ends the list, a failed first one fails it
+                result = instructions or None
+                if not stack:
+                    return result
+                frame = stack[-1]
+                if frame[2] is None:
+                    if result and self.__skip_char(":"):
+                        frame[2] = result
+                        instructions = []
+                        break
+                elif result:
+                    stack.pop()
+                    instructions = frame[3]
+                    instruction = IfInstruction(frame[2], result, frame[1])
+                    continue
+                # the if is incomplete: retry its position without the if alternative
+                stack.pop()
+                self.__restore_state(frame[0])
+                instructions = frame[3]
+                instruction = self.__simple_instruction()
+
     def __parse_constant(self) -> Instruction | None:
         """Parse a constant value from the expression.
 
@@ -699,7 +3776,6 @@ class JustifParser:
         """
         decint = self.__dec_int()
         if decint is not None:
-            logger.debug("Parsed constant value: {}", decint)
             return ConstantInstruction(decint)
         return None
 
@@ -713,16 +3789,11 @@ class JustifParser:
             str | None: The string parsed from the expression, or None if no string is found.
         """
         if self.__skip_char('"'):
-            startpos = self.__pos
-            while 1:
-                c = self.__get_char()
-                if c == "\0":
-                    raise SyntaxError("Expected end-of-string")
-                self.__pos += 1
-                if c == '"':
-                    result = self.expression[startpos : self.__pos - 1]
-                    logger.debug("Parsed string: {!r}", result)
-                    return result
+            try:
+                return self.__tokens.strings[self.__pos - 1]
+            except KeyError:
+                line, column = self.__tokens.location(self.__pos - 1)
+                raise SyntaxError(f"Expected end-of-string for the string starting at line {line}, column {column}") from None
         return None
 
     def __recursion(self) -> Instruction | None:
@@ -793,7 +3864,8 @@ class JustifParser:
                     if offset is not None:
                         result.append(offset)
                     else:
-                        raise SyntaxError("Expected an offset after '!'")
+                        line, column = self.location()
+                        raise SyntaxError(f"Expected an offset after '!' at line {line}, column {column}")
                 return result
         self.__restore_state(state)
         return None
@@ -856,8 +3928,7 @@ class JustifParser:
             number *= 10
             number += digit
             success, digit = self.__dec_digit()
-        self.__nums[1] = self.__nums[0]
-        self.__nums[0] = number
+        self.__nums = (number, self.__nums[0])
         return number
 
     def __dec_digit(self) -> tuple[bool, int]:
@@ -873,14 +3944,883 @@ class JustifParser:
         return False, 0
 
 
-def main(filenames: list[str], debug: bool = False):
-    """_summary_
+IndexFacts = tuple[int | None, frozenset[int]]
+"""What the optimizer knows about the index: its value, or None, and values it cannot have."""
+
+
+class Optimizer:
+    """Simplifies a parsed instruction tree before it is executed.
+
+    - An if on a constant condition, or on an index check that is already decided by an
+      enclosing index check, is replaced by the branch it always takes.
+    - Constants and constant index checks whose result is not used are removed.
+    - Consecutive memsets of the same cell are folded into one, e.g. `.0=5,.0+3` into `.0=8`.
+
+    Only cells with a direct address and no offset and only int constants are folded, and
+    only where the first memset proves what the second one reads, so every assertion and
+    every cell a program creates stays as it was. A memset on its own is never removed,
+    not even `.N+0`: it creates the cell, and fails on a string. The tree is walked with an
+    explicit stack, like in `dump_program`, so nesting depth is unbounded.
+    """
+
+    VERSION: Final[int] = 2
+    """Changes whenever the optimized trees change, so that `ProgramCache` drops older ones."""
+
+    def __init__(self):
+        self.changes: list[str] = []
+        """What the last `optimize` changed, one line per change."""
+
+    def optimize(self, root_sequence: list[Instruction]) -> list[Instruction]:
+        """Optimize a program. The input tree is not modified.
+
+        Args:
+            root_sequence (list[Instruction]): The root sequence of the program.
+
+        Returns:
+            list[Instruction]: The optimized root sequence.
+        """
+        self.changes = []
+        # every node becomes a list of instructions, so an if can be replaced by a whole branch
+        results: list[list[Instruction]] = []
+        stack: list[tuple[list[Instruction] | Instruction, bool, IndexFacts]] = [(root_sequence, False, (None, frozenset()))]
+        while stack:
+            node, expanded, facts = stack.pop()
+            if not expanded:
+                stack.append((node, True, facts))
+                if isinstance(node, list):
+                    stack.extend((child, False, facts) for child in reversed(node))
+                elif isinstance(node, IfInstruction):
+                    if_true, if_false = self.__branch_facts(node.condition, facts)
+                    stack.extend([(node.if_false, False, if_false), (node.if_true, False, if_true)])
+                continue
+            match node:
+                case list():
+                    children = results[len(results) - len(node) :]
+                    del results[len(results) - len(node) :]
+                    results.append(self.__sequence([instruction for child in children for instruction in child]))
+                case IfInstruction():
+                    if_false = results.pop()
+                    if_true = results.pop()
+                    results.append(self.__if(node, if_true, if_false, facts))
+                case _:
+                    results.append([node])
+        return results[0]
+
+    @staticmethod
+    def __branch_facts(condition: EffectiveAddress | Instruction, facts: IndexFacts) -> tuple[IndexFacts, IndexFacts]:
+        """Work out what is known about the index in the branches of an if.
+
+        The index only changes with a recursion, which starts a new call, so inside the true
+        branch of `~N` the index is N, and inside its false branch it is not N.
+
+        Args:
+            condition (EffectiveAddress | Instruction): The condition of the if.
+            facts (IndexFacts): What is known about the index at the if.
+
+        Returns:
+            tuple[IndexFacts, IndexFacts]: What is known in the true and in the false branch.
+        """
+        if not isinstance(condition, CheckIndexInstruction) or isinstance(condition.value, EffectiveAddress):
+            return facts, facts
+        index, excluded = facts
+        return (condition.value, excluded), (index, excluded | {condition.value})
+
+    @staticmethod
+    def __decide(condition: EffectiveAddress | Instruction, facts: IndexFacts) -> bool | None:
+        """Evaluate a condition at compile time.
+
+        Args:
+            condition (EffectiveAddress | Instruction): The condition of an if.
+            facts (IndexFacts): What is known about the index at the if.
+
+        Returns:
+            bool | None: The value of the condition, or None if it depends on the run.
+        """
+        if isinstance(condition, ConstantInstruction):
+            return bool(condition.value)
+        if not isinstance(condition, CheckIndexInstruction) or isinstance(condition.value, EffectiveAddress):
+            return None
+        index, excluded = facts
+        if index is not None:
+            return index == condition.value
+        if condition.value in excluded:
+            return False
+        return None
+
+    def __if(
+        self, instruction: IfInstruction, if_true: list[Instruction], if_false: list[Instruction], facts: IndexFacts
+    ) -> list[Instruction]:
+        """Optimize an if whose branches are already optimized.
+
+        Returns:
+            list[Instruction]: The instructions replacing the if.
+        """
+        decision = self.__decide(instruction.condition, facts)
+        if decision is None:
+            return [IfInstruction(if_true, if_false, instruction.condition)]
+        taken = if_true if decision else if_false
+        self.changes.append(f"{instruction.condition!r} is always {decision}, removed the other branch")
+        # the result of an if with an empty branch is 0
+        return taken if taken else [ConstantInstruction(0)]
+
+    def __sequence(self, instructions: list[Instruction]) -> list[Instruction]:
+        """Remove unused constants from a sequence and fold its memsets.
+
+        Args:
+            instructions (list[Instruction]): The sequence, with optimized ifs already spliced in.
+
+        Returns:
+            list[Instruction]: The optimized sequence; its result is the same as before.
+        """
+        result: list[Instruction] = []
+        for position, instruction in enumerate(instructions):
+            last = position == len(instructions) - 1
+            if result and isinstance(instruction, MemsetInstruction) and isinstance(result[-1], MemsetInstruction):
+                folded = self.__fold(result[-1], instruction)
+                if folded is not None:
+                    self.changes.append(f"folded {result[-1]!r} and {instruction!r} into {folded!r}")
+                    result.pop()
+                    instruction = folded
+            if not last and (
+                isinstance(instruction, ConstantInstruction)
+                or isinstance(instruction, CheckIndexInstruction)
+                and not isinstance(instruction.value, EffectiveAddress)
+            ):
+                self.changes.append(f"removed unused {instruction!r}")
+                continue
+            result.append(instruction)
+        return result
+
+    @staticmethod
+    def __is_plain_cell(ea: object) -> bool:
+        """Check if an operand is a cell with a direct address and no offset."""
+        return isinstance(ea, EffectiveAddress) and ea.address.direct and ea.offset is None
+
+    @staticmethod
+    def __fold(first: MemsetInstruction, second: MemsetInstruction) -> MemsetInstruction | None:
+        """Combine two consecutive memsets of the same cell into one.
+
+        Either the first memset stores a constant, which the second one overwrites or reads
+        back as a known int, or both add, subtract or multiply an int: then the first one
+        asserts that the cell holds an int, and the second one cannot fail.
+
+        Args:
+            first (MemsetInstruction): The earlier memset.
+            second (MemsetInstruction): The later memset.
+
+        Returns:
+            MemsetInstruction | None: The combined memset, or None if they cannot be combined.
+        """
+        target = first.target
+        if not (
+            Optimizer.__is_plain_cell(target)
+            and Optimizer.__is_plain_cell(second.target)
+            and target.address.address == second.target.address.address
+            and not isinstance(first.source, EffectiveAddress)
+            and not isinstance(second.source, EffectiveAddress)
+        ):
+            return None
+        a, b = first.source, second.source
+        if first.method == "=" and second.method == "=":
+            # the second store overwrites the first, which cannot fail
+            return second
+        if not isinstance(a, int) or not isinstance(b, int) or second.method not in MEMSET_OPERATORS:
+            return None
+        if first.method == "=":
+            if second.method == "/" and b == 0:
+                return None
+            return MemsetInstruction(MEMSET_OPERATORS[second.method](a, b), target, "=")
+        if first.method in ("+", "-") and second.method in ("+", "-"):
+            total = (a if first.method == "+" else -a) + (b if second.method == "+" else -b)
+            return MemsetInstruction(total, target, "+")
+        if first.method == "*" and second.method == "*":
+            return MemsetInstruction(a * b, target, "*")
+        return None
+
+
+class CellTypes:
+    """Infers which cells only ever hold a scalar and which only ever hold an array.
+
+    The analysis is flow-insensitive: a cell is a scalar if nothing in the program can store
+    an array in it, and an array if everything that can store into it stores an array. It
+    assumes the program starts on empty memory, like `main` runs it, so every array comes
+    from a string literal and every value read from a cell is an int. A store through an
+    indirect address may hit any cell.
+
+    `apply` rebuilds the program with unchecked addresses and instructions where that is
+    proven safe, so they skip the `isinstance` assertions at runtime. Reading an array cell
+    before anything is stored in it still fails, with a TypeError instead of an
+    AssertionError. The tree is walked with an explicit stack, like in `Optimizer`.
+
+    A program that starts on preloaded memory is only safe if the analysis still holds with
+    every preloaded cell counted as a store: `with_memory` adds them, and `unsafe` lists the
+    unchecked addresses that are then no longer proven. `Program.check_memory` does both.
+    """
+
+    def __init__(self, root_sequence: list[Instruction]):
+        self.__scalar_stores: set[int] = set()
+        """Cells that the program stores a scalar in with a direct address."""
+        self.__array_stores: set[int] = set()
+        """Cells that the program stores an array in with a direct address."""
+        self.__indirect_stores: set[bool] = set()
+        """Whether stores through an indirect address store arrays (True) and scalars (False)."""
+        self.__cells: set[int] = set()
+        """All cells the program addresses directly, for the report."""
+        self.checked: int = 0
+        """How many addresses and instructions the last `apply` left checked."""
+        self.unchecked: int = 0
+        """How many addresses and instructions the last `apply` made unchecked."""
+        self.__infer(root_sequence)
+
+    def __infer(self, root_sequence: list[Instruction]) -> None:
+        """Collect all stores of the program.
+
+        Args:
+            root_sequence (list[Instruction]): The root sequence of the program.
+        """
+        stack: list[object] = list(root_sequence)
+        while stack:
+            match stack.pop():
+                case IfInstruction() as node:
+                    stack += [node.condition, *node.if_true, *node.if_false]
+                case IdiomInstruction() as node:
+                    stack += node.body
+                case CheckIndexInstruction() as node:
+                    stack.append(node.value)
+                case OutputCharInstruction() | OutputIntegerInstruction() as node:
+                    stack.append(node.address)
+                case InputInstruction() as node:
+                    stack.append(node.address)
+                    self.__store(node.address, False)
+                case ComparisonInstruction() as node:
+                    stack += [node.first, node.second]
+                case MemsetInstruction() as node:
+                    stack += [node.source, node.target]
+                    self.__store(node.target, node.method == "=" and isinstance(node.source, str))
+                case EffectiveAddress() as ea:
+                    for address in (ea.address, ea.offset):
+                        if address is not None and address.direct:
+                            self.__cells.add(address.address)
+
+    def __store(self, target: EffectiveAddress, array: bool) -> None:
+        """Record that the program stores a scalar or an array at an address."""
+        if target.address.indirect:
+            self.__indirect_stores.add(array)
+        elif array:
+            self.__array_stores.add(target.address.address)
+        else:
+            self.__scalar_stores.add(target.address.address)
+
+    def with_memory(self, cells: Mapping[int, object]) -> CellTypes:
+        """Extend the analysis by an initial memory: every preloaded cell counts as a store.
+
+        Args:
+            cells (Mapping[int, object]): The memory the program starts on.
+
+        Returns:
+            CellTypes: A new analysis; this one is not modified.
+        """
+        extended = CellTypes([])
+        extended.__scalar_stores = set(self.__scalar_stores)
+        extended.__array_stores = set(self.__array_stores)
+        extended.__indirect_stores = set(self.__indirect_stores)
+        extended.__cells = set(self.__cells)
+        for address, value in cells.items():
+            if isinstance(value, int):
+                extended.__scalar_stores.add(address)
+            elif isinstance(value, STRING_TYPES) and all(isinstance(item, int) for item in value):
+                extended.__array_stores.add(address)
+            else:
+                # neither kind of value the program itself stores, so nothing is proven about it
+                extended.__scalar_stores.add(address)
+                extended.__array_stores.add(address)
+        return extended
+
+    @staticmethod
+    def unchecked_addresses(root_sequence: list[Instruction]) -> list[tuple[EffectiveAddress, bool]]:
+        """Collect the addresses `apply` has made unchecked in a program.
+
+        Args:
+            root_sequence (list[Instruction]): A program rebuilt by `apply`.
+
+        Returns:
+            list[tuple[EffectiveAddress, bool]]: Each unchecked address, and whether it is read
+                (True) or only written (False).
+        """
+        addresses: list[tuple[EffectiveAddress, bool]] = []
+        stack: list[tuple[object, bool]] = [(instruction, True) for instruction in root_sequence]
+        while stack:
+            node, read = stack.pop()
+            match node:
+                case IfInstruction():
+                    stack += [(node.condition, True), *((child, True) for child in node.if_true + node.if_false)]
+                case IdiomInstruction():
+                    stack += [(child, True) for child in node.body]
+                case CheckIndexInstruction():
+                    stack.append((node.value, True))
+                case InputInstruction():
+                    stack.append((node.address, False))
+                case OutputCharInstruction() | OutputIntegerInstruction():
+                    stack.append((node.address, True))
+                case ComparisonInstruction():
+                    stack += [(node.first, True), (node.second, True)]
+                case MemsetInstruction():
+                    stack += [(node.source, True), (node.target, node.method != "=")]
+                case EffectiveAddress() if not node.checked:
+                    addresses.append((node, read))
+        return addresses
+
+    def unsafe(self, addresses: Iterable[tuple[EffectiveAddress, bool]]) -> list[EffectiveAddress]:
+        """Find the unchecked addresses that this analysis does not prove safe.
+
+        Args:
+            addresses (Iterable[tuple[EffectiveAddress, bool]]): See `unchecked_addresses`.
+
+        Returns:
+            list[EffectiveAddress]: The addresses that would have stayed checked.
+        """
+        return [ea for ea, read in addresses if not (self.__safe_read(ea) if read else self.__safe_write(ea))]
+
+    def is_scalar(self, cell: int) -> bool:
+        """Check if a cell is proven to always hold an int."""
+        return cell not in self.__array_stores and True not in self.__indirect_stores
+
+    def is_array(self, cell: int) -> bool:
+        """Check if everything stored in a cell is an array."""
+        return (
+            cell in self.__array_stores
+            and cell not in self.__scalar_stores
+            and False not in self.__indirect_stores
+        )
+
+    @property
+    def all_scalar(self) -> bool:
+        """True if the program never stores an array, so every cell holds an int."""
+        return not self.__array_stores and True not in self.__indirect_stores
+
+    @property
+    def kinds(self) -> dict[int, str]:
+        """The inferred kind of every directly addressed cell: scalar, array or mixed."""
+        return {
+            cell: "scalar" if self.is_scalar(cell) else "array" if self.is_array(cell) else "mixed"
+            for cell in sorted(self.__cells)
+        }
+
+    def report(self) -> str:
+        """Describe the inferred cell kinds and what the last `apply` did, one cell per line."""
+        lines = [f"cell {cell}: {kind}" for cell, kind in self.kinds.items()]
+        if self.__indirect_stores:
+            lines.append(f"indirect stores: {', '.join(sorted('array' if array else 'scalar' for array in self.__indirect_stores))}")
+        lines.append(f"{self.unchecked} unchecked, {self.checked} checked")
+        return "\n".join(lines)
+
+    def __safe_read(self, ea: EffectiveAddress) -> bool:
+        """Check if reading and writing an address can skip its type assertions."""
+        address, offset = ea.address, ea.offset
+        if offset is not None and offset.indirect and not self.is_scalar(offset.address):
+            return False
+        if address.indirect:
+            # the base must hold an int, and the cell it points to is unknown
+            return self.is_scalar(address.address) and offset is None and self.all_scalar
+        if offset is None:
+            return self.is_scalar(address.address)
+        return self.is_array(address.address)
+
+    def __safe_write(self, ea: EffectiveAddress) -> bool:
+        """Check if writing an address can skip its type assertion."""
+        return ea.address.direct or self.is_scalar(ea.address.address)
+
+    def __address(self, ea: EffectiveAddress, read: bool) -> EffectiveAddress:
+        """Make an address unchecked if that is proven safe for how it is used.
+
+        Args:
+            ea (EffectiveAddress): The address.
+            read (bool): True if the address is read, False if it is only written.
+
+        Returns:
+            EffectiveAddress: The address, or an unchecked copy of it.
+        """
+        if not ea.checked:
+            self.unchecked += 1
+            return ea
+        if not (self.__safe_read(ea) if read else self.__safe_write(ea)):
+            self.checked += 1
+            return ea
+        self.unchecked += 1
+        return EffectiveAddress(ea.address, ea.offset, checked=False)
+
+    def __operand(self, operand: int | str | EffectiveAddress) -> int | str | EffectiveAddress:
+        return self.__address(operand, True) if isinstance(operand, EffectiveAddress) else operand
+
+    def __instruction(self, node: Instruction) -> Instruction:
+        """Rebuild an instruction without nested sequences with unchecked parts where possible."""
+        match node:
+            case CheckIndexInstruction():
+                return CheckIndexInstruction(self.__operand(node.value))
+            case InputInstruction():
+                return InputInstruction(self.__address(node.address, False))
+            case OutputCharInstruction():
+                return OutputCharInstruction(self.__address(node.address, True))
+            case OutputIntegerInstruction():
+                return OutputIntegerInstruction(self.__address(node.address, True))
+            case ComparisonInstruction() if node.method in COMPARISON_OPERATORS:
+                # every value read from a cell is an int, so the comparison never needs to check
+                self.unchecked += 1
+                return ComparisonInstruction(self.__address(node.first, True), self.__operand(node.second), node.method, False)
+            case MemsetInstruction() if node.method == "=" or node.method in MEMSET_OPERATORS and not isinstance(node.source, str):
+                self.unchecked += 1
+                target = self.__address(node.target, node.method != "=")
+                return MemsetInstruction(self.__operand(node.source), target, node.method, False)
+            case ComparisonInstruction() | MemsetInstruction():
+                self.checked += 1
+        return node
+
+    def apply(self, root_sequence: list[Instruction]) -> list[Instruction]:
+        """Rebuild a program with unchecked addresses and instructions. The input tree is not modified.
+
+        Args:
+            root_sequence (list[Instruction]): The root sequence of the program the types were inferred for.
+
+        Returns:
+            list[Instruction]: The rebuilt root sequence.
+        """
+        self.checked = self.unchecked = 0
+        results: list[object] = []
+        stack: list[tuple[object, bool]] = [(root_sequence, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if not expanded and isinstance(node, (list, IfInstruction)):
+                stack.append((node, True))
+                if isinstance(node, list):
+                    stack.extend((child, False) for child in reversed(node))
+                else:
+                    stack.extend([(node.if_false, False), (node.if_true, False), (node.condition, False)])
+                continue
+            match node:
+                case list():
+                    children = results[len(results) - len(node) :]
+                    del results[len(results) - len(node) :]
+                    results.append(children)
+                case IfInstruction():
+                    if_false = results.pop()
+                    if_true = results.pop()
+                    condition = results.pop()
+                    results.append(IfInstruction(if_true, if_false, condition))
+                case EffectiveAddress():
+                    results.append(self.__address(node, True))
+                case _:
+                    results.append(self.__instruction(node))
+        return results[0]
+
+
+class ImageTag(IntEnum):
+    """Tags of the serialized program format, see `dump_program`.
+
+    The tree is stored in postfix order: operands come first and each tag pops them off a
+    stack, so loading needs no recursion however deeply the program nests. Literal
+    operands of a tag follow it directly in the stream.
+    """
+
+    INT = 0
+    """INT v: push the number v"""
+    STRING = 1
+    """STRING s: push the string literal s"""
+    ADDRESS = 2
+    """ADDRESS a d: push EffectiveAddress(Address(a, d))"""
+    ADDRESS_OFFSET = 3
+    """ADDRESS_OFFSET a d o e: push EffectiveAddress(Address(a, d), Address(o, e))"""
+    SEQUENCE = 4
+    """SEQUENCE n: pop n instructions and push them as a list"""
+    IF = 5
+    """IF: pop if_false, if_true and the condition"""
+    CHECK_INDEX = 6
+    """CHECK_INDEX: pop the value"""
+    CONSTANT = 7
+    """CONSTANT v"""
+    INPUT = 8
+    """INPUT: pop the address"""
+    RECURSE = 9
+    """RECURSE i"""
+    OUTPUT_CHAR = 10
+    """OUTPUT_CHAR: pop the address"""
+    OUTPUT_INTEGER = 11
+    """OUTPUT_INTEGER: pop the address"""
+    COMPARISON = 12
+    """COMPARISON m: pop the second and the first operand"""
+    MEMSET = 13
+    """MEMSET m: pop the target and the source"""
+
+
+IMAGE_MAGIC: Final[bytes] = b"JUSTIF"
+"""First bytes of a serialized program."""
+
+IMAGE_VERSION: Final[int] = 1
+"""Version of the serialized format; images of other versions are not loaded."""
+
+
+def dump_program(root_sequence: list[Instruction]) -> bytes:
+    """Serialize a parsed program into a compact binary image.
 
     Args:
-        filename (str): _description_
-        debug (bool, optional): _description_. Defaults to False.
+        root_sequence (list[Instruction]): The root sequence of the program.
+
+    Returns:
+        bytes: `IMAGE_MAGIC`, the version byte and the marshalled postfix stream of `ImageTag`s.
+    """
+    stream: list[int | str] = []
+    # (node, True) once its operands have been emitted; explicit, so nesting depth is unbounded
+    stack: list[tuple[object, bool]] = [(root_sequence, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if not expanded:
+            match node:
+                case list():
+                    operands = node
+                case IfInstruction():
+                    operands = [node.condition, node.if_true, node.if_false]
+                case CheckIndexInstruction():
+                    operands = [node.value]
+                case InputInstruction() | OutputCharInstruction() | OutputIntegerInstruction():
+                    operands = [node.address]
+                case ComparisonInstruction():
+                    operands = [node.first, node.second]
+                case MemsetInstruction():
+                    operands = [node.source, node.target]
+                case _:
+                    operands = []
+            stack.append((node, True))
+            stack.extend((operand, False) for operand in reversed(operands))
+            continue
+        match node:
+            case int():
+                stream += [ImageTag.INT, node]
+            case str():
+                stream += [ImageTag.STRING, node]
+            case EffectiveAddress() if node.offset is None:
+                stream += [ImageTag.ADDRESS, node.address.address, node.address.direct]
+            case EffectiveAddress():
+                stream += [
+                    ImageTag.ADDRESS_OFFSET,
+                    node.address.address,
+                    node.address.direct,
+                    node.offset.address,
+                    node.offset.direct,
+                ]
+            case list():
+                stream += [ImageTag.SEQUENCE, len(node)]
+            case IfInstruction():
+                stream.append(ImageTag.IF)
+            case CheckIndexInstruction():
+                stream.append(ImageTag.CHECK_INDEX)
+            case ConstantInstruction():
+                stream += [ImageTag.CONSTANT, node.value]
+            case InputInstruction():
+                stream.append(ImageTag.INPUT)
+            case RecurseInstruction():
+                stream += [ImageTag.RECURSE, node.index]
+            case OutputCharInstruction():
+                stream.append(ImageTag.OUTPUT_CHAR)
+            case OutputIntegerInstruction():
+                stream.append(ImageTag.OUTPUT_INTEGER)
+            case ComparisonInstruction():
+                stream += [ImageTag.COMPARISON, node.method]
+            case MemsetInstruction():
+                stream += [ImageTag.MEMSET, node.method]
+            case _:
+                raise RuntimeError(f"Cannot serialize {node!r}")
+    # plain ints, marshal would reject the IntEnum members
+    return IMAGE_MAGIC + bytes([IMAGE_VERSION]) + marshal.dumps(tuple(int(x) if isinstance(x, ImageTag) else x for x in stream))
+
+
+def load_program(image: bytes) -> list[Instruction] | None:
+    """Rebuild a program serialized by `dump_program`.
+
+    Args:
+        image (bytes): The serialized program.
+
+    Returns:
+        list[Instruction] | None: The root sequence, or None if the image is not of the current version.
+    """
+    header = len(IMAGE_MAGIC) + 1
+    if image[: len(IMAGE_MAGIC)] != IMAGE_MAGIC or len(image) < header or image[header - 1] != IMAGE_VERSION:
+        return None
+    stream = marshal.loads(image[header:])
+    stack: list = []
+    pos = 0
+    while pos < len(stream):
+        tag = stream[pos]
+        pos += 1
+        match tag:
+            case ImageTag.INT | ImageTag.STRING:
+                stack.append(stream[pos])
+                pos += 1
+            case ImageTag.ADDRESS:
+                stack.append(EffectiveAddress(Address(stream[pos], stream[pos + 1])))
+                pos += 2
+            case ImageTag.ADDRESS_OFFSET:
+                offset = Address(stream[pos + 2], stream[pos + 3])
+                stack.append(EffectiveAddress(Address(stream[pos], stream[pos + 1]), offset))
+                pos += 4
+            case ImageTag.SEQUENCE:
+                count = stream[pos]
+                pos += 1
+                sequence = stack[len(stack) - count :]
+                del stack[len(stack) - count :]
+                stack.append(sequence)
+            case ImageTag.IF:
+                if_false = stack.pop()
+                if_true = stack.pop()
+                stack.append(IfInstruction(if_true, if_false, stack.pop()))
+            case ImageTag.CHECK_INDEX:
+                stack.append(CheckIndexInstruction(stack.pop()))
+            case ImageTag.CONSTANT:
+                stack.append(ConstantInstruction(stream[pos]))
+                pos += 1
+            case ImageTag.INPUT:
+                stack.append(InputInstruction(stack.pop()))
+            case ImageTag.RECURSE:
+                stack.append(RecurseInstruction(stream[pos]))
+                pos += 1
+            case ImageTag.OUTPUT_CHAR:
+                stack.append(OutputCharInstruction(stack.pop()))
+            case ImageTag.OUTPUT_INTEGER:
+                stack.append(OutputIntegerInstruction(stack.pop()))
+            case ImageTag.COMPARISON:
+                second = stack.pop()
+                stack.append(ComparisonInstruction(stack.pop(), second, stream[pos]))
+                pos += 1
+            case ImageTag.MEMSET:
+                target = stack.pop()
+                stack.append(MemsetInstruction(stack.pop(), target, stream[pos]))
+                pos += 1
+            case _:
+                raise RuntimeError(f"Unknown image tag {tag} at {pos - 1}")
+    if len(stack) != 1 or not isinstance(stack[0], list):
+        raise RuntimeError(f"Corrupt program image, {len(stack)} values left on the stack")
+    return stack[0]
+
+
+class ProgramCache:
+    """Serialized programs in a directory, keyed by a hash of their source.
+
+    The hash covers the complete source, the image format and the optimizer version, so an
+    edited program, or one cached by another version of this module, simply misses the cache
+    and is parsed again; stale images are never invalidated, only left behind. An image that
+    cannot be read, e.g. a truncated one, is treated as a miss too, and replaced by the next
+    store.
+    """
+
+    def __init__(self, directory: str, variant: str = ""):
+        self.directory: Final[str] = directory
+        """Where the images are stored, created on the first store."""
+        self.variant: Final[str] = variant
+        """Part of the key, so that e.g. optimized and unoptimized trees are cached separately."""
+
+    def path(self, source: str) -> str:
+        """Get the image file for a program.
+
+        Args:
+            source (str): The program text.
+
+        Returns:
+            str: The path of the image, whether it exists or not.
+        """
+        key = f"{self.variant}\0{IMAGE_VERSION}\0{Optimizer.VERSION}\0{source}"
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.v{IMAGE_VERSION}.jsi")
+
+    def load(self, source: str) -> list[Instruction] | None:
+        """Load the cached image of a program.
+
+        Args:
+            source (str): The program text.
+
+        Returns:
+            list[Instruction] | None: The root sequence, or None if the program is not cached
+                or its image is unusable.
+        """
+        path = self.path(source)
+        try:
+            with open(path, "rb") as f:
+                image = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            root_sequence = load_program(image)
+        except (ValueError, EOFError, TypeError, IndexError, AssertionError, RuntimeError) as e:
+            # marshal and the image decoder fail in many ways on a damaged file
+            logger.warning("Ignoring unreadable program image {}: {}", path, e)
+            return None
+        if root_sequence is None:
+            logger.warning("Ignoring program image {} of another version", path)
+        return root_sequence
+
+    def store(self, source: str, root_sequence: list[Instruction]) -> None:
+        """Store the image of a program.
+
+        The image is written to a temporary file first and then renamed, so concurrent runs
+        of the same program never see a partial image.
+
+        Args:
+            source (str): The program text.
+            root_sequence (list[Instruction]): The parsed program.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        target = self.path(source)
+        temporary = f"{target}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(dump_program(root_sequence))
+        os.replace(temporary, target)
+
+
+class BatchRun:
+    """The initial state of one run in a batch, see `run_batch`."""
+
+    def __init__(self, cells: Mapping[int, int | str | bytes | Sequence[int]] | None = None, input_data: bytes | BinaryIO = b""):
+        self.cells: Final[Mapping[int, int | str | bytes | Sequence[int]] | None] = cells
+        """The initial memory, by address; strings are encoded like string literals. None for empty memory."""
+        self.input: Final[bytes | BinaryIO] = input_data
+        """What `<` instructions read; a stream is only accepted without worker processes."""
+
+
+class BatchResult:
+    """The outcome of one run in a batch, see `run_batch`."""
+
+    def __init__(self, result: int | None, output: bytes, error: str | None, cells: dict[int, object] | None):
+        self.result: Final[int | None] = result
+        """The result of the program, None if it failed."""
+        self.output: Final[bytes] = output
+        """Everything the program wrote, also if it failed."""
+        self.error: Final[str | None] = error
+        """Why the run failed, None if it succeeded."""
+        self.cells: Final[dict[int, object] | None] = cells
+        """The final memory, if it was asked for."""
+
+
+class BatchRunner:
+    """Runs one program many times, each time on fresh memory and input.
+
+    The program is prepared once, see `Program`; each run then only costs a new context.
+    """
+
+    def __init__(self, root_sequence: list[Instruction], engine: str = "tree", index: int = 1, keep_cells: bool = False):
+        self.program: Final[Program] = Program(root_sequence, engine)
+        """The program, shared by all runs."""
+        self.index: Final[int] = index
+        """The index every run calls the program with."""
+        self.keep_cells: Final[bool] = keep_cells
+        """Return the final memory of every run."""
+
+    def run(self, batch_run: BatchRun) -> BatchResult:
+        """Run the program once. Exceptions are caught and reported in the result, also the
+        ValueError of an initial memory the program cannot start on, see `Program.check_memory`.
+
+        Args:
+            batch_run (BatchRun): The initial memory and input.
+
+        Returns:
+            BatchResult: The result, output and, if asked for, final memory of the run.
+        """
+        cells: dict[int, object] = {}
+        for address, value in (batch_run.cells or {}).items():
+            cells[address] = encode_string(value) if isinstance(value, str) else value
+        buffer = io.BytesIO()
+        result = error = None
+        try:
+            context = self.program.context(cells, OutputSink(buffer), InputSource(batch_run.input))
+        except ValueError as e:
+            return BatchResult(None, b"", "".join(traceback.format_exception_only(e)).strip(), cells if self.keep_cells else None)
+        try:
+            result = self.program.execute(context, self.index)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            error = "".join(traceback.format_exception_only(e)).strip()
+        finally:
+            context.output.flush()
+        return BatchResult(result, buffer.getvalue(), error, dict(context.cells) if self.keep_cells else None)
+
+
+_batch_runner: BatchRunner | None = None
+"""The program of a `run_batch` worker process, set up once by `_start_batch_worker`."""
+
+
+def _start_batch_worker(image: bytes, engine: str, index: int, keep_cells: bool, cell_types: bool) -> None:
+    global _batch_runner  # pylint: disable=global-statement
+    root_sequence = load_program(image)
+    if cell_types:
+        # the image keeps no unchecked addresses; the analysis finds the same ones again
+        root_sequence = CellTypes(root_sequence).apply(root_sequence)
+    _batch_runner = BatchRunner(root_sequence, engine, index, keep_cells)
+
+
+def _run_batch_chunk(chunk: tuple[BatchRun, ...]) -> list[BatchResult]:
+    assert _batch_runner is not None, "Not a batch worker process"
+    return [_batch_runner.run(batch_run) for batch_run in chunk]
+
+
+def run_batch(
+    root_sequence: list[Instruction],
+    runs: Iterable[BatchRun],
+    engine: str = "tree",
+    index: int = 1,
+    jobs: int = 1,
+    chunk_size: int = 64,
+    keep_cells: bool = False,
+) -> Iterator[BatchResult]:
+    """Run one program on many initial memories and inputs, and yield the results in order.
+
+    With more than one job, the program is sent to every worker process once, as an image,
+    see `dump_program`, and the runs are sent in chunks of `chunk_size`. At most two chunks
+    per worker are in flight, so `runs` is consumed lazily and may be endless.
+
+    The initial memory of every run is checked against the program, see `Program.check_memory`:
+    a program rewritten by `CellTypes` cannot start on memory that breaks what it proved, and
+    such a run is reported as an error without being run. The image keeps no unchecked
+    addresses, so worker processes run `CellTypes` over it again and check the same way.
+
+    Args:
+        root_sequence (list[Instruction]): The parsed program.
+        runs (Iterable[BatchRun]): The initial memory and input of each run.
+        engine (str, optional): The engine, one of ENGINES. Defaults to "tree".
+        index (int, optional): The index every run calls the program with. Defaults to 1.
+        jobs (int, optional): Number of worker processes, 1 to run in this process. Defaults to 1.
+        chunk_size (int, optional): Runs sent to a worker at a time. Defaults to 64.
+        keep_cells (bool, optional): Return the final memory of every run. Defaults to False.
+
+    Yields:
+        BatchResult: The outcome of each run, in the order of `runs`.
+    """
+    if jobs <= 1:
+        runner = BatchRunner(root_sequence, engine, index, keep_cells)
+        for batch_run in runs:
+            yield runner.run(batch_run)
+        return
+
+    image = dump_program(root_sequence)
+    cell_types = bool(CellTypes.unchecked_addresses(root_sequence))
+    executor = ProcessPoolExecutor(
+        jobs, initializer=_start_batch_worker, initargs=(image, engine, index, keep_cells, cell_types)
+    )
+    pending: deque[Future[list[BatchResult]]] = deque()
+    try:
+        for chunk in batched(runs, chunk_size):
+            if any(not isinstance(batch_run.input, bytes) for batch_run in chunk):
+                raise ValueError("Worker processes need the input of every run as bytes")
+            pending.append(executor.submit(_run_batch_chunk, chunk))
+            if len(pending) >= 2 * jobs:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        # also reached when the caller stops iterating early
+        executor.shutdown(cancel_futures=True)
+
+
+def configure_logger(debug: bool) -> None:
+    """Log to stderr: colors yes, no timestamp, no function/line info.
+
+    Args:
+        debug (bool): Log at debug level instead of info level.
     """
-    # Configure logger: colors yes, no timestamp, no function/line info
     logger.remove()  # Remove default handler
     level = "DEBUG" if debug else "INFO"
     logger.add(
@@ -890,23 +4830,331 @@ def main(filenames: list[str], debug: bool = False):
         colorize=True,
     )
 
-    j = JustifParser()
+
+def optimize_program(root_sequence: list[Instruction], filename: str) -> list[Instruction]:
+    """Run the `Optimizer` over a parsed program and log its changes at debug level.
+
+    Args:
+        root_sequence (list[Instruction]): The parsed program.
+        filename (str): The name of the program, for the log.
+
+    Returns:
+        list[Instruction]: The optimized program.
+    """
+    optimizer = Optimizer()
+    root_sequence = optimizer.optimize(root_sequence)
+    for change in optimizer.changes:
+        logger.debug("Optimized {}: {}", filename, change)
+    return root_sequence
+
+
+def infer_cell_types(root_sequence: list[Instruction], filename: str, dump: bool = False) -> list[Instruction]:
+    """Run `CellTypes` over a program and log its report.
+
+    Args:
+        root_sequence (list[Instruction]): The program, as it will be run on empty memory.
+        filename (str): The name of the program, for the log.
+        dump (bool, optional): Log the report at info instead of debug level. Defaults to False.
+
+    Returns:
+        list[Instruction]: The program with unchecked addresses and instructions where proven safe.
+    """
+    cell_types = CellTypes(root_sequence)
+    root_sequence = cell_types.apply(root_sequence)
+    logger.log("INFO" if dump else "DEBUG", "Cell types of {}:\n{}", filename, cell_types.report())
+    return root_sequence
+
+
+def load_source(
+    parser: JustifParser, cache: ProgramCache | None, filename: str, optimize: bool, dump_types: bool = False
+) -> list[Instruction] | None:
+    """Read a program and parse it, or load it from the cache.
+
+    Args:
+        parser (JustifParser): The parser to use on a cache miss.
+        cache (ProgramCache | None): The cache of parsed programs, if any.
+        filename (str): The program to load.
+        optimize (bool): Run the `Optimizer` and `CellTypes` over the program.
+        dump_types (bool, optional): Log the `CellTypes` report at info level. Defaults to False.
+
+    Returns:
+        list[Instruction] | None: The program, or None if it cannot be parsed.
+    """
+    with open(filename, "r", encoding="utf-8") as f:
+        content = f.read()
+
+    rs = None if cache is None else cache.load(content)
+    if rs is not None:
+        logger.debug("Loaded {} from {}", filename, cache.path(content))
+    else:
+        rs = parser.parse_expression(content)
+        if rs is not None and optimize:
+            rs = optimize_program(rs, filename)
+        if rs is not None and cache is not None:
+            cache.store(content, rs)
+    if rs is not None and optimize:
+        # not cached: the image format has no unchecked addresses, and the pass is cheap
+        rs = infer_cell_types(rs, filename, dump_types)
+    return rs
+
+
+def create_context(
+    engine: str,
+    cells: MutableMapping | None,
+    output: OutputSink | None,
+    input_source: InputSource,
+    debug: bool = False,
+    memoize: bool = False,
+    memo_size: int = 4096,
+) -> tuple[ExecutionContext, Callable[[ExecutionContext, int], int]]:
+    """Create the context and pick the engine for one run of a program, see `main`.
+
+    Returns:
+        tuple[ExecutionContext, Callable[[ExecutionContext, int], int]]: The context, without a program yet, and the engine.
+    """
+    if debug:
+        # only the traced engine logs, the others contain no logging calls at all
+        return TracedExecutionContext(cells, output, input_source), execute_traced
+    if memoize:
+        return MemoizingExecutionContext(cells, output, input_source, cache_size=memo_size), execute_tree
+    return ExecutionContext(cells, output, input_source), ENGINES[engine]
+
+
+def memo_statistics(context: MemoizingExecutionContext) -> str:
+    """Describe how well `--memoize` worked for a run."""
+    return f"Memoized calls: {context.hits} hits, {context.misses} misses, {context.bypassed} not cacheable"
+
+
+class FileResult:
+    """The outcome of running one program in a worker process, see `run_file`."""
+
+    def __init__(self, filename: str, output: bytes, seconds: float, error: str | None, messages: list[str]):
+        self.filename: Final[str] = filename
+        """The program that was run."""
+        self.output: Final[bytes] = output
+        """Everything the program wrote, also if it failed."""
+        self.seconds: Final[float] = seconds
+        """Wall time for loading and running the program."""
+        self.error: Final[str | None] = error
+        """Why the program could not be parsed or failed, None if it succeeded."""
+        self.messages: Final[list[str]] = messages
+        """Info messages about the run, logged by the parent process."""
+
+
+def run_file(
+    filename: str,
+    engine: str = "tree",
+    dense_memory: bool = False,
+    input_file: str | None = None,
+    mmap_input: bool = False,
+    cache_dir: str | None = None,
+    optimize: bool = False,
+    memoize: bool = False,
+    memo_size: int = 4096,
+    dump_types: bool = False,
+) -> FileResult:
+    """Load and run one program with its own parser, memory and output, for `main --jobs`.
+
+    The program reads `input_file` from its beginning, or an empty input: stdin belongs
+    to the parent process. Exceptions are caught and reported in the result.
+
+    Returns:
+        FileResult: The output, timing and error of the run.
+    """
+    start = time.perf_counter()
+    buffer = io.BytesIO()
+    messages: list[str] = []
+    error = None
+    try:
+        cache = None if cache_dir is None else ProgramCache(cache_dir, "optimized" if optimize else "")
+        rs = load_source(JustifParser(iterative=True), cache, filename, optimize, dump_types)
+        if rs is None:
+            error = f"Unable to parse {filename}"
+        else:
+            input_source = InputSource(b"") if input_file is None else InputSource.from_file(input_file, mmap_input)
+            cells = DenseCells() if dense_memory else None
+            context, execute = create_context(
+                engine, cells, OutputSink(buffer), input_source, memoize=memoize, memo_size=memo_size
+            )
+            context.root_sequence = rs
+            try:
+                execute(context, 1)
+            finally:
+                context.output.flush()
+            if isinstance(context, MemoizingExecutionContext):
+                messages.append(memo_statistics(context))
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        error = "".join(traceback.format_exception_only(e)).strip()
+    return FileResult(filename, buffer.getvalue(), time.perf_counter() - start, error, messages)
+
+
+def run_parallel(filenames: list[str], jobs: int, run: Callable[[str], FileResult]) -> list[FileResult]:
+    """Run programs in a pool of worker processes and write their output in input order.
+
+    The output of a program is written as soon as it and all programs before it have
+    finished, followed by a summary of the wall time of each program and of the failures.
+
+    Args:
+        filenames (list[str]): The programs to run.
+        jobs (int): The number of worker processes.
+        run (Callable[[str], FileResult]): Runs one program, `run_file` with the options bound.
+
+    Returns:
+        list[FileResult]: The results, in input order.
+    """
+    start = time.perf_counter()
+    results: list[FileResult] = []
+    sink = OutputSink()
+    with ProcessPoolExecutor(jobs, initializer=configure_logger, initargs=(False,)) as executor:
+        for result in executor.map(run, filenames):
+            logger.info("---------------------------- {} ----------------------------", result.filename)
+            if result.output or result.error is None:
+                sink.write(result.output)
+                sink.flush()
+                print()
+            for message in result.messages:
+                logger.info(message)
+            if result.error is not None:
+                logger.error(result.error)
+            results.append(result)
+    elapsed = time.perf_counter() - start
+    for result in results:
+        logger.info("{:9.3f}s {}{}", result.seconds, result.filename, "" if result.error is None else "  FAILED")
+    failures = sum(result.error is not None for result in results)
+    logger.info(
+        "Ran {} programs in {:.3f}s with {} jobs ({:.3f}s of work), {} failed",
+        len(results),
+        elapsed,
+        jobs,
+        sum(result.seconds for result in results),
+        failures,
+    )
+    return results
+
+
+def main(
+    filenames: list[str],
+    debug: bool = False,
+    engine: str = "tree",
+    dense_memory: bool = False,
+    input_file: str | None = None,
+    mmap_input: bool = False,
+    cache_dir: str | None = None,
+    optimize: bool = False,
+    memoize: bool = False,
+    memo_size: int = 4096,
+    dump_types: bool = False,
+    jobs: int = 1,
+):
+    """_summary_
+
+    Args:
+        filename (str): _description_
+        debug (bool, optional): Log at debug level and run the traced engine. Defaults to False.
+        engine (str, optional): Execution engine, one of ENGINES. Defaults to "tree".
+        dense_memory (bool, optional): Store memory in `DenseCells` instead of a dict. Defaults to False.
+        input_file (str | None, optional): File to read input from instead of stdin. Defaults to None.
+        mmap_input (bool, optional): Map the input file into memory. Defaults to False.
+        cache_dir (str | None, optional): Directory for a `ProgramCache`, so unchanged programs are not parsed again. Defaults to None.
+        optimize (bool, optional): Run the `Optimizer` over the parsed program and drop the type checks `CellTypes` proves unnecessary. Defaults to False.
+        memoize (bool, optional): Cache the results of recursive calls with a `MemoizingExecutionContext`; runs the tree engine. Defaults to False.
+        memo_size (int, optional): Maximum number of cached call results for --memoize. Defaults to 4096.
+        dump_types (bool, optional): Log which cells --optimize proved to be scalars or arrays. Defaults to False.
+        jobs (int, optional): Run the programs in this many worker processes, see `run_parallel`. Each program then reads --input-file from its start, or no input at all. Defaults to 1.
+    """
+    if engine not in ENGINES:
+        raise typer.BadParameter(f"Unknown engine {engine!r}, expected one of {', '.join(ENGINES)}")
+    if jobs < 1:
+        raise typer.BadParameter("--jobs must be at least 1")
+    if jobs > 1 and debug:
+        raise typer.BadParameter("--debug traces every step and needs --jobs 1")
+
+    configure_logger(debug)
+    if jobs > 1:
+        run = partial(
+            run_file,
+            engine=engine,
+            dense_memory=dense_memory,
+            input_file=input_file,
+            mmap_input=mmap_input,
+            cache_dir=cache_dir,
+            optimize=optimize,
+            memoize=memoize,
+            memo_size=memo_size,
+            dump_types=dump_types,
+        )
+        results = run_parallel(filenames, jobs, run)
+        if any(result.error is not None for result in results):
+            raise typer.Exit(1)
+        return
+
+    input_source = InputSource() if input_file is None else InputSource.from_file(input_file, mmap_input)
+    j = JustifParser(iterative=True)
+    cache = None if cache_dir is None else ProgramCache(cache_dir, "optimized" if optimize else "")
     for filename in filenames:
         logger.info(
             "---------------------------- {} ----------------------------", filename
         )
-        with open(filename, "r", encoding="utf-8") as f:
-            content = f.read()
-
-        rs = j.parse_expression(content)
+        rs = load_source(j, cache, filename, optimize, dump_types)
         if rs is not None:
-            context = ExecutionContext()
+            cells = DenseCells() if dense_memory else None
+            if debug:
+                logger.debug("Parsed {}:\n{}", filename, pformat(rs))
+            # with --debug, flush every write so that the output interleaves with the trace
+            output = OutputSink(threshold=0) if debug else None
+            context, execute = create_context(engine, cells, output, input_source, debug, memoize, memo_size)
             context.root_sequence = rs
-            execute_instructions(rs, context, 1)
+            try:
+                execute(context, 1)
+            finally:
+                context.output.flush()
             print()
+            if isinstance(context, MemoizingExecutionContext):
+                logger.info(memo_statistics(context))
         else:
             logger.error("Unable to parse {}", filename)
 
 
+def compile_program(filenames: list[str], output: str | None = None, debug: bool = False, optimize: bool = False):
+    """Translate programs into standalone Python modules with `PythonTranspiler`.
+
+    Each module is byte-compiled right away, so importing it later loads the cached bytecode
+    from `__pycache__` and never touches the JUSTIF source or the parser.
+
+    Args:
+        filenames (list[str]): The programs to translate.
+        output (str | None, optional): The module to write, only for a single program. Defaults to the program name with a .py extension.
+        debug (bool, optional): Log the generated source. Defaults to False.
+        optimize (bool, optional): Run the `Optimizer` over the parsed program. Defaults to False.
+    """
+    if output is not None and len(filenames) != 1:
+        raise typer.BadParameter("--output needs exactly one program")
+
+    configure_logger(debug)
+    j = JustifParser(iterative=True)
+    for filename in filenames:
+        with open(filename, "r", encoding="utf-8") as f:
+            content = f.read()
+
+        rs = j.parse_expression(content)
+        if rs is None:
+            logger.error("Unable to parse {}", filename)
+            continue
+        if optimize:
+            rs = optimize_program(rs, filename)
+        source = PythonTranspiler().transpile(rs, os.path.basename(filename))
+        logger.debug("Translated {}:\n{}", filename, source)
+        target = output if output is not None else os.path.splitext(filename)[0] + ".py"
+        with open(target, "w", encoding="utf-8") as f:
+            f.write(source)
+        py_compile.compile(target, doraise=True)
+        logger.info("Compiled {} to {}", filename, target)
+
+
 if __name__ == "__main__":
-    typer.run(main)
+    # running programs is the default, `compile` is the only other command
+    if sys.argv[1:2] == ["compile"]:
+        del sys.argv[1]
+        typer.run(compile_program)
+    else:
+        typer.run(main)
@@ -0,0 +1,12 @@
+"""Shared setup for the tests: keep the traced engine from flooding the output."""
+from __future__ import annotations
+
+import pytest
+from loguru import logger
+
+
+@pytest.fixture(autouse=True, scope="session")
+def quiet_logger():
+    """Drop the default stderr handler, so the traced engine logs nowhere."""
+    logger.remove()
+    yield
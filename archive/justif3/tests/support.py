@@ -0,0 +1,136 @@
+"""Programs and helpers shared by the tests."""
+from __future__ import annotations
+
+import glob
+import io
+import os
+import random
+from collections.abc import Mapping
+
+from justif import ENGINES, ExecutionContext, InputSource, JustifParser, OutputSink, StacklessInterpreter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+EXAMPLE_FILES = sorted(
+    glob.glob(os.path.join(HERE, "..", "*.justif")) + glob.glob(os.path.join(HERE, "..", "..", "..", "examples", "*.justif"))
+)
+"""The example programs next to justif.py and in the examples directory of the repository."""
+
+
+def parse(source: str) -> list | None:
+    """Parse a program with the default parser."""
+    return JustifParser().parse_expression(source)
+
+
+def examples() -> dict[str, list]:
+    """The example programs that the Python parser accepts, by file name."""
+    programs = {}
+    for filename in EXAMPLE_FILES:
+        with open(filename, "r", encoding="utf-8") as f:
+            program = parse(f.read())
+        if program is not None:
+            programs[os.path.relpath(filename, os.path.join(HERE, ".."))] = program
+    return programs
+
+
+def outcome(
+    engine: str, program: list, index: int = 1, cells: Mapping | None = None, input_data: bytes = b"", context_class: type = ExecutionContext
+) -> tuple:
+    """Run a program and collect everything that can be observed about the run.
+
+    Returns:
+        tuple: The exception type (None on success), the output and the final memory.
+    """
+    buffer = io.BytesIO()
+    context = context_class(dict(cells or {}), OutputSink(buffer), InputSource(input_data))
+    context.root_sequence = program
+    error = None
+    try:
+        ENGINES[engine](context, index)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        error = type(e)
+    finally:
+        context.output.flush()
+    return error, buffer.getvalue(), dict(context.cells)
+
+
+def terminates(program: list, max_steps: int = 400, input_data: bytes = b"") -> bool:
+    """Check that a program ends, one way or another, within a few hundred steps."""
+    context = ExecutionContext({}, OutputSink(io.BytesIO()), InputSource(input_data))
+    context.root_sequence = program
+    interpreter = StacklessInterpreter(context, 1)
+    try:
+        return interpreter.run(max_steps)
+    except Exception:  # pylint: disable=broad-exception-caught
+        return True
+
+
+class ProgramGenerator:
+    """Generates random, syntactically valid programs over a few cells and indices.
+
+    The programs mix numbers and strings, so they also run into the type assertions,
+    reads of missing cells and divisions by zero.
+    """
+
+    def __init__(self, seed: int):
+        self.random = random.Random(seed)
+
+    def program(self) -> str:
+        """A chain of index checks for the indices 1 to 3, like real programs start with."""
+        branches = [f"~{index}?{self.instructions(3)}" for index in (1, 2, 3)]
+        return ":".join(branches) + ":" + self.instructions(1)
+
+    def instructions(self, depth: int) -> str:
+        return ",".join(self.instruction(depth) for _ in range(self.random.randint(1, 4)))
+
+    def instruction(self, depth: int) -> str:
+        choices = ["memset", "memset", "memset", "output", "input", "recursion", "constant"]
+        if depth > 0:
+            choices += ["if", "if"]
+        match self.random.choice(choices):
+            case "memset":
+                source = self.random.choice([self.number(), self.number(), self.string(), self.memory()])
+                return f"{self.memory(offset=False)}{self.random.choice('=+-*/')}{source}"
+            case "output":
+                return self.random.choice(">!") + self.memory()
+            case "input":
+                return "<" + self.memory(offset=False)
+            case "recursion":
+                return f"={self.random.randint(1, 4)}"
+            case "constant":
+                return self.number()
+            case _:
+                return f"{self.condition()}?{self.instructions(depth - 1)}:{self.instructions(depth - 1)}"
+
+    def condition(self) -> str:
+        match self.random.randint(0, 2):
+            case 0:
+                return self.memory()
+            case 1:
+                return "~" + self.random.choice([self.number(), self.memory(offset=False)])
+            case _:
+                return f"{self.random.choice('+-*/')}{self.memory()}={self.random.choice([self.number(), self.memory()])}"
+
+    def memory(self, offset: bool = True) -> str:
+        cell = f"{'..' if self.random.random() < 0.08 else '.'}{self.random.randint(0, 3)}"
+        if offset and not cell.startswith("..") and self.random.random() < 0.25:
+            cell += f"!.{self.random.randint(0, 3)}"
+        return cell
+
+    def number(self) -> str:
+        return str(self.random.choice([0, 0, 1, 1, 2, 3, 10, 65]))
+
+    def string(self) -> str:
+        return '"' + self.random.choice(["", "a", "ab", "Hi!"]) + '"'
+
+
+def random_programs(count: int, seed: int = 0) -> list[tuple[str, list]]:
+    """Generate programs that parse and terminate quickly, with their source."""
+    generator = ProgramGenerator(seed)
+    programs = []
+    while len(programs) < count:
+        source = generator.program()
+        program = parse(source)
+        if program is not None and terminates(program, input_data=b"xy"):
+            programs.append((source, program))
+    return programs
@@ -0,0 +1,74 @@
+"""`execute_async` runs a program like the tree-walker, a slice at a time."""
+from __future__ import annotations
+
+import asyncio
+import io
+
+import pytest
+
+from justif import AsyncOutputSink, ExecutionContext, InputSource, OutputSink, QuotaExceeded, execute_async
+from support import examples, outcome, parse
+
+ENDLESS = "~1?.0+1,=1:0"
+
+
+def context_for(program: list, output: OutputSink, input_data: bytes = b"") -> ExecutionContext:
+    context = ExecutionContext({}, output, InputSource(input_data))
+    context.root_sequence = program
+    return context
+
+
+@pytest.mark.parametrize("name", sorted(examples()))
+def test_examples(name):
+    program = examples()[name]
+    buffer = io.BytesIO()
+    context = context_for(program, OutputSink(buffer), b"42")
+    error = None
+    try:
+        asyncio.run(execute_async(context, slice_steps=7))
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        error = type(e)
+    finally:
+        context.output.flush()
+    assert (error, buffer.getvalue(), dict(context.cells)) == outcome("tree", program, input_data=b"42")
+
+
+def test_output_is_drained_between_slices():
+    chunks: list[bytes] = []
+
+    async def write(data: bytes) -> None:
+        chunks.append(data)
+
+    # prints the position too, so the loop is not replaced by a single bulk write
+    program = parse('~1?.0="abc",=2:~2?.0!.1?>.0!.1,!.1,.1+1,=2:0:0')
+    context = context_for(program, AsyncOutputSink(write))
+    asyncio.run(execute_async(context, slice_steps=4))
+    assert b"".join(chunks) == b"a0\nb1\nc2\n"
+    assert len(chunks) > 1
+
+
+def test_quota():
+    context = context_for(parse(ENDLESS), OutputSink(io.BytesIO()))
+    with pytest.raises(QuotaExceeded):
+        asyncio.run(execute_async(context, slice_steps=10, max_steps=1000))
+    assert 0 < context.cells[0] <= 1000
+
+
+def test_timeout():
+    context = context_for(parse(ENDLESS), OutputSink(io.BytesIO()))
+    with pytest.raises(TimeoutError):
+        asyncio.run(execute_async(context, timeout=0.05))
+
+
+def test_programs_take_turns():
+    async def both() -> list[int]:
+        first = context_for(parse(ENDLESS), OutputSink(io.BytesIO()))
+        second = context_for(parse(ENDLESS), OutputSink(io.BytesIO()))
+        tasks = [asyncio.create_task(execute_async(context, slice_steps=10)) for context in (first, second)]
+        await asyncio.sleep(0.05)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return [first.cells[0], second.cells[0]]
+
+    assert all(count > 0 for count in asyncio.run(both()))
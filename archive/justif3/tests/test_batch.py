@@ -0,0 +1,56 @@
+"""`run_batch` runs like separate runs of the program, in this process or in workers."""
+from __future__ import annotations
+
+import pytest
+
+from justif import BatchRun, CellTypes, dump_program, load_program, run_batch
+from support import outcome, parse
+
+SOURCE = ".1=.0,.1+1,!.1,<.2,>.2"
+
+
+def runs() -> list[BatchRun]:
+    return [BatchRun({0: value}, bytes([65 + value])) for value in range(5)]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_results_in_order(jobs):
+    program = parse(SOURCE)
+    results = list(run_batch(program, runs(), jobs=jobs, chunk_size=2, keep_cells=True))
+    for batch_run, result in zip(runs(), results):
+        error, output, cells = outcome("tree", program, cells=batch_run.cells, input_data=batch_run.input)
+        assert (result.error, result.output, result.cells) == (error, output, cells)
+
+
+def test_errors_are_reported():
+    [result] = run_batch(parse(SOURCE), [BatchRun({0: "ab"})])
+    assert result.error.startswith("AssertionError")
+
+
+def unchecked_results(jobs: int) -> list[tuple]:
+    program = parse(SOURCE)
+    program = CellTypes(program).apply(program)
+    batch = [BatchRun({0: 1}, b"A"), BatchRun({0: "ab"}, b"A"), BatchRun({0: 2}, b"A"), BatchRun({0: 3, 5: "x"}, b"B")]
+    return [
+        (result.result, result.output, result.error, result.cells)
+        for result in run_batch(program, batch, jobs=jobs, chunk_size=1, keep_cells=True)
+    ]
+
+
+def test_unchecked_program_rejects_memory_it_cannot_start_on():
+    results = unchecked_results(1)
+    assert [output for _, output, _, _ in results] == [b"2\nA", b"", b"3\nA", b"4\nB"]
+    assert results[1][2].startswith("ValueError")
+    assert results[1][0] is None
+
+
+@pytest.mark.parametrize("jobs", [2, 3])
+def test_workers_run_the_unchecked_program(jobs):
+    assert unchecked_results(jobs) == unchecked_results(1)
+
+
+def test_image_keeps_what_cell_types_proved():
+    program = parse(SOURCE)
+    program = CellTypes(program).apply(program)
+    loaded = load_program(dump_program(program))
+    assert repr(CellTypes.unchecked_addresses(CellTypes(loaded).apply(loaded))) == repr(CellTypes.unchecked_addresses(program))
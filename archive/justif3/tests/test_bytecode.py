@@ -0,0 +1,33 @@
+"""The bytecode compiler and VM, beyond what the examples exercise."""
+from __future__ import annotations
+
+from justif import BytecodeCompiler, Opcode, Program
+from support import outcome, parse
+
+
+def test_tail_calls_loop():
+    program = Program(parse("~1?.0=0,=2:~2?+.0=100000?.0+1,=2:0:0"), "bytecode")
+    context = program.context()
+    program.execute(context)
+    assert context.cells[0] == 100000
+
+
+def test_deep_recursion():
+    # non-tail calls push frames on a list, not on the Python stack
+    program = Program(parse("~1?.0=0,=2,!.0:~2?+.0=100000?.0+1,=2,0:0:0"), "bytecode")
+    context = program.context()
+    assert program.execute(context) == 1
+    assert context.cells[0] == 100000
+
+
+def test_string_arithmetic_fails_when_run():
+    program = parse('~1?1:.0+"ab"')
+    assert "EXECUTE" in BytecodeCompiler().compile(program).disassemble()
+    assert outcome("bytecode", program) == outcome("tree", program) == (None, b"", {})
+    assert outcome("bytecode", program, index=2)[0] is AssertionError
+
+
+def test_disassemble():
+    listing = BytecodeCompiler().compile(parse("~1?.0=65,>.0:0")).disassemble()
+    assert listing.splitlines()[0].split()[1] == Opcode.DISPATCH.name
+    assert "STORE" in listing and "OUTPUT_CHAR" in listing
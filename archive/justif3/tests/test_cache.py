@@ -0,0 +1,81 @@
+"""Program images and the `ProgramCache`."""
+from __future__ import annotations
+
+import pytest
+
+import justif
+from justif import JustifParser, Optimizer, ProgramCache, dump_program, load_program, load_source
+from support import examples, outcome, random_programs
+
+HELLO = '~1?.0=_,.$="Hello, World",=2:~2?.1!.0?>.1!.0,._+1,=2:0:0'
+
+
+@pytest.mark.parametrize("name", sorted(examples()))
+def test_round_trip_examples(name):
+    program = examples()[name]
+    loaded = load_program(dump_program(program))
+    assert dump_program(loaded) == dump_program(program)
+    assert outcome("tree", loaded, input_data=b"42") == outcome("tree", program, input_data=b"42")
+
+
+def test_round_trip_random_programs():
+    for source, program in random_programs(100, seed=4):
+        assert dump_program(load_program(dump_program(program))) == dump_program(program), source
+
+
+def test_other_version():
+    image = bytearray(dump_program(JustifParser().parse_expression(HELLO)))
+    image[len(justif.IMAGE_MAGIC)] += 1
+    assert load_program(bytes(image)) is None
+
+
+def cached_file(tmp_path) -> tuple[ProgramCache, str]:
+    """A cache with the image of a program file in it."""
+    filename = tmp_path / "hello.justif"
+    filename.write_text(HELLO, encoding="utf-8")
+    cache = ProgramCache(str(tmp_path / "cache"))
+    load_source(JustifParser(), cache, str(filename), optimize=False)
+    return cache, str(filename)
+
+
+def test_hit(tmp_path):
+    cache, filename = cached_file(tmp_path)
+    assert cache.load(HELLO) is not None
+    assert outcome("tree", load_source(JustifParser(), cache, filename, optimize=False))[1] == b"Hello, World"
+
+
+@pytest.mark.parametrize(
+    "damage",
+    [
+        lambda image: image[: len(image) // 2],
+        lambda image: image[:7],
+        lambda image: b"",
+        lambda image: image[:7] + b"\xff" * 40,
+        lambda image: image[:7] + b"i\x07\x00\x00\x00",
+        lambda image: image[:6] + bytes([image[6] + 1]) + image[7:],
+        lambda image: b"not an image at all",
+    ],
+)
+def test_unreadable_image_is_replaced(tmp_path, damage):
+    cache, filename = cached_file(tmp_path)
+    path = cache.path(HELLO)
+    with open(path, "rb") as f:
+        good = f.read()
+    with open(path, "wb") as f:
+        f.write(damage(good))
+    assert cache.load(HELLO) is None
+    program = load_source(JustifParser(), cache, filename, optimize=False)
+    assert outcome("tree", program)[1] == b"Hello, World"
+    with open(path, "rb") as f:
+        assert f.read() == good
+
+
+def test_key_covers_versions(tmp_path, monkeypatch):
+    cache = ProgramCache(str(tmp_path))
+    path = cache.path(HELLO)
+    assert ProgramCache(str(tmp_path), "optimized").path(HELLO) != path
+    monkeypatch.setattr(Optimizer, "VERSION", Optimizer.VERSION + 1)
+    assert cache.path(HELLO) != path
+    monkeypatch.undo()
+    monkeypatch.setattr(justif, "IMAGE_VERSION", justif.IMAGE_VERSION + 1)
+    assert cache.path(HELLO) != path
@@ -0,0 +1,90 @@
+"""`CellTypes` only drops assertions that cannot fail, also on preloaded memory."""
+from __future__ import annotations
+
+import io
+
+import pytest
+
+from justif import CellTypes, InputSource, MemorySnapshot, OutputSink, Program, encode_string
+from support import examples, outcome, parse
+
+
+def unchecked(program: list) -> Program:
+    """Prepare a program with the unchecked addresses `CellTypes` proves safe."""
+    return Program(CellTypes(program).apply(program))
+
+
+def run(program: Program, cells: dict) -> tuple:
+    """Run a prepared program and collect its output and final memory."""
+    buffer = io.BytesIO()
+    context = program.context(cells, OutputSink(buffer), InputSource(b"42"))
+    try:
+        program.execute(context, 1)
+    finally:
+        context.output.flush()
+    return buffer.getvalue(), dict(context.cells)
+
+
+@pytest.mark.parametrize("name", sorted(examples()))
+def test_examples(name):
+    program = examples()[name]
+    assert outcome("tree", unchecked(program).root_sequence, input_data=b"42") == outcome(
+        "tree", program, input_data=b"42"
+    )
+
+
+def test_program_has_unchecked_addresses():
+    program = unchecked(parse(".0=5,.1=.0,.1+1,!.1"))
+    assert CellTypes.unchecked_addresses(program.root_sequence)
+
+
+def test_int_preload_is_accepted():
+    program = unchecked(parse(".1=.0,.1+1,!.1"))
+    assert run(program, {0: 41})[0] == b"42\n"
+
+
+def test_string_preload_into_scalar_cell_is_rejected():
+    program = unchecked(parse(".1=.0,.1+1,!.1"))
+    with pytest.raises(ValueError):
+        program.context({0: encode_string("ab")})
+
+
+def test_string_preload_into_unused_cell_is_accepted():
+    program = unchecked(parse(".1=.0,.1+1,!.1"))
+    assert run(program, {0: 1, 7: encode_string("ab")})[0] == b"2\n"
+
+
+def test_string_preload_into_array_cell_is_accepted():
+    program = unchecked(parse('.0="ab",.2=.0!.1,!.2'))
+    assert run(program, {0: encode_string("xy"), 1: 1})[0] == b"98\n"
+
+
+def test_int_preload_into_array_cell_is_rejected():
+    program = unchecked(parse('.0="ab",.2=.0!.1,!.2'))
+    with pytest.raises(ValueError):
+        program.context({0: 5})
+
+
+def test_indirect_read_rejects_any_string():
+    program = unchecked(parse(".1=..0,!.1"))
+    assert run(program, {0: 3, 3: 7})[0] == b"7\n"
+    with pytest.raises(ValueError):
+        program.context({0: 3, 3: encode_string("ab")})
+
+
+def test_checked_program_accepts_anything():
+    program = Program(parse(".1=.0,.1+1,!.1"))
+    with pytest.raises(AssertionError):
+        run(program, {0: encode_string("ab")})
+
+
+def test_snapshot_checks_initial_memory():
+    program = unchecked(parse("~1?.1=.0,.1+1,=2:~2?!.1:0"))
+    with pytest.raises(ValueError):
+        MemorySnapshot.capture(program, 2, cells={0: encode_string("ab")})
+    with pytest.raises(ValueError):
+        MemorySnapshot(program, {1: encode_string("ab")}, 2)
+    snapshot = MemorySnapshot.capture(program, 2, cells={0: 6})
+    buffer = io.BytesIO()
+    snapshot.resume(output=OutputSink(buffer))
+    assert buffer.getvalue() == b"7\n"
@@ -0,0 +1,56 @@
+"""The command line: running programs is the default, `compile` translates them."""
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+
+from support import HERE
+
+JUSTIF = os.path.join(HERE, "..", "justif.py")
+HELLO = os.path.join(HERE, "..", "hello1.justif")
+
+
+def justif(*arguments: str) -> subprocess.CompletedProcess:
+    """Run justif.py with the given arguments."""
+    return subprocess.run([sys.executable, JUSTIF, *arguments], capture_output=True, check=False, timeout=60)
+
+
+def test_run_file():
+    result = justif(HELLO)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.startswith(b"Hello, World")
+
+
+def test_run_with_engine():
+    result = justif("--engine", "closure", HELLO)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.startswith(b"Hello, World")
+
+
+def test_compile(tmp_path):
+    target = tmp_path / "hello.py"
+    assert justif("compile", HELLO, "--output", str(target)).returncode == 0
+    result = subprocess.run([sys.executable, str(target)], capture_output=True, check=True, timeout=60)
+    assert result.stdout.startswith(b"Hello, World")
+
+
+def test_unknown_engine():
+    assert justif("--engine", "nonsense", HELLO).returncode != 0
+
+
+def test_parallel_output_in_order():
+    programs = [os.path.join(HERE, "..", name) for name in ("hello1.justif", "fibonacci.justif", "hello2.justif")]
+    sequential = justif(*programs)
+    parallel = justif("--jobs", "2", *programs)
+    assert sequential.returncode == parallel.returncode == 0, parallel.stderr
+    assert parallel.stdout == sequential.stdout
+
+
+def test_parallel_failure(tmp_path):
+    failing = tmp_path / "failing.justif"
+    failing.write_text('.0="a",.0+1')
+    result = justif("--jobs", "2", str(failing), HELLO)
+    assert result.returncode == 1
+    assert b"Hello, World" in result.stdout
+    assert b"AssertionError" in result.stderr
@@ -0,0 +1,20 @@
+"""The closure compiler, beyond what the examples exercise."""
+from __future__ import annotations
+
+from justif import ClosureCompiler, Program
+from support import outcome, parse
+
+
+def test_tail_calls_loop():
+    # each iteration is a tail call, which must not use up the Python stack
+    program = Program(parse("~1?.0=0,=2:~2?+.0=100000?.0+1,=2:0:0"), "closure")
+    context = program.context()
+    program.execute(context)
+    assert context.cells[0] == 100000
+
+
+def test_string_arithmetic_fails_when_run():
+    program = parse('~1?1:.0+"ab"')
+    ClosureCompiler().compile(program)
+    assert outcome("closure", program) == outcome("tree", program) == (None, b"", {})
+    assert outcome("closure", program, index=2)[0] is AssertionError
@@ -0,0 +1,78 @@
+"""`DenseCells` behaves like a dict of cells, and programs run the same on it."""
+from __future__ import annotations
+
+import io
+import random
+
+import pytest
+
+from justif import ENGINES, DenseCells, ExecutionContext, InputSource, OutputSink
+from support import examples, outcome, random_programs
+
+
+def normalized(cells) -> dict:
+    """The cells, with blocks compared by their elements."""
+    return {address: value if isinstance(value, (int, bytes, tuple)) else list(value) for address, value in cells.items()}
+
+
+def dense_outcome(engine: str, program: list, input_data: bytes = b"") -> tuple:
+    buffer = io.BytesIO()
+    context = ExecutionContext(DenseCells(), OutputSink(buffer), InputSource(input_data))
+    context.root_sequence = program
+    error = None
+    try:
+        ENGINES[engine](context, 1)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        error = type(e)
+    finally:
+        context.output.flush()
+    return error, buffer.getvalue(), normalized(context.cells)
+
+
+def test_random_operations():
+    rng = random.Random(3)
+    cells = DenseCells(dense_limit=5000)
+    model: dict[int, object] = {}
+    addresses = [-3, -1, 0, 1, 2, 7, 100, 1023, 1500, 4000, 4999, 5000, 1 << 40]
+    values = [0, 1, -1, 1 << 63, -(1 << 63), (1 << 63) - 1, 10**30, [1, 2, 0], [300, 0], b"ab\0", (500, 0)]
+    for _ in range(5000):
+        address = rng.choice(addresses)
+        match rng.randrange(3):
+            case 0:
+                value = rng.choice(values)
+                cells[address] = value
+                model[address] = value
+            case 1:
+                assert cells.get(address) == model.get(address) or list(cells[address]) == model[address]
+            case 2:
+                if address in model:
+                    del cells[address]
+                    del model[address]
+                else:
+                    with pytest.raises(KeyError):
+                        del cells[address]
+        assert len(cells) == len(model)
+    assert normalized(cells) == normalized(model)
+    assert sorted(cells) == sorted(model)
+
+
+def test_setdefault():
+    cells = DenseCells()
+    assert cells.setdefault(3, 0) == 0
+    cells[3] = 5
+    assert cells.setdefault(3, 0) == 5
+    assert 3 in cells and 4 not in cells
+
+
+@pytest.mark.parametrize("engine", ["tree", "closure", "bytecode"])
+@pytest.mark.parametrize("name", sorted(examples()))
+def test_examples(name, engine):
+    program = examples()[name]
+    error, output, cells = outcome(engine, program, input_data=b"42")
+    assert dense_outcome(engine, program, b"42") == (error, output, normalized(cells))
+
+
+def test_random_programs():
+    for source, program in random_programs(200, seed=17):
+        error, output, cells = outcome("tree", program, input_data=b"xy")
+        assert dense_outcome("tree", program, b"xy") == (error, output, normalized(cells)), source
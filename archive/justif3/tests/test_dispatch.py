@@ -0,0 +1,41 @@
+"""The jump table for the index chain picks the branch the chain of checks would pick."""
+from __future__ import annotations
+
+import pytest
+
+import justif
+from justif import IndexDispatch
+from support import examples, outcome, parse
+
+# index 2 twice, and a chain that ends in a check that is not a constant
+CHAIN = "~1?!.0:~2?.0+1,!.0:~2?.0+2,!.0:~.5?.0+3,!.0:.0+4,!.0"
+
+
+def without_dispatch(monkeypatch: pytest.MonkeyPatch, engine: str, program: list, index: int, cells: dict) -> tuple:
+    with monkeypatch.context() as patch:
+        patch.setattr(IndexDispatch, "build", staticmethod(lambda root_sequence: None))
+        return outcome(engine, program, index, cells)
+
+
+def test_table():
+    dispatch = IndexDispatch.build(parse(CHAIN))
+    assert sorted(dispatch.table) == [1, 2]
+    assert dispatch.lookup(3) is dispatch.fallback
+
+
+def test_no_chain():
+    assert IndexDispatch.build(parse(".0+1,!.0")) is None
+
+
+@pytest.mark.parametrize("engine", ["tree", "stackless", "closure", "bytecode", "transpiled"])
+def test_same_branch_as_chain(engine, monkeypatch):
+    program = parse(CHAIN)
+    for index in range(5):
+        for cells in ({}, {5: 3}, {5: 4}):
+            assert outcome(engine, program, index, cells) == without_dispatch(monkeypatch, engine, program, index, cells)
+
+
+@pytest.mark.parametrize("name", sorted(examples()))
+def test_examples(name, monkeypatch):
+    program = examples()[name]
+    assert outcome("tree", program, 1, {}) == without_dispatch(monkeypatch, "tree", program, 1, {})
@@ -0,0 +1,27 @@
+"""Every engine runs the example programs like the tree-walking interpreter."""
+from __future__ import annotations
+
+import pytest
+
+from justif import ENGINES
+from support import examples, outcome, random_programs
+
+ENGINES_UNDER_TEST = ["traced", "stackless", "closure", "bytecode", "transpiled"]
+"""The engines compared with the tree-walking interpreter."""
+
+
+@pytest.mark.parametrize("engine", ENGINES_UNDER_TEST)
+@pytest.mark.parametrize("name", sorted(examples()))
+def test_examples(engine, name):
+    program = examples()[name]
+    assert outcome(engine, program, input_data=b"42") == outcome("tree", program, input_data=b"42")
+
+
+@pytest.mark.parametrize("engine", ENGINES_UNDER_TEST)
+def test_random_programs(engine):
+    for source, program in random_programs(200, seed=2):
+        assert outcome(engine, program, input_data=b"xy") == outcome("tree", program, input_data=b"xy"), source
+
+
+def test_all_engines_covered():
+    assert set(ENGINES_UNDER_TEST) | {"tree"} <= set(ENGINES)
@@ -0,0 +1,65 @@
+"""Recognized loops run exactly like their original bodies, whatever the memory holds."""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+import justif
+from justif import IdiomInstruction, IndexDispatch, ParseNumberInstruction, PrintStringInstruction, StringLengthInstruction
+from support import examples, outcome, parse
+
+STRING_LENGTH = '~1?.0="abc",=2,!.1:~2?.0!.1?.1+1,=2:0:0'
+
+
+def idiom_indexes(program: list) -> dict[int, type]:
+    """The recursion indexes whose body `recognize_idioms` replaces, and the idiom used."""
+    dispatch = IndexDispatch.build(justif.recognize_idioms(program))
+    if dispatch is None:
+        return {}
+    return {
+        index: type(body[0]) for index, body in dispatch.table.items() if len(body) == 1 and isinstance(body[0], IdiomInstruction)
+    }
+
+
+def programs() -> dict[str, list]:
+    return {**examples(), "strlen": parse(STRING_LENGTH)}
+
+
+def random_memory(rng: random.Random) -> dict[int, object]:
+    numbers = [0, 0, 1, 2, -1, -5, 50, 200]
+    strings = [b"12x\0", b"ab", b"\0", b"907\0", (300, 7, 0), b"", "ab", (65, -5, 0), (0x110000, 0), (66, 0xD800, 0)]
+    return {cell: rng.choice(strings if rng.random() < 0.4 else numbers) for cell in range(6) if rng.random() < 0.9}
+
+
+def test_idioms_are_recognized():
+    found = {idiom for program in programs().values() for idiom in idiom_indexes(program).values()}
+    assert found == {PrintStringInstruction, StringLengthInstruction, ParseNumberInstruction}
+
+
+@pytest.mark.parametrize("engine", ["tree", "closure", "bytecode"])
+@pytest.mark.parametrize("name", sorted(programs()))
+def test_idioms_match_their_bodies(name, engine, monkeypatch):
+    program = programs()[name]
+    rng = random.Random(name)
+    for index in idiom_indexes(program):
+        for _ in range(60):
+            cells = random_memory(rng)
+            with_idioms = outcome(engine, program, index, cells)
+            with monkeypatch.context() as patch:
+                patch.setattr(justif, "recognize_idioms", lambda root_sequence: root_sequence)
+                without_idioms = outcome(engine, program, index, cells)
+            assert with_idioms == without_idioms, (index, cells)
+
+
+@pytest.mark.parametrize(
+    "string, stop", [((65, 66, -5, 0), 2), ((65, 0x110000, 0), 1), ((65, 0xDFFF, 0), 1), ((65, 1 << 80, 0), 1)]
+)
+def test_print_string_stops_at_bad_character(string, stop, monkeypatch):
+    program = parse("~1?=2:~2?.0!.1?>.0!.1,.1+1,=2:0:0")
+    cells = {0: string, 1: 0}
+    with_idioms = outcome("tree", program, 2, cells)
+    with monkeypatch.context() as patch:
+        patch.setattr(justif, "recognize_idioms", lambda root_sequence: root_sequence)
+        assert with_idioms == outcome("tree", program, 2, cells)
+    assert with_idioms[1:] == (bytes(string[:stop]), {0: string, 1: stop})
@@ -0,0 +1,27 @@
+"""Streaming input delivers every byte, in order, from any kind of source."""
+from __future__ import annotations
+
+import io
+
+from justif import InputSource
+
+
+def test_input_from_bytes_and_streams():
+    data = bytes(range(256)) * 3
+    for source in (InputSource(data), InputSource(io.BytesIO(data), chunk_size=7)):
+        assert [source.read_byte() for _ in range(len(data) + 2)] == [*data, -1, -1]
+
+
+def test_input_characters():
+    source = InputSource("aé€😀".encode("utf-8") + b"\xff\xc3x", chunk_size=2)
+    assert [source.read_char() for _ in range(8)] == [ord("a"), 0xE9, 0x20AC, 0x1F600, 0xFFFD, 0xFFFD, ord("x"), -1]
+
+
+def test_input_from_file(tmp_path):
+    path = tmp_path / "input"
+    path.write_bytes(b"xyz")
+    for use_mmap in (False, True):
+        source = InputSource.from_file(str(path), use_mmap)
+        assert [source.read_byte() for _ in range(4)] == [120, 121, 122, -1]
+    (tmp_path / "empty").write_bytes(b"")
+    assert InputSource.from_file(str(tmp_path / "empty"), True).read_byte() == -1
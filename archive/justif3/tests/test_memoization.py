@@ -0,0 +1,63 @@
+"""`MemoizingExecutionContext` only skips calls whose result and writes it already knows."""
+from __future__ import annotations
+
+import io
+
+import pytest
+
+from justif import InputSource, MemoizingExecutionContext, OutputSink, execute_tree
+from support import examples, outcome, parse, random_programs
+
+
+def memoized(source: str, cells: dict | None = None) -> tuple[MemoizingExecutionContext, bytes]:
+    buffer = io.BytesIO()
+    context = MemoizingExecutionContext(cells, OutputSink(buffer), InputSource(b""))
+    context.root_sequence = parse(source)
+    execute_tree(context, 1)
+    context.output.flush()
+    return context, buffer.getvalue()
+
+
+@pytest.mark.parametrize("name", sorted(examples()))
+def test_examples(name):
+    program = examples()[name]
+    assert outcome("tree", program, input_data=b"42", context_class=MemoizingExecutionContext) == outcome(
+        "tree", program, input_data=b"42"
+    )
+
+
+def test_random_programs():
+    for source, program in random_programs(200, seed=11):
+        assert outcome("tree", program, input_data=b"xy", context_class=MemoizingExecutionContext) == outcome(
+            "tree", program, input_data=b"xy"
+        ), source
+
+
+def test_repeated_pure_call_is_cached():
+    context, output = memoized("~1?.0=5,=2,=2,=2,!.1:~2?.1=.0,.1*2:0")
+    assert output == b"10\n"
+    assert (context.misses, context.hits) == (1, 2)
+
+
+def test_cached_call_replays_its_writes():
+    context, output = memoized("~1?.0=5,=2,.1=0,=2,!.1:~2?.1=.0,.1*2:0")
+    assert output == b"10\n"
+    assert context.hits == 1
+
+
+def test_changed_read_is_a_miss():
+    context, output = memoized("~1?.0=5,=2,.0=6,=2,!.1:~2?.1=.0,.1*2:0")
+    assert output == b"12\n"
+    assert (context.misses, context.hits) == (2, 0)
+
+
+def test_call_with_output_is_not_cached():
+    context, output = memoized("~1?.0=5,=2,=2:~2?!.0:0")
+    assert output == b"5\n5\n"
+    assert (context.hits, context.bypassed) == (0, 2)
+
+
+def test_mutable_cell_is_not_cached():
+    context, output = memoized("~1?=2,=2,!.1:~2?.1=.0!.2:0", {0: [7, 0]})
+    assert output == b"7\n"
+    assert context.hits == 0
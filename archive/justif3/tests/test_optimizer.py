@@ -0,0 +1,86 @@
+"""The `Optimizer` never changes what a program does, only how fast it does it."""
+from __future__ import annotations
+
+import pytest
+
+from justif import IfInstruction, MemsetInstruction, Optimizer, Program
+from support import ProgramGenerator, examples, outcome, parse, terminates
+
+
+def optimized(program: list) -> list:
+    """Optimize a parsed program."""
+    return Optimizer().optimize(program)
+
+
+def same_outcome(program: list, index: int = 1, input_data: bytes = b"xy") -> bool:
+    """Check that the optimized program runs like the original one."""
+    return outcome("tree", optimized(program), index, input_data=input_data) == outcome(
+        "tree", program, index, input_data=input_data
+    )
+
+
+@pytest.mark.parametrize("name", sorted(examples()))
+def test_examples(name):
+    assert same_outcome(examples()[name], input_data=b"42")
+
+
+def test_random_programs():
+    generator = ProgramGenerator(seed=5)
+    count = 0
+    while count < 300:
+        source = generator.program()
+        program = parse(source)
+        if program is None or not terminates(program, input_data=b"xy"):
+            continue
+        count += 1
+        assert same_outcome(program), source
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        '~1?1:.0+"ab",.0+1',
+        '~1?.0+"ab",.0+1:0',
+        '.0="ab",.0+1,.0+2',
+        '.0="ab",.0=3,.0+1',
+        ".0+1,.0=5",
+        '.0="ab",.0-0',
+        ".0=.0,.1+0,.2*1,.3/1,.4-0",
+        "~1?0,.2+0:~2?!.1:3,=3",
+        '.1="ab",..1+0',
+        ".0=5,.0/0",
+        '.0=1,.0+.0,.0="x",.0*2',
+    ],
+)
+def test_mixed_strings_and_ints(source):
+    program = parse(source)
+    for index in (1, 2):
+        assert same_outcome(program, index), index
+
+
+def test_noop_creates_cell():
+    program = parse("~1?0,.2+0:~2?!.1:3,=3")
+    assert outcome("tree", optimized(program))[2] == {2: 0}
+
+
+def test_fold():
+    optimizer = Optimizer()
+    (memset,) = optimizer.optimize(parse(".0=5,.0+3,.0*2"))
+    assert isinstance(memset, MemsetInstruction)
+    assert (memset.method, memset.source) == ("=", 16)
+    assert len(optimizer.changes) == 2
+
+
+def test_no_fold_over_strings():
+    assert len(optimized(parse('.0+"ab",.0+1'))) == 2
+    assert len(optimized(parse('.0="ab",.0+1'))) == 2
+
+
+def test_decided_branches():
+    (instruction,) = optimized(parse("~1?~1?.0=1:.0=2:~1?.0=3:.0=4"))
+    assert isinstance(instruction, IfInstruction)
+    assert [len(instruction.if_true), len(instruction.if_false)] == [1, 1]
+
+
+def test_opt_in():
+    assert repr(Program.parse(".0=5,.0+3").root_sequence) != repr(Program.parse(".0=5,.0+3", optimize=True).root_sequence)
@@ -0,0 +1,47 @@
+"""Buffered output keeps every byte, in order, and is written in large chunks."""
+from __future__ import annotations
+
+import io
+
+from justif import OutputSink
+
+
+class CountingStream(io.BytesIO):
+    """A stream that counts how often it is written to."""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, data) -> int:
+        self.writes += 1
+        return super().write(data)
+
+
+def test_output_is_written_in_chunks():
+    target = CountingStream()
+    sink = OutputSink(target, threshold=64)
+    for value in range(1000):
+        sink.write_char(65 + value % 26)
+    sink.flush()
+    assert target.getvalue() == bytes(65 + value % 26 for value in range(1000))
+    assert target.writes <= 1000 // 64 + 1
+
+
+def test_output_encodings():
+    target = io.BytesIO()
+    sink = OutputSink(target)
+    sink.write_char(0xE9)
+    sink.write_integer(-12)
+    sink.write(b"raw")
+    assert target.getvalue() == b""
+    sink.flush()
+    assert target.getvalue() == "é".encode("utf-8") + b"-12\nraw"
+
+
+def test_output_to_file_descriptor(tmp_path):
+    path = tmp_path / "out"
+    with open(path, "wb") as f:
+        sink = OutputSink(f.fileno(), threshold=0)
+        sink.write(b"abc")
+    assert path.read_bytes() == b"abc"
@@ -0,0 +1,48 @@
+"""The recursive-descent and the iterative parser produce the same instruction trees."""
+from __future__ import annotations
+
+import pytest
+
+from justif import IfInstruction, JustifParser, dump_program
+from support import EXAMPLE_FILES, ProgramGenerator
+
+
+def image(program: list | None) -> bytes | None:
+    """Serialize a parsed program for comparison, see `dump_program`."""
+    return None if program is None else dump_program(program)
+
+
+def both(source: str) -> tuple[bytes | None, bytes | None]:
+    """Parse a program with both parsers."""
+    return image(JustifParser().parse_expression(source)), image(JustifParser(iterative=True).parse_expression(source))
+
+
+@pytest.mark.parametrize("filename", EXAMPLE_FILES)
+def test_examples(filename):
+    with open(filename, "r", encoding="utf-8") as f:
+        recursive, iterative = both(f.read())
+    assert recursive == iterative
+
+
+def test_random_programs():
+    generator = ProgramGenerator(seed=3)
+    for _ in range(300):
+        source = generator.program()
+        recursive, iterative = both(source)
+        assert recursive == iterative, source
+        assert recursive is not None, source
+
+
+@pytest.mark.parametrize("source", ["", "~1?", ".0?1", '"ab', ".0=", "~1?.0=1:"])
+def test_invalid_programs(source):
+    assert both(source) == (None, None)
+
+
+def test_deep_nesting():
+    depth = 5000
+    program = JustifParser(iterative=True).parse_expression(".0?" * depth + "0" + ":0" * depth)
+    nesting = 0
+    while isinstance(program[0], IfInstruction):
+        program = program[0].if_true
+        nesting += 1
+    assert nesting == depth
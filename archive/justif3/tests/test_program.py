@@ -0,0 +1,49 @@
+"""A `Program` is prepared once and runs the same in any number of threads at once."""
+from __future__ import annotations
+
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from justif import ENGINES, InputSource, OutputSink, Program
+from support import examples, outcome, parse
+
+# counts up to the number in cell 0 and prints every step
+COUNTER = "~1?=2:~2?+.1=.0?!.1,.1+1,=2:0:0"
+
+
+def run(program: Program, limit: int) -> bytes:
+    buffer = io.BytesIO()
+    program.run(1, {0: limit}, OutputSink(buffer), InputSource(b""))
+    return buffer.getvalue()
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        Program(parse(COUNTER), "fast")
+
+
+@pytest.mark.parametrize("engine", sorted(ENGINES))
+@pytest.mark.parametrize("name", sorted(examples()))
+def test_examples(name, engine):
+    buffer = io.BytesIO()
+    program = Program(examples()[name], engine)
+    context = program.context({}, OutputSink(buffer), InputSource(b"42"))
+    error = None
+    try:
+        program.execute(context, 1)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        error = type(e)
+    finally:
+        context.output.flush()
+    assert (error, buffer.getvalue(), dict(context.cells)) == outcome("tree", examples()[name], input_data=b"42")
+
+
+@pytest.mark.parametrize("engine", sorted(ENGINES))
+def test_threads_share_one_program(engine):
+    program = Program(parse(COUNTER), engine)
+    limits = [40 + 3 * n for n in range(32)]
+    with ThreadPoolExecutor(8) as executor:
+        outputs = list(executor.map(lambda limit: run(program, limit), limits))
+    assert outputs == [b"".join(b"%d\n" % n for n in range(limit)) for limit in limits]
@@ -0,0 +1,63 @@
+"""Runs resumed from a `MemorySnapshot` end like runs of the whole program."""
+from __future__ import annotations
+
+import io
+from collections import ChainMap
+
+import pytest
+
+from justif import MemorySnapshot, OutputSink, Program
+from support import parse
+
+# initializes cells 0 and 1, then tail calls 2, which prints and counts
+SOURCE = "~1?.0=3,.1=\"ab\",>.1!.2,=2:~2?!.0,.0+1,0:0"
+
+
+def resumed(snapshot: MemorySnapshot, index: int | None = None) -> bytes:
+    buffer = io.BytesIO()
+    snapshot.resume(index, OutputSink(buffer))
+    return buffer.getvalue()
+
+
+def whole_run(program: Program) -> bytes:
+    buffer = io.BytesIO()
+    program.run(1, output=OutputSink(buffer))
+    return buffer.getvalue()
+
+
+def test_resume_ends_like_whole_run():
+    program = Program(parse(SOURCE))
+    snapshot = MemorySnapshot.capture(program, 2)
+    assert snapshot.output == b"a"
+    assert snapshot.output + resumed(snapshot) == whole_run(program)
+
+
+def test_forks_do_not_share_writes():
+    program = Program(parse(SOURCE))
+    snapshot = MemorySnapshot.capture(program, 2)
+    first = snapshot.fork(OutputSink(io.BytesIO()))
+    program.execute(first, 2)
+    second = snapshot.fork(OutputSink(io.BytesIO()))
+    assert first.cells[0] == 4
+    assert second.cells[0] == snapshot.cells[0] == 3
+
+
+def test_large_snapshot_is_shared(monkeypatch):
+    monkeypatch.setattr(MemorySnapshot, "COPY_LIMIT", 1)
+    program = Program(parse(SOURCE))
+    snapshot = MemorySnapshot.capture(program, 2)
+    context = snapshot.fork(OutputSink(io.BytesIO()))
+    assert isinstance(context.cells, ChainMap)
+    assert resumed(snapshot) == resumed(snapshot) == b"3\n"
+    program.execute(context, 2)
+    assert snapshot.cells[0] == 3
+
+
+def test_resume_other_index():
+    snapshot = MemorySnapshot.capture(Program(parse(SOURCE)), 2)
+    assert resumed(snapshot, 3) == b""
+
+
+def test_stop_index_never_called():
+    with pytest.raises(RuntimeError):
+        MemorySnapshot.capture(Program(parse(SOURCE)), 5)
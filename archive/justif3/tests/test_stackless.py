@@ -0,0 +1,23 @@
+"""The stackless engine, beyond what the tree-walking interpreter can run."""
+from __future__ import annotations
+
+from justif import ExecutionContext, StacklessInterpreter, execute_stackless
+from support import parse
+
+
+def test_deep_recursion():
+    # 100000 non-tail calls would exhaust the Python stack of a recursive interpreter
+    program = parse("~1?.0=0,=2,!.0:~2?+.0=100000?.0+1,=2,0:0:0")
+    context = ExecutionContext()
+    context.root_sequence = program
+    assert execute_stackless(context, 1) == 1
+    assert context.cells[0] == 100000
+
+
+def test_step_budget():
+    context = ExecutionContext()
+    context.root_sequence = parse("~1?.0+1,=1:0")
+    interpreter = StacklessInterpreter(context, 1)
+    assert not interpreter.run(max_steps=100)
+    assert interpreter.steps == 100
+    assert not interpreter.finished
@@ -0,0 +1,46 @@
+"""The Python transpiler, beyond what the examples exercise."""
+from __future__ import annotations
+
+import pytest
+
+from justif import Program, PythonTranspiler
+from support import outcome, parse
+
+
+def test_tail_calls_loop():
+    program = Program(parse("~1?.0=0,=2:~2?+.0=100000?.0+1,=2:0:0"), "transpiled")
+    context = program.context()
+    program.execute(context)
+    assert context.cells[0] == 100000
+
+
+def test_long_string():
+    text = "x" * 5000
+    program = parse(f'~1?.0=0,.1="{text}",=2:~2?.1!.0?>.1!.0,.0+1,=2:0:0')
+    assert outcome("transpiled", program) == outcome("tree", program)
+    assert outcome("transpiled", program)[1] == text.encode()
+
+
+@pytest.mark.parametrize(
+    "source, error",
+    [
+        ("~1?.4+3,.0-..0:0", KeyError),
+        ('~1?.0="ab",..0="x":0', AssertionError),
+        ('~1?.0="ab",.1=..0:0', AssertionError),
+        ('~1?.0="ab",.0+1:0', AssertionError),
+        ('~1?.1+.0,.0="ab",.1+.0:0', AssertionError),
+        ('~1?1:.0+"ab"', None),
+        ("~1?>.5,!.6,.7=.8:0", None),
+        ('~1?.0="ab",.2=3,>.0!.2:0', IndexError),
+    ],
+)
+def test_errors_like_the_tree_walker(source, error):
+    program = parse(source)
+    assert outcome("transpiled", program) == outcome("tree", program)
+    assert outcome("transpiled", program)[0] is error
+
+
+def test_string_arithmetic_fails_when_run():
+    program = parse('~1?1:.0+"ab"')
+    assert "raise AssertionError" in PythonTranspiler().transpile(program)
+    assert outcome("transpiled", program, index=2)[0] is AssertionError